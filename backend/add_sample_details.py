@@ -4,7 +4,9 @@
 为部分汉字添加示例详细信息（拼音、释义、组词、造句）
 """
 
-import sqlite3
+import sys
+
+import cli
 
 # 示例数据
 sample_details = [
@@ -81,38 +83,8 @@ sample_details = [
 ]
 
 def add_sample_details():
-    """为示例汉字添加详细信息"""
-    db = sqlite3.connect('characters.db')
-    cursor = db.cursor()
-    
-    success_count = 0
-    not_found_count = 0
-    
-    for detail in sample_details:
-        # 查找汉字
-        cursor.execute('SELECT id FROM characters WHERE character = ?', (detail['character'],))
-        result = cursor.fetchone()
-        
-        if result:
-            char_id = result[0]
-            cursor.execute('''
-                UPDATE characters
-                SET pinyin = ?, definition = ?, words = ?, sentences = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (detail['pinyin'], detail['definition'], detail['words'], detail['sentences'], char_id))
-            
-            success_count += 1
-            print(f"✓ 更新汉字 '{detail['character']}' 的详细信息")
-        else:
-            not_found_count += 1
-            print(f"✗ 汉字 '{detail['character']}' 不存在")
-    
-    db.commit()
-    db.close()
-    
-    print(f"\n完成！")
-    print(f"成功更新: {success_count} 个")
-    print(f"未找到: {not_found_count} 个")
+    """为示例汉字添加详细信息（等同于 learnword details apply add_sample_details --overwrite）"""
+    cli.main(['details', 'apply', 'add_sample_details', '--overwrite'] + sys.argv[1:])
 
 if __name__ == '__main__':
     add_sample_details()
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学习分析
+
+/api/analytics/* 需要的数据由学习记录按 id 顺序回放得到，结果保存在汇总表中：
+- character_analytics: 每个学习者每个字的作答次数、答错次数、回退次数（答错后由已掌握变为未掌握）、
+                       首次作答时间、首次掌握时间，以及回放到的调度状态
+- activity_heatmap:    每个学习者每天每小时（本地时间）的作答次数和认识次数，weekday 为星期（0 为星期一）
+- analytics_state:     已计入汇总的最后一条学习记录 id（水位）和回放使用的调度器
+
+是否掌握按调度器（SCHEDULER）的规则回放判断，与 learner_progress 一致。
+回放需要按顺序读取每个字之前的状态，没法在触发器里做：读取分析数据前
+（或执行 python3 analytics.py refresh 时）只回放水位之后新增的学习记录，
+每个请求最多回放 ANALYTICS_REFRESH_LIMIT 条，没有回放完时响应不缓存。
+切换调度器后需要执行 python3 analytics.py refresh，从头回放全部学习记录（包括已归档的）；
+在此之前读接口沿用上次回放的调度器。
+
+    python3 analytics.py refresh          # 回放新增的学习记录
+    python3 analytics.py check [--fix]    # 与从头回放的结果对比，--fix 重建
+"""
+
+import argparse
+import datetime
+import time
+
+import archive
+from config import Config
+from db import connect
+import scheduler
+
+# 每批回放的学习记录数（每批提交一次）
+REFRESH_BATCH = 10000
+
+# 热力图默认和最多统计的天数
+DEFAULT_HEATMAP_DAYS = 90
+MAX_HEATMAP_DAYS = 366
+
+# 回放时保存的调度状态（due_at 不影响下一次作答的结果，不保存）
+STATE_COLUMNS = ('recognition_count', 'is_mastered', 'ease', 'interval_days', 'repetitions')
+
+CHARACTER_COLUMNS = (
+    'learner_id', 'character_id', 'review_count', 'mistake_count', 'relapse_count',
+    'first_review_at', 'mastered_at',
+) + STATE_COLUMNS
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS character_analytics (
+        learner_id INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        mistake_count INTEGER NOT NULL DEFAULT 0,
+        relapse_count INTEGER NOT NULL DEFAULT 0,
+        first_review_at INTEGER NOT NULL,
+        mastered_at INTEGER,
+        recognition_count INTEGER NOT NULL DEFAULT 0,
+        is_mastered INTEGER NOT NULL DEFAULT 0,
+        ease REAL NOT NULL DEFAULT 2.5,
+        interval_days REAL NOT NULL DEFAULT 0,
+        repetitions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (learner_id, character_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_character_analytics_character
+    ON character_analytics(character_id)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS activity_heatmap (
+        learner_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        hour INTEGER NOT NULL,
+        weekday INTEGER NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        recognized_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (learner_id, day, hour)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS analytics_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_record_id INTEGER NOT NULL DEFAULT 0,
+        scheduler TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_analytics_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM character_analytics WHERE character_id = OLD.id;
+    END
+    ''',
+    # 删除已计入汇总的学习记录（删除汉字时）从热力图中扣除；归档时暂停（archive.py）
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_analytics_records_delete
+    AFTER DELETE ON learning_records
+    WHEN OLD.id <= (SELECT last_record_id FROM analytics_state WHERE id = 1)
+    BEGIN
+        UPDATE activity_heatmap SET
+            review_count = review_count - 1,
+            recognized_count = recognized_count - IFNULL(OLD.recognized = 1, 0)
+        WHERE learner_id = OLD.learner_id
+          AND day = CAST(strftime('%Y%m%d', OLD.recorded_at, 'unixepoch', 'localtime') AS INTEGER)
+          AND hour = CAST(strftime('%H', OLD.recorded_at, 'unixepoch', 'localtime') AS INTEGER);
+    END
+    ''',
+]
+
+SAVE_CHARACTER_SQL = f'''
+    INSERT OR REPLACE INTO character_analytics ({', '.join(CHARACTER_COLUMNS)})
+    VALUES ({', '.join('?' * len(CHARACTER_COLUMNS))})
+'''
+
+SAVE_HEATMAP_SQL = '''
+    INSERT INTO activity_heatmap (learner_id, day, hour, weekday, review_count, recognized_count)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(learner_id, day, hour) DO UPDATE SET
+        review_count = review_count + excluded.review_count,
+        recognized_count = recognized_count + excluded.recognized_count
+'''
+
+# 按字排序的方式
+SORTS = {
+    'difficulty': 'error_rate DESC, a.mistake_count DESC, a.character_id',
+    'relapses': 'a.relapse_count DESC, a.mistake_count DESC, a.character_id',
+    'mastery_time': 'mastery_seconds DESC, a.character_id',
+    'reviews': 'a.review_count DESC, a.character_id',
+}
+
+
+def _new_item(policy, learner_id, character_id, recorded_at):
+    state = policy.initial_state({'recognition_count': 0, 'is_mastered': 0})
+    item = {field: state[field] for field in STATE_COLUMNS}
+    item.update(
+        learner_id=learner_id, character_id=character_id, review_count=0, mistake_count=0,
+        relapse_count=0, first_review_at=recorded_at, mastered_at=None,
+    )
+    return item
+
+
+def replay(records, policy, items, heatmap, load=None, characters=None):
+    """按顺序回放学习记录，更新 items（(学习者, 字) -> 汇总行）和 heatmap（(学习者, 天, 时, 星期) -> [次数, 认识]）
+
+    load 用于读取 items 中还没有的汇总行；characters 不为 None 时不为其中没有的字（已删除的汉字）
+    生成汇总行，但仍计入热力图：已归档的作答不会因为删除汉字而扣除。返回回放的记录数。
+    """
+    count = 0
+    for learner_id, character_id, recognized, recorded_at in records:
+        recognized = bool(recognized)
+        if characters is None or character_id in characters:
+            key = (learner_id, character_id)
+            item = items.get(key)
+            if item is None:
+                item = load(key) if load else None
+                if item is None:
+                    item = _new_item(policy, learner_id, character_id, recorded_at)
+                items[key] = item
+
+            item['review_count'] += 1
+            if not recognized:
+                item['mistake_count'] += 1
+            was_mastered = item['is_mastered']
+            state = policy.review(item, recognized, recorded_at)
+            for field in STATE_COLUMNS:
+                item[field] = state[field]
+            # 按作答后的状态判断：只有从已掌握变为未掌握才算一次回退
+            if was_mastered and not item['is_mastered']:
+                item['relapse_count'] += 1
+            if item['is_mastered'] and item['mastered_at'] is None:
+                item['mastered_at'] = recorded_at
+
+        moment = time.localtime(recorded_at)
+        cell = heatmap.setdefault(
+            (learner_id, moment.tm_year * 10000 + moment.tm_mon * 100 + moment.tm_mday, moment.tm_hour,
+             moment.tm_wday),
+            [0, 0]
+        )
+        cell[0] += 1
+        cell[1] += recognized
+        count += 1
+    return count
+
+
+def _save(db, items, heatmap):
+    db.executemany(SAVE_CHARACTER_SQL, (
+        tuple(item[column] for column in CHARACTER_COLUMNS) for item in items.values()
+    ))
+    db.executemany(SAVE_HEATMAP_SQL, (key + tuple(counts) for key, counts in heatmap.items()))
+
+
+def _load(db, key):
+    row = db.execute(
+        f'SELECT {", ".join(CHARACTER_COLUMNS)} FROM character_analytics WHERE learner_id = ? AND character_id = ?',
+        key
+    ).fetchone()
+    return dict(zip(CHARACTER_COLUMNS, row)) if row is not None else None
+
+
+def compute(db, policy):
+    """从头回放全部学习记录（包括已归档的），返回 (汇总行, 热力图, 回放的记录数)"""
+    characters = {row[0] for row in db.execute('SELECT id FROM characters')}
+    items, heatmap = {}, {}
+    count = replay(
+        (tuple(row) for row in archive.iter_records(db)), policy, items, heatmap, characters=characters
+    )
+    return items, heatmap, count
+
+
+def rebuild(db, policy):
+    """丢弃分析汇总并从头回放，返回回放的记录数（在调用方的事务中执行）"""
+    last_record_id = db.execute('SELECT IFNULL(MAX(id), 0) FROM learning_records').fetchone()[0]
+    items, heatmap, count = compute(db, policy)
+    db.execute('DELETE FROM character_analytics')
+    db.execute('DELETE FROM activity_heatmap')
+    _save(db, items, heatmap)
+    db.execute(
+        'INSERT OR REPLACE INTO analytics_state (id, last_record_id, scheduler) VALUES (1, ?, ?)',
+        (last_record_id, policy.name)
+    )
+    return count
+
+
+def refresh(db, policy=None, limit=None):
+    """回放水位之后新增的学习记录，返回回放的记录数
+
+    policy 为 None 时沿用上次回放的调度器；与上次不同时从头回放。
+    limit 不为 None 时最多回放 limit 条新增记录（读接口使用，不传 policy）。
+    在已经开始的事务中调用时不提交（归档时在同一个事务里先计入汇总）。
+    """
+    if limit is not None and limit <= 0:
+        return 0
+    state = db.execute('SELECT last_record_id, scheduler FROM analytics_state WHERE id = 1').fetchone()
+    stale = policy is not None and policy.name != state[1]
+    if not stale and db.execute(
+        'SELECT 1 FROM learning_records WHERE id > ? LIMIT 1', (state[0],)
+    ).fetchone() is None:
+        return 0
+
+    policy = policy or scheduler.get_scheduler(state[1])
+    owns_transaction = not db.in_transaction
+    replayed = 0
+    while True:
+        batch = REFRESH_BATCH if limit is None else min(REFRESH_BATCH, limit - replayed)
+        if owns_transaction:
+            # 读取水位到写回之间不允许其他写入，两个进程不会重复回放同一批记录
+            db.execute('BEGIN IMMEDIATE')
+        try:
+            last_record_id, name = db.execute(
+                'SELECT last_record_id, scheduler FROM analytics_state WHERE id = 1'
+            ).fetchone()
+            if name != policy.name:
+                replayed += rebuild(db, policy)
+                rows = []
+            else:
+                rows = db.execute('''
+                    SELECT id, learner_id, character_id, recognized, recorded_at
+                    FROM learning_records WHERE id > ? ORDER BY id LIMIT ?
+                ''', (last_record_id, batch)).fetchall()
+                if rows:
+                    items, heatmap = {}, {}
+                    replayed += replay(
+                        (tuple(row)[1:] for row in rows), policy, items, heatmap, load=lambda key: _load(db, key)
+                    )
+                    _save(db, items, heatmap)
+                    db.execute('UPDATE analytics_state SET last_record_id = ? WHERE id = 1', (rows[-1][0],))
+            if owns_transaction:
+                db.commit()
+        except Exception:
+            if owns_transaction:
+                db.rollback()
+            raise
+        if len(rows) < batch or replayed == limit:
+            return replayed
+
+
+def check(db):
+    """与从头回放的结果对比，返回不一致项的说明列表"""
+    name = db.execute('SELECT scheduler FROM analytics_state WHERE id = 1').fetchone()[0]
+    items, heatmap, _ = compute(db, scheduler.get_scheduler(name))
+    problems = []
+
+    stored = {
+        (row[0], row[1]): dict(zip(CHARACTER_COLUMNS, row))
+        for row in db.execute(f'SELECT {", ".join(CHARACTER_COLUMNS)} FROM character_analytics')
+    }
+    mismatched = sum(1 for key in stored.keys() | items.keys() if stored.get(key) != items.get(key))
+    if mismatched:
+        problems.append(f'character_analytics: {mismatched} 行与回放结果不一致')
+
+    stored_heatmap = {
+        tuple(row[:4]): [row[4], row[5]]
+        for row in db.execute('''
+            SELECT learner_id, day, hour, weekday, review_count, recognized_count
+            FROM activity_heatmap WHERE review_count > 0
+        ''')
+    }
+    mismatched = sum(1 for key in stored_heatmap.keys() | heatmap.keys() if stored_heatmap.get(key) != heatmap.get(key))
+    if mismatched:
+        problems.append(f'activity_heatmap: {mismatched} 个小时的数据不一致')
+    return problems
+
+
+def query_summary(db, learner_id):
+    """学习者的整体数据：作答次数、错误率、回退次数、已掌握字数和平均掌握用时"""
+    row = db.execute('''
+        SELECT COUNT(*) AS characters,
+               IFNULL(SUM(review_count), 0) AS review_count,
+               IFNULL(SUM(mistake_count), 0) AS mistake_count,
+               IFNULL(SUM(relapse_count), 0) AS relapse_count,
+               COUNT(mastered_at) AS mastered,
+               AVG(mastered_at - first_review_at) AS mastery_seconds
+        FROM character_analytics
+        WHERE learner_id = ?
+    ''', (learner_id,)).fetchone()
+    summary = dict(row)
+    summary['error_rate'] = round(row['mistake_count'] / row['review_count'], 4) if row['review_count'] else 0
+    if summary['mastery_seconds'] is not None:
+        summary['mastery_seconds'] = round(summary['mastery_seconds'])
+    return summary
+
+
+def query_characters(db, learner_id, sort='difficulty', min_reviews=1, limit=None):
+    """学习者作答过的字，按难度（错误率）、回退次数、掌握用时或作答次数排序
+
+    sort 不支持时抛出 ValueError。
+    """
+    if sort not in SORTS:
+        raise ValueError(f'sort 只能是 {" / ".join(SORTS)}')
+    conditions = ['a.learner_id = ?', 'a.review_count >= ?']
+    params = [learner_id, min_reviews]
+    if sort == 'mastery_time':
+        conditions.append('a.mastered_at IS NOT NULL')
+
+    sql = f'''
+        SELECT a.character_id AS id, c.character,
+               a.review_count, a.mistake_count, a.relapse_count,
+               ROUND(1.0 * a.mistake_count / a.review_count, 4) AS error_rate,
+               a.mastered_at - a.first_review_at AS mastery_seconds,
+               datetime(a.first_review_at, 'unixepoch') AS first_review_time,
+               datetime(a.mastered_at, 'unixepoch') AS mastered_time,
+               a.is_mastered
+        FROM character_analytics a
+        JOIN characters c ON c.id = a.character_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {SORTS[sort]}
+    '''
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return [dict(row) for row in db.execute(sql, params)]
+
+
+def query_heatmap(db, learner_id, days=DEFAULT_HEATMAP_DAYS, today=None):
+    """最近 days 天（含今天）按星期和小时的作答次数，以及每天的作答次数
+
+    review_count / recognized_count 为 7 × 24 的二维数组，第一维 0 为星期一。
+    """
+    today = today or datetime.date.today()
+    since = today - datetime.timedelta(days=days - 1)
+    params = (learner_id, int(f'{since:%Y%m%d}'), int(f'{today:%Y%m%d}'))
+    reviews = [[0] * 24 for _ in range(7)]
+    recognized = [[0] * 24 for _ in range(7)]
+    for weekday, hour, review_count, recognized_count in db.execute('''
+        SELECT weekday, hour, SUM(review_count), SUM(recognized_count)
+        FROM activity_heatmap
+        WHERE learner_id = ? AND day BETWEEN ? AND ?
+        GROUP BY weekday, hour
+    ''', params):
+        reviews[weekday][hour] = review_count
+        recognized[weekday][hour] = recognized_count
+    daily = db.execute('''
+        SELECT day, SUM(review_count) AS review_count, SUM(recognized_count) AS recognized_count
+        FROM activity_heatmap
+        WHERE learner_id = ? AND day BETWEEN ? AND ?
+        GROUP BY day
+        HAVING SUM(review_count) > 0
+    ''', params)
+    return {
+        'since': since.isoformat(),
+        'until': today.isoformat(),
+        'review_count': reviews,
+        'recognized_count': recognized,
+        'days': [
+            {
+                'day': f'{day // 10000:04d}-{day // 100 % 100:02d}-{day % 100:02d}',
+                'review_count': review_count,
+                'recognized_count': recognized_count,
+            }
+            for day, review_count, recognized_count in daily
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='学习分析工具')
+    parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    refresh_parser = subparsers.add_parser('refresh', help='回放新增的学习记录')
+    refresh_parser.add_argument('--scheduler', default=Config.SCHEDULER, choices=sorted(scheduler.SCHEDULERS))
+    check_parser = subparsers.add_parser('check', help='检查分析汇总是否与从头回放的结果一致')
+    check_parser.add_argument('--fix', action='store_true', help='从头回放重建分析汇总')
+    args = parser.parse_args()
+
+    # migrations 依赖本模块，在这里导入
+    from migrations import migrate
+
+    db = connect(args.db)
+    try:
+        migrate(db)
+        start = time.perf_counter()
+        if args.command == 'refresh':
+            count = refresh(db, scheduler.get_scheduler(args.scheduler))
+            print(f"✓ 回放 {count} 条学习记录，耗时 {time.perf_counter() - start:.2f} 秒")
+            return
+
+        problems = check(db)
+        for problem in problems:
+            print(f"✗ {problem}")
+        if not problems:
+            print("✓ 分析汇总与学习记录一致")
+        if args.fix:
+            name = db.execute('SELECT scheduler FROM analytics_state WHERE id = 1').fetchone()[0]
+            db.execute('BEGIN IMMEDIATE')
+            count = rebuild(db, scheduler.get_scheduler(name))
+            db.commit()
+            print(f"✓ 已回放 {count} 条学习记录重建分析汇总，耗时 {time.perf_counter() - start:.2f} 秒")
+        elif problems:
+            raise SystemExit(1)
+    except OSError as e:
+        print(f"✗ 读取归档文件失败: {e}")
+        raise SystemExit(1)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
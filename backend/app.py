@@ -1,51 +1,99 @@
-from flask import Flask, jsonify, request, send_file
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, send_file, stream_with_context
 from flask_cors import CORS
 import sqlite3
 from datetime import datetime
-import random
 import os
-from openpyxl import Workbook, load_workbook
-from io import BytesIO
-
-app = Flask(__name__)
-CORS(app)
-
-DATABASE = 'characters.db'
-
-def get_db():
-    """获取数据库连接"""
-    db = sqlite3.connect(DATABASE)
-    db.row_factory = sqlite3.Row
-    return db
-
-def init_db():
-    """初始化数据库"""
-    db = get_db()
+import tempfile
+import time
+import uuid
+
+from config import get_config
+from db import connect, connect_from_config, get_db, init_app as init_db_app, reset_pool
+from sampler import MAX_COUNT as MAX_SAMPLE_COUNT
+import scheduler
+import analytics
+import exporter
+import importer
+import jobs
+import migrations
+import marks
+import sessions
+import catalog
+import httpcache
+import search
+import vocabulary
+import learners
+import records
+import dictionary
+import metrics
+import reports
+import snapshot
+from httpcache import cached, no_store_unless
+from pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, decode_cursor, encode_cursor, parse_limit
+from stores import MemoryStorage, get_storage
+
+api = Blueprint('api', __name__)
+
+# 分页接口单页最多返回的行数
+MAX_PAGE_SIZE = 500
+
+# 搜索默认和最多返回的条数
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+def create_app(config=None):
+    """创建 Flask 应用
+
+    config 为配置类（或名称 development / production），默认按 LEARNWORD_ENV 选择。
+    """
+    if config is None or isinstance(config, str):
+        config = get_config(config)
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+    if app.config['STORAGE'] == MemoryStorage.name:
+        # 内存存储的写入不经过数据库触发器，表的版本号不会变化，不能使用 HTTP 缓存
+        app.config['HTTP_CACHE_ENABLED'] = False
+    CORS(app, expose_headers=[NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER])
+    metrics.init_app(app)
+    init_db_app(app)
+    httpcache.init_app(app)
+
+    if app.config['MIGRATE_ON_STARTUP']:
+        db = connect_from_config(app.config)
+        try:
+            migrations.migrate(db)
+        finally:
+            db.close()
+
+    app.before_request(start_jobs)
+    app.register_blueprint(api)
+    return app
+
+def shutdown_app(app):
+    """进程退出前等待后台任务结束，写出最后的指标，并关闭连接池"""
+    manager = app.extensions.get(jobs.EXTENSION_KEY)
+    if manager is not None:
+        manager.shutdown()
+    collected = app.extensions.get(metrics.EXTENSION_KEY)
+    if collected is not None:
+        collected.flush(force=True)
+    reset_pool(app)
+
+def is_async_request():
+    """是否要求以后台任务方式执行（?async=true）"""
+    return request.args.get('async', '').lower() in ('1', 'true', 'yes')
+
+def start_jobs():
+    """第一个请求到达时恢复上次未完成的后台任务"""
+    jobs.get_manager(current_app).start()
+
+def init_db(database):
+    """初始化数据库：迁移到最新结构，空库时预置常用汉字"""
+    db = connect(database)
+    migrations.migrate(db)
     cursor = db.cursor()
     
-    # 创建汉字表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS characters (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            character TEXT UNIQUE NOT NULL,
-            recognition_count INTEGER DEFAULT 0,
-            is_mastered BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # 创建学习记录表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS learning_records (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            character_id INTEGER NOT NULL,
-            recognized BOOLEAN NOT NULL,
-            recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (character_id) REFERENCES characters(id)
-        )
-    ''')
-    
     # 检查是否已有数据
     cursor.execute('SELECT COUNT(*) as count FROM characters')
     count = cursor.fetchone()['count']
@@ -74,23 +122,54 @@ def init_db():
     db.commit()
     db.close()
 
+def get_learner_id():
+    """读取 ?learner_id= 参数（未传入时为默认学习者）
+
+    格式错误时抛出 ValueError，学习者不存在时抛出 LookupError。
+    """
+    learner_id = learners.parse_learner_id(request.args.get('learner_id'))
+    if not get_storage().characters.has_learner(learner_id):
+        raise LookupError('学习者不存在')
+    return learner_id
+
 # API路由
 
-@app.route('/api/characters', methods=['GET'])
+@api.route('/api/characters', methods=['GET'])
+@cached('characters')
 def get_characters():
-    """获取所有汉字"""
+    """获取汉字列表（按添加时间倒序）
+
+    ?limit=N 分页，下一页游标在 X-Next-Cursor 响应头中，通过 ?after=<游标> 翻页；
+    ?fields=id,character,... 选择返回的字段；?status=mastered|learning|not_started
+    和 ?has_details=true|false 筛选。能从统计汇总得到总数时放在 X-Total-Count 响应头中。
+    """
+    try:
+        fields = catalog.parse_fields(request.args.get('fields'))
+        status, has_details = catalog.parse_filters(
+            request.args.get('status'), request.args.get('has_details')
+        )
+        limit = parse_limit(request.args.get('limit'), MAX_PAGE_SIZE)
+        after = request.args.get('after')
+        if after is not None:
+            after = decode_cursor(after, 2)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     db = get_db()
-    cursor = db.cursor()
-    cursor.execute('''
-        SELECT id, character, recognition_count, is_mastered, created_at, updated_at
-        FROM characters
-        ORDER BY created_at DESC
-    ''')
-    characters = [dict(row) for row in cursor.fetchall()]
-    db.close()
-    return jsonify(characters)
+    rows = catalog.query_characters(
+        db, fields=fields, status=status, has_details=has_details, limit=limit, after=after
+    )
+    total = catalog.count_characters(db, status=status, has_details=has_details)
+    
+    response = jsonify([{field: row[field] for field in fields} for row in rows])
+    if limit is not None and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor((last['created_at'], last['id']))
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+    return response
 
-@app.route('/api/characters', methods=['POST'])
+@api.route('/api/characters', methods=['POST'])
 def add_character():
     """添加新汉字"""
     data = request.json
@@ -112,14 +191,12 @@ def add_character():
         
         cursor.execute('SELECT * FROM characters WHERE id = ?', (character_id,))
         new_character = dict(cursor.fetchone())
-        db.close()
         
         return jsonify(new_character), 201
     except sqlite3.IntegrityError:
-        db.close()
         return jsonify({'error': '该汉字已存在'}), 400
 
-@app.route('/api/characters/batch', methods=['POST'])
+@api.route('/api/characters/batch', methods=['POST'])
 def add_characters_batch():
     """批量添加汉字"""
     data = request.json
@@ -155,7 +232,6 @@ def add_characters_batch():
             skip_count += 1
     
     db.commit()
-    db.close()
     
     return jsonify({
         'success': success_count,
@@ -163,23 +239,49 @@ def add_characters_batch():
         'total': len(chars)
     }), 201
 
-@app.route('/api/characters/<int:character_id>', methods=['GET'])
-def get_character_detail(character_id):
-    """获取汉字详情"""
-    db = get_db()
-    cursor = db.cursor()
+@api.route('/api/search', methods=['GET'])
+@cached('characters')
+def search_characters():
+    """搜索汉字
+
+    ?q= 可以是汉字、词语（匹配汉字、释义、组词、造句），也可以是拼音前缀
+    （带不带声调都可以，如 zhong / zhōng / zh）；?limit=N 最多返回的条数。
+    结果按相关度排序，snippet 为命中位置附近的文本，命中部分用 [] 标出。
+    """
+    q = request.args.get('q', '').strip()
+    try:
+        limit = parse_limit(request.args.get('limit'), SEARCH_MAX_LIMIT) or SEARCH_DEFAULT_LIMIT
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if search.build_query(q) is None:
+        return jsonify({'error': '请输入搜索内容'}), 400
     
-    cursor.execute('SELECT * FROM characters WHERE id = ?', (character_id,))
-    character = cursor.fetchone()
+    return jsonify(search.search(get_db(), q, limit))
+
+def dictionary_version():
+    """本进程打开的词典的摘要（补上词典详情的接口，缓存随词典变化）"""
+    packed = dictionary.get_dictionary(current_app)
+    return packed.digest[:16] if packed is not None else 'none'
+
+@api.route('/api/characters/<int:character_id>', methods=['GET'])
+@cached('characters', 'learner_progress', vary=dictionary_version)
+def get_character_detail(character_id):
+    """获取汉字详情（学习状态字段为 ?learner_id= 指定学习者的进度）"""
+    try:
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    character = learners.load_character(get_db(), learner_id, character_id)
     
     if not character:
-        db.close()
         return jsonify({'error': '汉字不存在'}), 404
     
-    db.close()
-    return jsonify(dict(character))
+    return jsonify(dictionary.fill_missing(character, dictionary.get_dictionary(current_app)))
 
-@app.route('/api/characters/<int:character_id>', methods=['PUT'])
+@api.route('/api/characters/<int:character_id>', methods=['PUT'])
 def update_character(character_id):
     """更新汉字详情"""
     data = request.json
@@ -192,7 +294,6 @@ def update_character(character_id):
     character = cursor.fetchone()
     
     if not character:
-        db.close()
         return jsonify({'error': '汉字不存在'}), 404
     
     # 更新字段
@@ -212,11 +313,10 @@ def update_character(character_id):
     # 获取更新后的数据
     cursor.execute('SELECT * FROM characters WHERE id = ?', (character_id,))
     updated_character = dict(cursor.fetchone())
-    db.close()
     
     return jsonify(updated_character)
 
-@app.route('/api/characters/<int:character_id>', methods=['DELETE'])
+@api.route('/api/characters/<int:character_id>', methods=['DELETE'])
 def delete_character(character_id):
     """删除汉字"""
     db = get_db()
@@ -228,306 +328,521 @@ def delete_character(character_id):
     # 删除汉字
     cursor.execute('DELETE FROM characters WHERE id = ?', (character_id,))
     db.commit()
-    db.close()
     
     return jsonify({'message': '删除成功'}), 200
 
-@app.route('/api/characters/random', methods=['GET'])
+@api.route('/api/characters/random', methods=['GET'])
 def get_random_character():
-    """获取随机的待学习汉字（默认未掌握的，复习模式获取已掌握的）"""
+    """获取随机的待学习汉字（默认未掌握的，复习模式获取已掌握的）
+
+    传入 count 参数时一次返回多个不重复的汉字（列表）。
+    """
     mastered = request.args.get('mastered', 'false').lower() == 'true'
+    count = request.args.get('count', type=int)
 
-    db = get_db()
-    cursor = db.cursor()
+    if count is not None and not 1 <= count <= MAX_SAMPLE_COUNT:
+        return jsonify({'error': f'count 需在 1 到 {MAX_SAMPLE_COUNT} 之间'}), 400
+    try:
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     if mastered:
         # 复习模式：获取已掌握的汉字
-        cursor.execute('''
-            SELECT id, character, recognition_count, is_mastered
-            FROM characters
-            WHERE is_mastered = 1
-        ''')
         message = '没有已掌握的汉字可复习'
     else:
         # 学习模式：获取未掌握的汉字
-        cursor.execute('''
-            SELECT id, character, recognition_count, is_mastered
-            FROM characters
-            WHERE is_mastered = 0
-        ''')
         message = '恭喜！所有汉字都已掌握'
 
-    characters = [dict(row) for row in cursor.fetchall()]
-    db.close()
+    characters = get_storage().characters.sample(learner_id, mastered=mastered, count=count or 1)
 
     if not characters:
         return jsonify({'message': message}), 200
 
-    # 随机选择一个
-    random_char = random.choice(characters)
-    return jsonify(random_char)
+    if count is not None:
+        return jsonify(characters)
+    return jsonify(characters[0])
+
+def parse_deck_options(data):
+    """读取学习会话请求中的每组卡片数和是否附带详情，格式错误时抛出 ValueError"""
+    size = data.get('size', sessions.DEFAULT_SIZE)
+    if not isinstance(size, int) or isinstance(size, bool) or not 1 <= size <= MAX_SAMPLE_COUNT:
+        raise ValueError(f'size 需在 1 到 {MAX_SAMPLE_COUNT} 之间')
+    return size, bool(data.get('details', False))
+
+def fill_card_details(cards):
+    """卡片中为空的详情从汉字详情词典补上"""
+    packed = dictionary.get_dictionary(current_app)
+    for card in cards:
+        dictionary.fill_missing(card, packed)
+
+@api.route('/api/sessions', methods=['POST'])
+def create_study_session():
+    """新建学习会话，一次返回一组卡片（学习模式抽未掌握的字，复习模式抽已掌握的字）"""
+    data = request.json or {}
+    mode = data.get('mode', 'learn')
+    if mode not in sessions.MODES:
+        return jsonify({'error': f'mode 只能是 {" / ".join(sessions.MODES)}'}), 400
+    try:
+        size, details = parse_deck_options(data)
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-@app.route('/api/characters/<int:character_id>/mark', methods=['POST'])
+    db = get_db()
+    session_id, cards = sessions.create_session(db, mode, size, details, learner_id=learner_id)
+    if details:
+        fill_card_details(cards)
+    
+    result = {'id': session_id, 'mode': mode, 'cards': cards}
+    if not cards:
+        result['message'] = '没有已掌握的汉字可复习' if mode == 'review' else '恭喜！所有汉字都已掌握'
+    return jsonify(result), 201
+
+@api.route('/api/sessions/<session_id>/cards', methods=['POST'])
+def draw_session_cards(session_id):
+    """取会话的下一组卡片，本会话出现过的字不会重复；没有新卡片时 cards 为空"""
+    data = request.json or {}
+    try:
+        size, details = parse_deck_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    db = get_db()
+    session = sessions.find_session(db, session_id)
+    if session is None:
+        return jsonify({'error': '会话不存在或已过期'}), 404
+    
+    cards = sessions.draw_cards(db, session, size, details)
+    if details:
+        fill_card_details(cards)
+    return jsonify({'id': session_id, 'mode': session['mode'], 'cards': cards})
+
+@api.route('/api/characters/next', methods=['GET'])
+def get_next_character():
+    """按复习计划获取最早到期的汉字
+
+    传入 count 参数时按到期先后返回多个汉字（列表）。
+    """
+    count = request.args.get('count', type=int)
+
+    if count is not None and not 1 <= count <= MAX_SAMPLE_COUNT:
+        return jsonify({'error': f'count 需在 1 到 {MAX_SAMPLE_COUNT} 之间'}), 400
+    try:
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    db = get_db()
+    cursor = db.cursor()
+    now = int(time.time())
+
+    # (learner_id, due_at) 索引上的范围查找，不扫描整张表
+    cursor.execute('''
+        SELECT c.id, c.character, p.recognition_count, p.is_mastered, p.ease,
+               p.interval_days, p.repetitions, p.due_at
+        FROM learner_progress p
+        JOIN characters c ON c.id = p.character_id
+        WHERE p.learner_id = ? AND p.due_at <= ?
+        ORDER BY p.due_at
+        LIMIT ?
+    ''', (learner_id, now, count or 1))
+    characters = [dict(row) for row in cursor.fetchall()]
+
+    if not characters:
+        cursor.execute('''
+            SELECT MIN(due_at) AS next_due_at
+            FROM learner_progress
+            WHERE learner_id = ? AND due_at IS NOT NULL
+        ''', (learner_id,))
+        return jsonify({
+            'message': '当前没有需要复习的汉字',
+            'next_due_at': cursor.fetchone()['next_due_at']
+        }), 200
+
+    if count is not None:
+        return jsonify(characters)
+    return jsonify(characters[0])
+
+@api.route('/api/characters/<int:character_id>/mark', methods=['POST'])
 def mark_character(character_id):
     """标记汉字认识或不认识"""
     data = request.json
     recognized = data.get('recognized', False)
-    
-    db = get_db()
-    cursor = db.cursor()
-    
-    # 获取当前汉字信息
-    cursor.execute('SELECT * FROM characters WHERE id = ?', (character_id,))
-    character = cursor.fetchone()
-    
-    if not character:
-        db.close()
+    try:
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    storage = get_storage()
+
+    # 记录学习记录，由调度器计算新的学习状态和下次复习时间
+    policy = scheduler.get_scheduler(current_app.config['SCHEDULER'])
+    _, missing = storage.mark(
+        learner_id, [(character_id, bool(recognized), None)], policy,
+        max_age_days=current_app.config['MARKS_MAX_AGE_DAYS'],
+        keep_months=current_app.config['ARCHIVE_KEEP_MONTHS']
+    )
+
+    if missing:
         return jsonify({'error': '汉字不存在'}), 404
-    
-    # 记录学习记录
-    cursor.execute(
-        'INSERT INTO learning_records (character_id, recognized) VALUES (?, ?)',
-        (character_id, recognized)
+
+    # 获取更新后的汉字信息（学习状态为该学习者的进度）
+    return jsonify(storage.characters.get(learner_id, character_id))
+
+@api.route('/api/marks/batch', methods=['POST'])
+def mark_characters_batch():
+    """按顺序批量提交作答（离线缓存的作答一次提交，整批一个事务）"""
+    data = request.json or {}
+    try:
+        items = marks.parse_marks(data.get('marks'))
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    policy = scheduler.get_scheduler(current_app.config['SCHEDULER'])
+    states, missing = get_storage().mark(
+        learner_id, items, policy,
+        max_age_days=current_app.config['MARKS_MAX_AGE_DAYS'],
+        keep_months=current_app.config['ARCHIVE_KEEP_MONTHS']
     )
     
-    # 更新认识次数
-    if recognized:
-        new_count = character['recognition_count'] + 1
-        is_mastered = 1 if new_count >= 3 else 0
-        
-        cursor.execute('''
-            UPDATE characters
-            SET recognition_count = ?, is_mastered = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (new_count, is_mastered, character_id))
-    else:
-        # 如果标记不认识，计数归零
-        cursor.execute('''
-            UPDATE characters
-            SET recognition_count = 0, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (character_id,))
-    
-    db.commit()
-    
-    # 获取更新后的汉字信息
-    cursor.execute('SELECT * FROM characters WHERE id = ?', (character_id,))
-    updated_character = dict(cursor.fetchone())
-    db.close()
-    
-    return jsonify(updated_character)
+    return jsonify({
+        'applied': len(items) - sum(1 for character_id, _, _ in items if character_id in missing),
+        'missing': missing,
+        'characters': [
+            {field: state[field] for field in marks.RESULT_FIELDS}
+            for state in states.values()
+        ],
+    })
 
-@app.route('/api/characters/<int:character_id>/reset', methods=['POST'])
+@api.route('/api/characters/<int:character_id>/reset', methods=['POST'])
 def reset_character(character_id):
     """重置汉字学习进度"""
-    db = get_db()
-    cursor = db.cursor()
-    
-    cursor.execute('''
-        UPDATE characters
-        SET recognition_count = 0, is_mastered = 0, updated_at = CURRENT_TIMESTAMP
-        WHERE id = ?
-    ''', (character_id,))
-    
-    db.commit()
-    
-    cursor.execute('SELECT * FROM characters WHERE id = ?', (character_id,))
-    updated_character = dict(cursor.fetchone())
-    db.close()
-    
+    try:
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    updated_character = get_storage().reset(learner_id, character_id)
+    if updated_character is None:
+        return jsonify({'error': '汉字不存在'}), 404
+
     return jsonify(updated_character)
 
-@app.route('/api/stats', methods=['GET'])
+@api.route('/api/stats', methods=['GET'])
 def get_stats():
-    """获取统计信息"""
-    db = get_db()
-    cursor = db.cursor()
-    
-    # 总字数
-    cursor.execute('SELECT COUNT(*) as total FROM characters')
-    total = cursor.fetchone()['total']
-    
-    # 已掌握字数
-    cursor.execute('SELECT COUNT(*) as mastered FROM characters WHERE is_mastered = 1')
-    mastered = cursor.fetchone()['mastered']
-    
-    # 学习中字数
-    cursor.execute('SELECT COUNT(*) as learning FROM characters WHERE is_mastered = 0 AND recognition_count > 0')
-    learning = cursor.fetchone()['learning']
-    
-    # 未开始字数
-    cursor.execute('SELECT COUNT(*) as not_started FROM characters WHERE recognition_count = 0')
-    not_started = cursor.fetchone()['not_started']
-    
-    # 今日学习记录
-    cursor.execute('''
-        SELECT COUNT(*) as today_count
-        FROM learning_records
-        WHERE DATE(recorded_at) = DATE('now', 'localtime')
-    ''')
-    today_count = cursor.fetchone()['today_count']
-    
-    # 今日认识的汉字
-    cursor.execute('''
-        SELECT DISTINCT c.character
-        FROM learning_records lr
-        JOIN characters c ON lr.character_id = c.id
-        WHERE DATE(lr.recorded_at) = DATE('now', 'localtime') AND lr.recognized = 1
-        ORDER BY lr.recorded_at DESC
-    ''')
-    today_recognized = [row['character'] for row in cursor.fetchall()]
-    
-    db.close()
-    
+    """获取统计信息（读取触发器按学习者维护的汇总表，不扫描原始数据）"""
+    try:
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    storage = get_storage()
+
+    # 总字数、已掌握、学习中、未开始
+    summary = storage.characters.summary(learner_id)
+
+    # 今日作答次数和认识的汉字
+    today_count, today_recognized = storage.records.today(learner_id, records.local_day())
+
     return jsonify({
-        'total': total,
-        'mastered': mastered,
-        'learning': learning,
-        'not_started': not_started,
+        **summary,
         'today_count': today_count,
         'today_recognized': today_recognized,
-        'progress': round((mastered / total * 100), 2) if total > 0 else 0
+        'progress': round((summary['mastered'] / summary['total'] * 100), 2) if summary['total'] > 0 else 0
     })
 
-@app.route('/api/records/recent', methods=['GET'])
+@api.route('/api/learners', methods=['GET'])
+def get_learners():
+    """获取全部学习者"""
+    return jsonify(learners.list_learners(get_db()))
+
+@api.route('/api/learners', methods=['POST'])
+def add_learner():
+    """新增学习者，其他接口通过 ?learner_id= 指定学习者"""
+    data = request.json or {}
+    try:
+        learner = learners.create_learner(get_db(), data.get('name'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(learner), 201
+
+@api.route('/api/words/mastered', methods=['GET'])
+@cached('characters', 'learner_progress')
+def get_mastered_words():
+    """只由学习者已掌握的字组成的词（用于生成阅读材料）
+
+    ?contains=字 只返回包含这个字的词；?limit=N 分页，下一页游标在
+    X-Next-Cursor 响应头中，通过 ?after=<游标> 翻页。
+    """
+    contains = request.args.get('contains')
+    try:
+        if contains is not None and len(contains.strip()) != 1:
+            raise ValueError('contains 只能是单个汉字')
+        limit = parse_limit(request.args.get('limit'), MAX_PAGE_SIZE)
+        after = request.args.get('after')
+        if after is not None:
+            after = decode_cursor(after, 1)[0]
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    words = vocabulary.query_mastered_words(
+        get_db(), contains=contains.strip() if contains else None, limit=limit, after=after,
+        learner_id=learner_id
+    )
+    
+    response = jsonify(words)
+    if limit is not None and len(words) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor((words[-1]['id'],))
+    return response
+
+@api.route('/api/records/recent', methods=['GET'])
 def get_recent_records():
     """获取最近的学习记录"""
     limit = request.args.get('limit', 20, type=int)
-    
+    try:
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     db = get_db()
     cursor = db.cursor()
-    
+
     cursor.execute('''
-        SELECT lr.id, lr.recognized, lr.recorded_at, c.character
+        SELECT lr.id, lr.recognized, datetime(lr.recorded_at, 'unixepoch') AS recorded_at, c.character
         FROM learning_records lr
         JOIN characters c ON lr.character_id = c.id
+        WHERE lr.learner_id = ?
         ORDER BY lr.recorded_at DESC
         LIMIT ?
-    ''', (limit,))
+    ''', (learner_id, limit))
     
     records = [dict(row) for row in cursor.fetchall()]
-    db.close()
     
     return jsonify(records)
 
-@app.route('/api/mistakes', methods=['GET'])
+@api.route('/api/mistakes', methods=['GET'])
+@cached('characters', 'learning_records', 'learner_progress')
 def get_mistakes():
-    """获取错题库 - 所有标记过不认识的汉字（排除已掌握和已认识的）"""
+    """获取错题库 - 所有标记过不认识的汉字（排除已掌握和已认识的）
+
+    支持键集分页：?limit=N 返回一页，下一页游标在 X-Next-Cursor 响应头中，
+    通过 ?after=<游标> 获取下一页。默认只返回列表需要的字段，
+    ?fields=details 时附带拼音、释义、组词和造句。
+    """
+    details = request.args.get('fields') == 'details'
+    try:
+        limit = parse_limit(request.args.get('limit'), MAX_PAGE_SIZE)
+        after = request.args.get('after')
+        if after is not None:
+            after = decode_cursor(after, 2)
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    mistakes = get_storage().records.mistakes(learner_id, limit=limit, after=after, details=details)
+    
+    response = jsonify(mistakes)
+    if limit is not None and len(mistakes) == limit:
+        last = mistakes[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor((last['last_mistake_time'], last['id']))
+    return response
+
+def refresh_analytics(db):
+    """读取分析数据前回放新增的学习记录，每个请求最多 ANALYTICS_REFRESH_LIMIT 条
+
+    返回是否已经回放完；没有回放完时数据落后于学习记录，调用方不缓存响应。
+    切换调度器后的从头回放交给 python3 analytics.py refresh，这里沿用上次回放的调度器。
+    """
+    limit = current_app.config['ANALYTICS_REFRESH_LIMIT']
+    return analytics.refresh(db, limit=limit) < limit
+
+@api.route('/api/analytics/summary', methods=['GET'])
+@cached('characters', 'learning_records')
+def get_analytics_summary():
+    """学习者的整体分析：作答次数、错误率、回退次数、已掌握字数和平均掌握用时（秒）"""
+    try:
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     db = get_db()
-    cursor = db.cursor()
-    
-    # 查找所有有"不认识"记录的汉字
-    # 排除条件：
-    # 1. 已掌握的汉字 (is_mastered = 1)
-    # 2. 有"认识"记录的汉字（已经标记过认识的）
-    cursor.execute('''
-        SELECT 
-            c.id,
-            c.character,
-            c.recognition_count,
-            c.is_mastered,
-            c.pinyin,
-            c.definition,
-            c.words,
-            c.sentences,
-            COUNT(CASE WHEN lr.recognized = 0 THEN 1 END) as mistake_count,
-            MAX(lr.recorded_at) as last_mistake_time
-        FROM characters c
-        INNER JOIN learning_records lr ON c.id = lr.character_id
-        WHERE c.is_mastered = 0
-        AND c.id NOT IN (
-            SELECT DISTINCT character_id 
-            FROM learning_records 
-            WHERE recognized = 1
-        )
-        GROUP BY c.id
-        HAVING mistake_count > 0
-        ORDER BY last_mistake_time DESC
-    ''')
-    
-    mistakes = [dict(row) for row in cursor.fetchall()]
-    db.close()
-    
-    return jsonify(mistakes)
+    current = refresh_analytics(db)
+    return no_store_unless(current, jsonify(analytics.query_summary(db, learner_id)))
+
+@api.route('/api/analytics/characters', methods=['GET'])
+@cached('characters', 'learning_records')
+def get_analytics_characters():
+    """按字的分析：错误率、回退次数（答错后由已掌握变为未掌握）、首次掌握用时
+
+    ?sort=difficulty（默认，按错误率）| relapses | mastery_time | reviews 排序，
+    ?min_reviews=N 只返回至少作答 N 次的字，?limit=N 最多返回的条数。
+    """
+    sort = request.args.get('sort', 'difficulty')
+    min_reviews = request.args.get('min_reviews', 1, type=int)
+    try:
+        if sort not in analytics.SORTS:
+            raise ValueError(f'sort 只能是 {" / ".join(analytics.SORTS)}')
+        limit = parse_limit(request.args.get('limit'), MAX_PAGE_SIZE)
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-@app.route('/api/characters/export', methods=['GET'])
-def export_characters_excel():
-    """导出汉字库到Excel文件"""
     db = get_db()
-    cursor = db.cursor()
+    current = refresh_analytics(db)
+    return no_store_unless(current, jsonify(analytics.query_characters(db, learner_id, sort=sort, min_reviews=min_reviews, limit=limit)))
+
+def local_today():
+    """本地日期（按天统计的接口的缓存随日期变化）"""
+    return f'{datetime.now():%Y%m%d}'
+
+@api.route('/api/analytics/heatmap', methods=['GET'])
+@cached('characters', 'learning_records', vary=local_today)
+def get_analytics_heatmap():
+    """最近 ?days=N 天（默认 90）按星期和小时的作答次数（7 × 24，星期一在前），以及每天的作答次数"""
+    days = request.args.get('days', analytics.DEFAULT_HEATMAP_DAYS, type=int)
+    try:
+        if not 1 <= days <= analytics.MAX_HEATMAP_DAYS:
+            raise ValueError(f'days 需在 1 到 {analytics.MAX_HEATMAP_DAYS} 之间')
+        learner_id = get_learner_id()
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    cursor.execute('''
-        SELECT id, character, pinyin, definition, words, sentences,
-               recognition_count, is_mastered, created_at, updated_at
-        FROM characters
-        ORDER BY character
-    ''')
+    db = get_db()
+    current = refresh_analytics(db)
+    return no_store_unless(current, jsonify(analytics.query_heatmap(db, learner_id, days=days)))
 
-    characters = cursor.fetchall()
-    db.close()
+def current_snapshot():
+    """报表使用的当前快照：返回 (快照, None)，不可用时返回 (None, 错误响应)"""
+    try:
+        current = snapshot.get_snapshot(current_app)
+    except RuntimeError as e:
+        return None, (jsonify({'error': str(e)}), 503)
+    if current is None:
+        return None, (jsonify({'error': '还没有学习记录快照，请先执行 python3 snapshot.py build'}), 404)
+    return current, None
+
+@api.route('/api/reports/difficulty', methods=['GET'])
+def get_difficulty_report():
+    """全体学习者的难字排行（读取学习记录快照）：?min_reviews=N 至少作答 N 次，?limit=N 最多返回的条数"""
+    min_reviews = request.args.get('min_reviews', 1, type=int)
+    try:
+        limit = parse_limit(request.args.get('limit'), MAX_PAGE_SIZE) or reports.DEFAULT_DIFFICULTY_LIMIT
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    current, error = current_snapshot()
+    if error:
+        return error
+    return jsonify({
+        'snapshot': reports.describe(current),
+        'characters': reports.difficulty(current, min_reviews=min_reviews, limit=limit),
+    })
 
-    # 创建Excel工作簿
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "汉字库"
-
-    # 设置表头
-    headers = ['汉字', '拼音', '释义', '组词', '造句', '认识次数', '是否已掌握', '创建时间', '更新时间']
-    ws.append(headers)
-
-    # 设置表头样式
-    from openpyxl.styles import Font, PatternFill, Alignment
-    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-
-    for cell in ws[1]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-
-    # 写入数据
-    for char in characters:
-        ws.append([
-            char['character'],
-            char['pinyin'] or '',
-            char['definition'] or '',
-            char['words'] or '',
-            char['sentences'] or '',
-            char['recognition_count'],
-            '是' if char['is_mastered'] else '否',
-            char['created_at'],
-            char['updated_at']
-        ])
-
-    # 调整列宽
-    ws.column_dimensions['A'].width = 8  # 汉字
-    ws.column_dimensions['B'].width = 15  # 拼音
-    ws.column_dimensions['C'].width = 30  # 释义
-    ws.column_dimensions['D'].width = 40  # 组词
-    ws.column_dimensions['E'].width = 50  # 造句
-    ws.column_dimensions['F'].width = 10  # 认识次数
-    ws.column_dimensions['G'].width = 12  # 是否已掌握
-    ws.column_dimensions['H'].width = 20  # 创建时间
-    ws.column_dimensions['I'].width = 20  # 更新时间
-
-    # 保存到内存
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
+@api.route('/api/reports/learners', methods=['GET'])
+def get_learners_report():
+    """学习者作答次数、错误率的分布（?bins=N 个区间，默认 10）"""
+    bins = request.args.get('bins', reports.DEFAULT_HISTOGRAM_BINS, type=int)
+    if not 1 <= bins <= reports.MAX_HISTOGRAM_BINS:
+        return jsonify({'error': f'bins 需在 1 到 {reports.MAX_HISTOGRAM_BINS} 之间'}), 400
+    current, error = current_snapshot()
+    if error:
+        return error
+    return jsonify({'snapshot': reports.describe(current), **reports.learners(current, bins=bins)})
+
+@api.route('/api/reports/retention', methods=['GET'])
+def get_retention_report():
+    """按首次作答分批的留存：每 ?window=N 天（默认 7）为一期，统计 ?periods=N 期（默认 8）"""
+    window = request.args.get('window', reports.DEFAULT_RETENTION_WINDOW, type=int)
+    periods = request.args.get('periods', reports.DEFAULT_RETENTION_PERIODS, type=int)
+    if not 1 <= window <= reports.MAX_RETENTION_WINDOW:
+        return jsonify({'error': f'window 需在 1 到 {reports.MAX_RETENTION_WINDOW} 之间'}), 400
+    if not 1 <= periods <= reports.MAX_RETENTION_PERIODS:
+        return jsonify({'error': f'periods 需在 1 到 {reports.MAX_RETENTION_PERIODS} 之间'}), 400
+    current, error = current_snapshot()
+    if error:
+        return error
+    return jsonify({
+        'snapshot': reports.describe(current),
+        'window': window,
+        'cohorts': reports.retention_report(current, window=window, periods=periods),
+    })
+
+@api.route('/api/characters/export', methods=['GET'])
+def export_characters_excel():
+    """导出汉字库（?format=xlsx|csv|jsonl，默认 Excel）"""
+    export_format = request.args.get('format', 'xlsx').lower()
+    if export_format not in exporter.FORMATS:
+        return jsonify({'error': f'不支持的导出格式: {export_format}'}), 400
+
+    mimetype, extension = exporter.FORMATS[export_format]
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
 
     # 生成文件名（包含时间戳）
-    filename = f"汉字库导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    filename = f"汉字库导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+    if is_async_request():
+        # 后台生成文件，完成后通过 /api/jobs/<id>/download 下载
+        manager = jobs.get_manager(current_app)
+        job_id = uuid.uuid4().hex
+        job = manager.submit(
+            'export',
+            {'format': export_format, 'filename': filename, 'batch_size': batch_size},
+            output_path=manager.path_for(job_id, f'.{extension}'),
+            job_id=job_id
+        )
+        return jsonify(job), 202
 
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
+    db = get_db()
+    batches = exporter.iter_batches(db, batch_size)
+
+    if export_format == 'xlsx':
+        # 只写模式写入临时文件，内存中不保留整个工作簿
+        output = tempfile.TemporaryFile()
+        exporter.write_xlsx(batches, output)
+        output.seek(0)
+        return send_file(
+            output,
+            as_attachment=True,
+            download_name=filename,
+            mimetype=mimetype
+        )
 
-@app.route('/api/characters/import', methods=['POST'])
+    chunks = exporter.iter_csv(batches) if export_format == 'csv' else exporter.iter_jsonl(batches)
+    response = Response(stream_with_context(chunks), content_type=mimetype)
+    response.headers['Content-Disposition'] = exporter.content_disposition(filename)
+    return response
+
+@api.route('/api/characters/import', methods=['POST'])
 def import_characters_excel():
-    """从Excel文件导入汉字库"""
+    """从 Excel / CSV / TSV 文件导入汉字库"""
     if 'file' not in request.files:
         return jsonify({'error': '请上传Excel文件'}), 400
 
@@ -536,88 +851,83 @@ def import_characters_excel():
     if file.filename == '':
         return jsonify({'error': '请上传Excel文件'}), 400
 
-    if not file.filename.endswith(('.xlsx', '.xls')):
-        return jsonify({'error': '请上传Excel文件格式'}), 400
+    if not importer.is_supported(file.filename):
+        return jsonify({'error': '请上传 .xlsx、.csv 或 .tsv 格式的文件'}), 400
+
+    batch_size = current_app.config['IMPORT_BATCH_SIZE']
+
+    if is_async_request():
+        # 先把上传的文件保存下来，由后台任务导入
+        manager = jobs.get_manager(current_app)
+        job_id = uuid.uuid4().hex
+        input_path = manager.path_for(job_id, os.path.splitext(file.filename.lower())[1])
+        file.save(input_path)
+        job = manager.submit(
+            'import',
+            {'filename': file.filename, 'batch_size': batch_size},
+            input_path=input_path,
+            job_id=job_id
+        )
+        return jsonify(job), 202
 
+    db = get_db()
     try:
-        # 加载Excel文件
-        wb = load_workbook(filename=file)
-        ws = wb.active
-
-        db = get_db()
-        cursor = db.cursor()
-
-        success_count = 0
-        update_count = 0
-        skip_count = 0
-        error_list = []
-
-        # 跳过表头，从第二行开始
-        for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-            if not row or not row[0]:
-                continue
-
-            try:
-                # 解析行数据
-                # 格式: [汉字, 拼音, 释义, 组词, 造句, 认识次数, 是否已掌握, 创建时间, 更新时间]
-                character = str(row[0]).strip()
-
-                if not character:
-                    continue
-
-                pinyin = str(row[1]).strip() if len(row) > 1 and row[1] else None
-                definition = str(row[2]).strip() if len(row) > 2 and row[2] else None
-                words = str(row[3]).strip() if len(row) > 3 and row[3] else None
-                sentences = str(row[4]).strip() if len(row) > 4 and row[4] else None
-                recognition_count = int(row[5]) if len(row) > 5 and row[5] is not None else 0
-                is_mastered_str = str(row[6]).strip() if len(row) > 6 and row[6] else '否'
-                is_mastered = 1 if is_mastered_str in ['是', 'Yes', 'TRUE', '1', 'true'] else 0
-
-                # 检查汉字是否存在
-                cursor.execute('SELECT id FROM characters WHERE character = ?', (character,))
-                existing = cursor.fetchone()
-
-                if existing:
-                    # 更新现有汉字
-                    cursor.execute('''
-                        UPDATE characters
-                        SET pinyin = ?, definition = ?, words = ?, sentences = ?,
-                            recognition_count = ?, is_mastered = ?, updated_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    ''', (pinyin, definition, words, sentences, recognition_count, is_mastered, existing['id']))
-                    update_count += 1
-                else:
-                    # 插入新汉字
-                    cursor.execute('''
-                        INSERT INTO characters
-                        (character, pinyin, definition, words, sentences, recognition_count, is_mastered)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                    ''', (character, pinyin, definition, words, sentences, recognition_count, is_mastered))
-                    success_count += 1
-
-            except Exception as e:
-                skip_count += 1
-                error_list.append(f'第{idx}行: {str(e)}')
-
-        db.commit()
-        db.close()
-
-        return jsonify({
-            'success': success_count,
-            'updated': update_count,
-            'skipped': skip_count,
-            'errors': error_list[:10]  # 只返回前10个错误
-        }), 201
-
+        result = importer.import_rows(
+            db,
+            importer.iter_rows(file.stream, file.filename),
+            batch_size=batch_size
+        )
     except Exception as e:
         return jsonify({'error': f'文件处理失败: {str(e)}'}), 400
 
+    return jsonify(result), 201
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询后台任务的状态和进度"""
+    job = jobs.find_job(get_db(), job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在'}), 404
+    return jsonify(jobs.to_dict(job))
+
+@api.route('/api/jobs/<job_id>/download', methods=['GET'])
+def download_job_result(job_id):
+    """下载导出任务生成的文件"""
+    job = jobs.find_job(get_db(), job_id)
+    if job is None or job['kind'] != 'export':
+        return jsonify({'error': '任务不存在'}), 404
+    if job['status'] != jobs.SUCCEEDED:
+        return jsonify({'error': '任务尚未完成'}), 409
+    if not os.path.exists(job['output_path']):
+        return jsonify({'error': '导出文件已被删除'}), 404
+
+    params = jobs.to_dict(job)['params']
+    mimetype = exporter.FORMATS[params['format']][0]
+    return send_file(
+        os.path.abspath(job['output_path']),
+        as_attachment=True,
+        download_name=params['filename'],
+        mimetype=mimetype
+    )
+
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 文本格式的请求耗时、SQL 和响应大小指标"""
+    collected = metrics.get_metrics()
+    if not collected.enabled:
+        return jsonify({'error': '未开启指标统计'}), 404
+    return Response(metrics.render(collected.collect()), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
+    # 开发服务器（单进程、自动重载），生产环境请使用 gunicorn -c gunicorn.conf.py wsgi:app
+    config = get_config()
+
     # 初始化数据库
-    if not os.path.exists(DATABASE):
-        init_db()
+    if not os.path.exists(config.DATABASE):
+        init_db(config.DATABASE)
         print('数据库初始化完成！')
 
-    print('后端服务启动在 http://localhost:5000')
-    print('局域网访问地址：http://<本机IP>:5000')
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    app = create_app(config)
+    print(f"后端服务启动在 http://localhost:{app.config['PORT']}")
+    print(f"局域网访问地址：http://<本机IP>:{app.config['PORT']}")
+    app.run(debug=app.config['DEBUG'], host=app.config['HOST'], port=app.config['PORT'])
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学习记录归档
+
+learning_records 每次作答一行，只增不减。统计和错题接口读取的是触发器维护的汇总表，
+但原始记录仍然留在表里，表和索引随年份和学习者数量一直增长。
+
+这里按月（本地时间）归档：保留最近 ARCHIVE_KEEP_MONTHS 个月（含本月）的原始记录，
+更早的月份
+- 原始记录写入 ARCHIVE_DIR 下的压缩文件（learning_records-年-月-首个id.csv.gz），
+  文件列表记在 record_archives 表中
+- 按 (学习者, 字, 天) 汇总到 record_rollups，之后重建或校验统计、错题集时
+  与 learning_records 一起作为原始数据
+- 从 learning_records 中删除。删除时暂停维护按天统计的触发器，汇总表保持不变
+
+每个月一个事务，中途失败不会留下只归档了一半的月份。建议用定时任务执行：
+    python3 archive.py run                 # 按配置归档
+    python3 archive.py run --keep-months 6
+    python3 archive.py list                # 已归档的文件
+"""
+
+import argparse
+import csv
+import datetime
+import gzip
+import heapq
+import itertools
+import operator
+import os
+import sqlite3
+import time
+
+from config import Config
+from db import connect, paused_triggers
+import httpcache
+import records
+
+FILE_PREFIX = 'learning_records'
+
+# 归档文件的列（即 learning_records 的列）
+COLUMNS = ('id', 'learner_id', 'character_id', 'recognized', 'recorded_at')
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS record_rollups (
+        learner_id INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        recognized_count INTEGER NOT NULL DEFAULT 0,
+        mistake_count INTEGER NOT NULL DEFAULT 0,
+        last_recognized_at INTEGER,
+        last_mistake_at INTEGER,
+        PRIMARY KEY (learner_id, character_id, day)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_record_rollups_character
+    ON record_rollups(character_id)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS record_archives (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        month TEXT NOT NULL,
+        path TEXT NOT NULL,
+        record_count INTEGER NOT NULL,
+        first_record_id INTEGER NOT NULL,
+        last_record_id INTEGER NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    # 删除汉字时与原始记录一样删除它的汇总，并从按天统计中扣除
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_archive_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM record_rollups WHERE character_id = OLD.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_archive_rollups_delete
+    AFTER DELETE ON record_rollups
+    BEGIN
+        UPDATE daily_stats SET
+            review_count = review_count - OLD.review_count,
+            recognized_count = recognized_count - OLD.recognized_count
+        WHERE learner_id = OLD.learner_id AND day = OLD.day;
+    END
+    ''',
+]
+
+# 归档时暂停的触发器：按天统计、学习分析已经包含这些记录，删除原始记录时不能扣除；
+# 版本号在事务结束前加一次
+PAUSED_TRIGGERS = (
+    'trg_stats_records_delete', 'trg_counter_learning_records_delete', 'trg_analytics_records_delete',
+)
+
+ROLLUP_SQL = '''
+    INSERT INTO record_rollups
+        (learner_id, character_id, day, review_count, recognized_count, mistake_count,
+         last_recognized_at, last_mistake_at)
+    SELECT learner_id, character_id, day,
+           COUNT(*),
+           SUM(IFNULL(recognized = 1, 0)),
+           SUM(IFNULL(recognized = 0, 0)),
+           MAX(CASE WHEN recognized = 1 THEN recorded_at END),
+           MAX(CASE WHEN recognized = 0 THEN recorded_at END)
+    FROM learning_records
+    WHERE recorded_at >= ? AND recorded_at < ?
+    GROUP BY learner_id, character_id, day
+    ON CONFLICT(learner_id, character_id, day) DO UPDATE SET
+        review_count = review_count + excluded.review_count,
+        recognized_count = recognized_count + excluded.recognized_count,
+        mistake_count = mistake_count + excluded.mistake_count,
+        last_recognized_at = COALESCE(
+            MAX(last_recognized_at, excluded.last_recognized_at),
+            last_recognized_at,
+            excluded.last_recognized_at
+        ),
+        last_mistake_at = COALESCE(
+            MAX(last_mistake_at, excluded.last_mistake_at),
+            last_mistake_at,
+            excluded.last_mistake_at
+        )
+'''
+
+# 汇总表按原始数据重建和校验时，与 learning_records 中的记录合并计算（stats.py、mistakes.py）
+ROLLUP_DAILY_STATS_SQL = '''
+    SELECT learner_id, day, SUM(review_count) AS review_count, SUM(recognized_count) AS recognized_count
+    FROM record_rollups
+    GROUP BY learner_id, day
+'''
+
+ROLLUP_DAILY_RECOGNIZED_SQL = '''
+    SELECT learner_id, day, character_id, last_recognized_at AS last_recorded_at
+    FROM record_rollups
+    WHERE recognized_count > 0
+'''
+
+ROLLUP_MISTAKES_SQL = '''
+    SELECT r.learner_id, r.character_id, r.mistake_count, r.last_mistake_at, r.recognized_count > 0
+    FROM record_rollups r
+    JOIN characters c ON c.id = r.character_id
+'''
+
+
+def has_rollups(db):
+    """数据库是否已经有 record_rollups（版本 13 之前的数据库还没有）"""
+    return db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'record_rollups'"
+    ).fetchone() is not None
+
+
+def _epoch(moment):
+    """本地时间的 datetime 转成 learning_records.recorded_at 的时间戳"""
+    return int(time.mktime(moment.timetuple()))
+
+
+def _next_month(month):
+    return (month.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def month_range(month):
+    """某月（本地时间的 datetime.date，1 日）的 recorded_at 范围 [开始, 结束)"""
+    start = datetime.datetime.combine(month, datetime.time())
+    end = datetime.datetime.combine(_next_month(month), datetime.time())
+    return _epoch(start), _epoch(end)
+
+
+def cutoff_month(keep_months, today=None):
+    """保留 keep_months 个月（含本月）时，第一个不归档的月份"""
+    month = (today or datetime.date.today()).replace(day=1)
+    for _ in range(max(keep_months, 1) - 1):
+        month = (month - datetime.timedelta(days=1)).replace(day=1)
+    return month
+
+
+def pending_months(db, keep_months, today=None):
+    """需要归档的月份（从最早的记录所在月份到保留范围之前）"""
+    cutoff = cutoff_month(keep_months, today)
+    oldest = db.execute(
+        'SELECT MIN(recorded_at) FROM learning_records WHERE recorded_at < ?',
+        (month_range(cutoff)[0],)
+    ).fetchone()[0]
+    if oldest is None:
+        return []
+    month = datetime.date.fromtimestamp(oldest).replace(day=1)
+    months = []
+    while month < cutoff:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def _write_file(path, rows):
+    """写入压缩的 CSV（先写临时文件，完整写完后替换）"""
+    temporary = f'{path}.tmp'
+    with gzip.open(temporary, 'wt', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+    os.replace(temporary, path)
+
+
+def archive_month(db, month, directory):
+    """归档一个月的原始记录，返回归档的记录数（该月没有记录时为 0）"""
+    # analytics 依赖本模块，在这里导入
+    import analytics
+
+    start, end = month_range(month)
+    if not db.in_transaction:
+        db.execute('BEGIN IMMEDIATE')
+    try:
+        # 学习分析只回放新增的记录，删除前先把还没回放的计入汇总
+        analytics.refresh(db)
+        rows = [tuple(row) for row in db.execute(f'''
+            SELECT {', '.join(COLUMNS)} FROM learning_records
+            WHERE recorded_at >= ? AND recorded_at < ?
+            ORDER BY id
+        ''', (start, end))]
+        if not rows:
+            db.commit()
+            return 0
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{FILE_PREFIX}-{month:%Y-%m}-{rows[0][0]}.csv.gz')
+        _write_file(path, rows)
+
+        db.execute(ROLLUP_SQL, (start, end))
+        with paused_triggers(db, PAUSED_TRIGGERS):
+            db.execute('DELETE FROM learning_records WHERE recorded_at >= ? AND recorded_at < ?', (start, end))
+        httpcache.bump(db, 'learning_records')
+        db.execute('''
+            INSERT INTO record_archives (month, path, record_count, first_record_id, last_record_id)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (f'{month:%Y-%m}', path, len(rows), rows[0][0], rows[-1][0]))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(rows)
+
+
+def archive(db, keep_months=None, directory=None, today=None):
+    """归档保留范围之前的全部月份，返回 [(月份, 记录数)]"""
+    if keep_months is None:
+        keep_months = Config.ARCHIVE_KEEP_MONTHS
+    if directory is None:
+        directory = Config.ARCHIVE_DIR
+    archived = []
+    for month in pending_months(db, keep_months, today):
+        count = archive_month(db, month, directory)
+        if count:
+            archived.append((f'{month:%Y-%m}', count))
+    return archived
+
+
+def list_archives(db):
+    return [dict(row) for row in db.execute('SELECT * FROM record_archives ORDER BY first_record_id')]
+
+
+def _read_archive(path):
+    """读取一个归档文件，返回 (id, learner_id, character_id, recognized, recorded_at)"""
+    with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        next(reader)
+        for record_id, learner_id, character_id, recognized, recorded_at in reader:
+            yield (
+                int(record_id),
+                int(learner_id),
+                int(character_id),
+                int(recognized) if recognized != '' else None,
+                records.parse_timestamp(recorded_at),
+            )
+
+
+def iter_records(db):
+    """按 id 顺序读取全部学习记录（归档文件和 learning_records）
+
+    返回 (learner_id, character_id, recognized, recorded_at)，recorded_at 为时间戳
+    （版本 14 之前归档的文件中是文本时间，读取时转换）。归档文件缺失时抛出 FileNotFoundError。
+
+    补录到已归档月份的记录会在之后再次归档为同一个月的另一个文件，它的 id 比
+    learning_records 中较新月份的记录大，所以各文件和 learning_records 的 id 范围可能交错：
+    不交错时依次读取，否则按 id 归并。
+    """
+    archives = list_archives(db) if has_rollups(db) else []
+    live = db.execute(
+        'SELECT id, learner_id, character_id, recognized, recorded_at FROM learning_records ORDER BY id'
+    )
+    first_live_id = db.execute('SELECT MIN(id) FROM learning_records').fetchone()[0]
+    bounds = [(row['first_record_id'], row['last_record_id']) for row in archives]
+    if first_live_id is not None:
+        bounds.append((first_live_id, first_live_id))
+    sources = [_read_archive(row['path']) for row in archives] + [live]
+    if all(previous[1] < following[0] for previous, following in zip(bounds, bounds[1:])):
+        rows = itertools.chain.from_iterable(sources)
+    else:
+        rows = heapq.merge(*sources, key=operator.itemgetter(0))
+    for _, learner_id, character_id, recognized, recorded_at in rows:
+        yield learner_id, character_id, recognized, recorded_at
+
+
+def main():
+    parser = argparse.ArgumentParser(description='学习记录归档工具')
+    parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='归档保留范围之前的学习记录')
+    run_parser.add_argument('--keep-months', type=int, default=Config.ARCHIVE_KEEP_MONTHS,
+                            help='保留最近几个月（含本月）的原始记录')
+    run_parser.add_argument('--dir', default=Config.ARCHIVE_DIR, help='归档文件目录')
+    subparsers.add_parser('list', help='列出已归档的文件')
+    args = parser.parse_args()
+
+    # migrations 依赖本模块，在这里导入
+    from migrations import migrate
+
+    db = connect(args.db)
+    try:
+        migrate(db)
+        if args.command == 'run':
+            start = time.perf_counter()
+            archived = archive(db, args.keep_months, args.dir)
+            for month, count in archived:
+                print(f"✓ {month}: 归档 {count} 条学习记录")
+            if not archived:
+                print(f"- 没有 {args.keep_months} 个月以前的学习记录")
+            print(f"✓ 耗时 {time.perf_counter() - start:.2f} 秒")
+        else:
+            archives = list_archives(db)
+            for item in archives:
+                print(f"{item['month']}  {item['record_count']:>8} 条  {item['path']}")
+            if not archives:
+                print("- 还没有归档的学习记录")
+    except (sqlite3.Error, OSError) as e:
+        print(f"✗ 归档失败: {e}")
+        raise SystemExit(1)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
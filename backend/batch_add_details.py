@@ -4,7 +4,9 @@
 批量为汉字添加详细信息（拼音、释义、组词、造句）
 """
 
-import sqlite3
+import sys
+
+import cli
 
 # 常用汉字详细信息数据库
 character_details = {
@@ -359,39 +361,8 @@ character_details = {
 }
 
 def batch_add_details():
-    """批量添加汉字详细信息"""
-    db = sqlite3.connect('characters.db')
-    cursor = db.cursor()
-    
-    success_count = 0
-    not_found_count = 0
-    
-    for char, details in character_details.items():
-        # 查找汉字
-        cursor.execute('SELECT id FROM characters WHERE character = ?', (char,))
-        result = cursor.fetchone()
-        
-        if result:
-            char_id = result[0]
-            cursor.execute('''
-                UPDATE characters
-                SET pinyin = ?, definition = ?, words = ?, sentences = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (details['pinyin'], details['definition'], details['words'], details['sentences'], char_id))
-            
-            success_count += 1
-            print(f"✓ 更新汉字 '{char}' 的详细信息")
-        else:
-            not_found_count += 1
-            print(f"✗ 汉字 '{char}' 不存在")
-    
-    db.commit()
-    db.close()
-    
-    print(f"\n完成！")
-    print(f"成功更新: {success_count} 个")
-    print(f"未找到: {not_found_count} 个")
-    print(f"总计处理: {len(character_details)} 个汉字")
+    """批量添加汉字详细信息（等同于 learnword details apply batch_add_details --overwrite）"""
+    cli.main(['details', 'apply', 'batch_add_details', '--overwrite'] + sys.argv[1:])
 
 if __name__ == '__main__':
     batch_add_details()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+学习分析基准测试：每次请求直接在学习记录上计算（分组统计、按学习者回放）
+与读取分析汇总表（/api/analytics/*）的耗时，以及首次回放和作答后增量回放的耗时
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.analytics --learners 10 --records 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import Timer, create_database, load_app
+from benchmarks.timestamps import add_records
+from db import connect
+import analytics
+import scheduler
+
+# 不用汇总表时的做法：每次请求在该学习者的全部学习记录上计算
+ADHOC_CHARACTERS_SQL = '''
+    SELECT character_id, COUNT(*) AS review_count, SUM(recognized = 0) AS mistake_count,
+           1.0 * SUM(recognized = 0) / COUNT(*) AS error_rate
+    FROM learning_records
+    WHERE learner_id = ?
+    GROUP BY character_id
+    ORDER BY error_rate DESC, mistake_count DESC
+    LIMIT 50
+'''
+
+ADHOC_HEATMAP_SQL = '''
+    SELECT strftime('%w', recorded_at, 'unixepoch', 'localtime') AS weekday,
+           strftime('%H', recorded_at, 'unixepoch', 'localtime') AS hour,
+           COUNT(*), SUM(recognized = 1)
+    FROM learning_records
+    WHERE learner_id = ? AND recorded_at >= ?
+    GROUP BY weekday, hour
+'''
+
+
+def adhoc_summary(db, learner_id, policy):
+    """掌握用时、回退次数需要按顺序回放该学习者的全部学习记录"""
+    items = {}
+    analytics.replay(
+        db.execute(
+            'SELECT learner_id, character_id, recognized, recorded_at FROM learning_records '
+            'WHERE learner_id = ? ORDER BY id', (learner_id,)
+        ),
+        policy, items, {}
+    )
+    return items
+
+
+def measure_adhoc(database, learners, requests, rng):
+    db = connect(database)
+    policy = scheduler.get_scheduler('legacy')
+    since = int(time.time()) - analytics.DEFAULT_HEATMAP_DAYS * 24 * 60 * 60
+    tasks = (
+        ('summary', lambda learner: adhoc_summary(db, learner, policy)),
+        ('characters', lambda learner: db.execute(ADHOC_CHARACTERS_SQL, (learner,)).fetchall()),
+        ('heatmap', lambda learner: db.execute(ADHOC_HEATMAP_SQL, (learner, since)).fetchall()),
+    )
+    result = {}
+    for name, task in tasks:
+        with Timer() as timer:
+            for _ in range(requests):
+                task(rng.randint(1, learners))
+        result[name] = timer.elapsed / requests * 1000
+    db.close()
+    return result
+
+
+def measure_routes(client, learners, requests, rng):
+    urls = (
+        ('summary', '/api/analytics/summary?learner_id={learner}'),
+        ('characters', '/api/analytics/characters?limit=50&learner_id={learner}'),
+        ('heatmap', '/api/analytics/heatmap?learner_id={learner}'),
+    )
+    result = {}
+    for name, template in urls:
+        with Timer() as timer:
+            for _ in range(requests):
+                response = client.get(template.format(learner=rng.randint(1, learners)))
+                assert response.status_code == 200, response.status_code
+        result[name] = timer.elapsed / requests * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='学习分析基准测试')
+    parser.add_argument('--learners', type=int, default=10)
+    parser.add_argument('--characters', type=int, default=3000)
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--requests', type=int, default=100, help='每个接口的请求次数')
+    parser.add_argument('--marks', type=int, default=100, help='增量回放前新增的作答数')
+    args = parser.parse_args()
+
+    os.environ['LEARNWORD_HTTP_CACHE_ENABLED'] = 'false'
+    os.environ['LEARNWORD_SCHEDULER'] = 'legacy'
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters)
+        db = connect(database)
+        db.executemany('INSERT INTO learners (name) VALUES (?)', ((f'学习者{i}',) for i in range(2, args.learners + 1)))
+        db.commit()
+        db.close()
+        with Timer() as timer:
+            add_records(database, args.records, args.learners, args.characters, rng)
+        print(f'{args.learners} 个学习者、{args.records} 条学习记录  写入 {timer.elapsed:.1f} s')
+
+        # 写入时暂停了触发器，分析汇总还停在水位 0：第一次回放处理全部记录
+        db = connect(database)
+        with Timer() as timer:
+            count = analytics.refresh(db, scheduler.get_scheduler('legacy'))
+        db.close()
+        print(f'首次回放 {count} 条学习记录  {timer.elapsed:.1f} s\n')
+
+        adhoc = measure_adhoc(database, args.learners, max(args.requests // 10, 1), random.Random(1))
+        client = load_app(database).test_client()
+        routes = measure_routes(client, args.learners, args.requests, random.Random(1))
+
+        print(f'{"":<12}{"直接计算":>10}{"汇总表":>12}')
+        for name in ('summary', 'characters', 'heatmap'):
+            print(f'{name:<12}{adhoc[name]:>9.1f} ms{routes[name]:>9.2f} ms   {adhoc[name] / routes[name]:7.0f}x')
+
+        for _ in range(args.marks):
+            response = client.post(
+                f'/api/characters/{rng.randint(1, args.characters)}/mark?learner_id=1',
+                json={'recognized': rng.random() < 0.7}
+            )
+            assert response.status_code == 200
+        with Timer() as timer:
+            client.get('/api/analytics/summary')
+        print(f'\n新增 {args.marks} 次作答后第一次读取（增量回放）  {timer.elapsed * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+学习记录归档基准测试：多年、多学习者的学习记录在归档前后，
+作答、最近记录、统计、错题接口的耗时，learning_records 的行数和数据库大小；
+最后补录一批已归档月份的记录再次归档，核对学习分析与从头回放（按 id 顺序）的结果一致
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.archive --learners 100 --months 36 --records 1000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.common import Timer, create_database, load_app
+import analytics
+import archive
+from db import connect
+from records import local_day
+
+ROUTES = (
+    ('mark', 'POST', '/api/characters/{character}/mark?learner_id={learner}'),
+    ('recent', 'GET', '/api/records/recent?limit=20&learner_id={learner}'),
+    ('stats', 'GET', '/api/stats?learner_id={learner}'),
+    ('mistakes', 'GET', '/api/mistakes?limit=50&learner_id={learner}'),
+)
+
+
+def add_history(path, learners, characters, records, months, seed=42):
+    """添加学习者，写入均匀分布在最近 months 个月内的学习记录（按时间顺序）"""
+    rng = random.Random(seed)
+    db = sqlite3.connect(path)
+    db.executemany('INSERT INTO learners (name) VALUES (?)', ((f'学习者{i}',) for i in range(2, learners + 1)))
+    now = int(time.time())
+    moments = sorted(now - rng.randrange(months * 30 * 24 * 60 * 60) for _ in range(records))
+    db.executemany(
+        '''
+        INSERT INTO learning_records (learner_id, character_id, recognized, recorded_at, day)
+        VALUES (?, ?, ?, ?, ?)
+        ''',
+        (
+            (rng.randint(1, learners), rng.randint(1, characters), int(rng.random() < 0.7),
+             moment, local_day(moment))
+            for moment in moments
+        )
+    )
+    db.commit()
+    db.close()
+
+
+def measure(client, learners, characters, requests, rng):
+    """每个接口请求 requests 次（随机学习者），返回 {接口: 毫秒/次}"""
+    result = {}
+    for name, method, template in ROUTES:
+        with Timer() as timer:
+            for _ in range(requests):
+                url = template.format(learner=rng.randint(1, learners), character=rng.randint(1, characters))
+                if method == 'GET':
+                    response = client.get(url)
+                else:
+                    response = client.post(url, json={'recognized': rng.random() < 0.7})
+                assert response.status_code == 200, (url, response.status_code)
+        result[name] = timer.elapsed / requests * 1000
+    return result
+
+
+def check_backdated(path, directory, learners, characters, keep_months, rng, pairs=200):
+    """同一个字先在本月作答、再补录一条已归档月份的记录，再次归档后与从头回放对比，返回不一致项"""
+    db = connect(path)
+    try:
+        chosen = [(rng.randint(1, learners), rng.randint(1, characters)) for _ in range(pairs)]
+        now = int(time.time())
+        archived_start = archive.month_range(archive.cutoff_month(keep_months))[0]
+        for learner_id, character_id in chosen:
+            db.execute(
+                'INSERT INTO learning_records (learner_id, character_id, recognized, recorded_at, day) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (learner_id, character_id, int(rng.random() < 0.5), now, local_day(now))
+            )
+        db.commit()
+        analytics.refresh(db)
+        for learner_id, character_id in chosen:
+            moment = archived_start - rng.randrange(1, 60 * 24 * 60 * 60)
+            db.execute(
+                'INSERT INTO learning_records (learner_id, character_id, recognized, recorded_at, day) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (learner_id, character_id, int(rng.random() < 0.5), moment, local_day(moment))
+            )
+        db.commit()
+        archive.archive(db, keep_months, directory)
+        return analytics.check(db)
+    finally:
+        db.close()
+
+
+def table_size(path):
+    db = sqlite3.connect(path)
+    db.execute('VACUUM')
+    rows = db.execute('SELECT COUNT(*) FROM learning_records').fetchone()[0]
+    db.close()
+    return rows, os.path.getsize(path) / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='学习记录归档基准测试')
+    parser.add_argument('--learners', type=int, default=100)
+    parser.add_argument('--characters', type=int, default=3000)
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--months', type=int, default=36, help='学习记录分布在最近几个月内')
+    parser.add_argument('--keep-months', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=300, help='每个接口的请求次数')
+    args = parser.parse_args()
+
+    os.environ['LEARNWORD_HTTP_CACHE_ENABLED'] = 'false'
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters)
+        with Timer() as timer:
+            add_history(database, args.learners, args.characters, args.records, args.months)
+        print(f'{args.learners} 个学习者、{args.months} 个月共 {args.records} 条学习记录  写入 {timer.elapsed:.1f} s\n')
+
+        client = load_app(database).test_client()
+        before_rows, before_size = table_size(database)
+        before = measure(client, args.learners, args.characters, args.requests, random.Random(1))
+
+        db = sqlite3.connect(database)
+        with Timer() as timer:
+            archived = archive.archive(db, args.keep_months, os.path.join(tmp, 'archive'))
+        db.close()
+        files = sum(
+            os.path.getsize(os.path.join(tmp, 'archive', name)) for name in os.listdir(os.path.join(tmp, 'archive'))
+        ) / 1024 / 1024
+        print(f'归档 {len(archived)} 个月、{sum(count for _, count in archived)} 条记录  '
+              f'{timer.elapsed:.1f} s  压缩文件 {files:.1f} MiB\n')
+
+        after_rows, after_size = table_size(database)
+        after = measure(client, args.learners, args.characters, args.requests, random.Random(1))
+
+        print(f'{"":<12}{"归档前":>12}{"归档后":>12}')
+        print(f'{"记录行数":<10}{before_rows:>14}{after_rows:>14}')
+        print(f'{"数据库":<11}{before_size:>11.1f} MiB{after_size:>10.1f} MiB')
+        for name, _, _ in ROUTES:
+            print(f'{name:<12}{before[name]:>9.2f} ms{after[name]:>9.2f} ms   {after[name] / before[name]:5.2f}x')
+
+        problems = check_backdated(database, os.path.join(tmp, 'archive'), args.learners, args.characters,
+                                   args.keep_months, random.Random(2))
+        for problem in problems:
+            print(f'✗ {problem}')
+        if problems:
+            raise SystemExit(1)
+        print('\n✓ 补录已归档月份的记录再次归档后，学习分析与从头回放一致')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试公共工具：生成测试数据库、加载应用、计时
+"""
+
+import importlib
+import os
+import random
+import sqlite3
+import time
+
+import migrations
+
+CJK_START = 0x4e00
+CJK_COUNT = 0x9fff - 0x4e00 + 1
+
+
+def make_character(index):
+    """生成第 index 个测试用汉字，超出基本区后加数字后缀保证唯一"""
+    char = chr(CJK_START + index % CJK_COUNT)
+    if index >= CJK_COUNT:
+        char += str(index // CJK_COUNT)
+    return char
+
+
+SAMPLE_DETAILS = (
+    'hàn',
+    '1. 汉族，中国主要民族。\n2. 汉朝，中国古代朝代名。\n3. 男子的通称。',
+    '汉字\n汉语\n汉族\n汉朝\n好汉',
+    '汉字是世界上最古老的文字之一。\n我们要学好汉语。\n汉族是中国人口最多的民族。',
+)
+
+
+def create_database(path, characters=1000, records=0, mastered_ratio=0.3, seed=42, details=False):
+    """创建包含测试数据的数据库，details 为真时为每个字填充示例详情"""
+    if os.path.exists(path):
+        os.remove(path)
+
+    rng = random.Random(seed)
+    db = sqlite3.connect(path)
+    cursor = db.cursor()
+
+    # 先建表和索引，汇总表、触发器在数据写入后再安装（安装时一次性计算）
+    migrations.migrate(db, target=migrations.SCHEDULER_VERSION)
+
+    def character_rows():
+        for i in range(characters):
+            mastered = rng.random() < mastered_ratio
+            count = 3 if mastered else rng.choice((0, 0, 1, 2))
+            yield make_character(i), count, int(mastered)
+
+    cursor.executemany(
+        'INSERT INTO characters (character, recognition_count, is_mastered) VALUES (?, ?, ?)',
+        character_rows()
+    )
+    if details:
+        cursor.execute(
+            'UPDATE characters SET pinyin = ?, definition = ?, words = ?, sentences = ?',
+            SAMPLE_DETAILS
+        )
+
+    def record_rows():
+        for _ in range(records):
+            yield rng.randint(1, characters), int(rng.random() < 0.7)
+
+    if records and characters:
+        cursor.executemany(
+            'INSERT INTO learning_records (character_id, recognized) VALUES (?, ?)',
+            record_rows()
+        )
+
+    db.commit()
+    migrations.migrate(db)
+    db.close()
+
+
+def load_app(database):
+    """以指定数据库加载 Flask 应用"""
+    os.environ['LEARNWORD_DATABASE'] = database
+    import config
+    importlib.reload(config)
+    import app as app_module
+    app_module = importlib.reload(app_module)
+    return app_module.create_app(config.Config)
+
+
+class Timer:
+    """简单计时器"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def format_rate(count, elapsed):
+    """格式化吞吐量"""
+    return f'{count / elapsed:,.0f} req/s' if elapsed > 0 else 'n/a'
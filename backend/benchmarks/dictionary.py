@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+详情词典基准测试：打包文件的查询耗时，以及把详情写入数据库时
+逐字 SELECT + UPDATE（原来的脚本）与一次 executemany 的对比
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.dictionary --characters 20000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+
+from benchmarks.common import SAMPLE_DETAILS, Timer, create_database, make_character
+import dictionary
+
+
+def make_entries(characters):
+    """为每个字生成详情，释义带序号（内容各不相同），组词、造句共用"""
+    pinyin, definition, words, sentences = SAMPLE_DETAILS
+    for i in range(characters):
+        yield make_character(i), {
+            'pinyin': pinyin,
+            'definition': f'{definition}\n{i}',
+            'words': words,
+            'sentences': sentences,
+        }
+
+
+def write_row_by_row(db, entries):
+    """原来脚本的写法：每个字先 SELECT 出 id 再 UPDATE"""
+    cursor = db.cursor()
+    for char, details in entries:
+        cursor.execute('SELECT id FROM characters WHERE character = ?', (char,))
+        result = cursor.fetchone()
+        if result:
+            cursor.execute('''
+                UPDATE characters
+                SET pinyin = ?, definition = ?, words = ?, sentences = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (details['pinyin'], details['definition'], details['words'], details['sentences'], result[0]))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='详情词典基准测试')
+    parser.add_argument('--characters', type=int, default=20000)
+    parser.add_argument('--lookups', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'dictionary.pack')
+        with Timer() as build_timer:
+            count, _ = dictionary.build(make_entries(args.characters), path)
+        print(f'词典: {count} 个汉字  {os.path.getsize(path) / 1024 / 1024:.2f} MiB  编译 {build_timer.elapsed:.2f} s\n')
+
+        packed = dictionary.Dictionary(path)
+        rng = random.Random(7)
+        keys = [make_character(rng.randrange(args.characters)) for _ in range(args.lookups)]
+        with Timer() as lookup_timer:
+            for key in keys:
+                packed.get(key)
+        print(f'词典查询        {lookup_timer.elapsed / args.lookups * 1e6:8.2f} µs/次')
+
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters)
+        db = sqlite3.connect(database)
+        db.executemany(
+            'UPDATE characters SET pinyin = ?, definition = ?, words = ?, sentences = ? WHERE character = ?',
+            (tuple(details[field] for field in dictionary.FIELDS) + (char,) for char, details in make_entries(args.characters))
+        )
+        db.commit()
+        with Timer() as select_timer:
+            for key in keys:
+                db.execute(
+                    'SELECT pinyin, definition, words, sentences FROM characters WHERE character = ?', (key,)
+                ).fetchone()
+        print(f'数据库查询      {select_timer.elapsed / args.lookups * 1e6:8.2f} µs/次\n')
+        db.execute('UPDATE characters SET pinyin = NULL, definition = NULL, words = NULL, sentences = NULL')
+        db.commit()
+
+        with Timer() as row_timer:
+            write_row_by_row(db, packed.items())
+        db.execute('UPDATE characters SET pinyin = NULL, definition = NULL, words = NULL, sentences = NULL')
+        db.commit()
+        with Timer() as load_timer:
+            updated = dictionary.load(db, packed)
+        print(f'逐字写入        {row_timer.elapsed:8.2f} s')
+        print(f'executemany     {load_timer.elapsed:8.2f} s   {row_timer.elapsed / load_timer.elapsed:6.1f}x  ({updated} 行)')
+        db.close()
+        packed.close()
+
+
+if __name__ == '__main__':
+    main()
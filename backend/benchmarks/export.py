@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+导出基准测试：对比原来的内存工作簿导出和流式导出的峰值内存与首字节时间
+
+每种格式在独立的子进程中运行，峰值 RSS 互不影响。子进程关闭了 SQLite 的 mmap，
+避免映射进来的数据库页面被计入 RSS。
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.export --characters 500000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from benchmarks.common import create_database, load_app
+
+FORMATS = ['legacy', 'xlsx', 'csv', 'jsonl']
+
+
+def peak_rss_mb():
+    """当前进程的峰值 RSS（MB）"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def legacy_export(database):
+    """原来的实现：fetchall 后构建完整工作簿，保存到 BytesIO"""
+    from openpyxl import Workbook
+    from db import connect
+    import exporter
+
+    db = connect(database)
+    characters = db.execute(exporter.EXPORT_SQL).fetchall()
+    db.close()
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(exporter.HEADERS)
+    for char in characters:
+        ws.append(exporter.to_sheet_row(char))
+    output = BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+
+def run_worker(database, export_format):
+    """在子进程中执行一次导出，输出 JSON 结果"""
+    app = load_app(database)
+    client = app.test_client()
+    baseline = peak_rss_mb()
+
+    start = time.perf_counter()
+    if export_format == 'legacy':
+        body = legacy_export(database)
+        first_byte = time.perf_counter() - start
+        size = len(body)
+    else:
+        response = client.get(f'/api/characters/export?format={export_format}', buffered=False)
+        chunks = iter(response.response)
+        size = len(next(chunks))
+        first_byte = time.perf_counter() - start
+        for chunk in chunks:
+            size += len(chunk)
+        response.close()
+    total = time.perf_counter() - start
+
+    print(json.dumps({
+        'ttfb': first_byte,
+        'total': total,
+        'size': size,
+        'peak_rss': peak_rss_mb(),
+        'baseline_rss': baseline,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导出基准测试')
+    parser.add_argument('--characters', type=int, default=500000)
+    parser.add_argument('--formats', nargs='+', default=FORMATS, choices=FORMATS)
+    parser.add_argument('--worker', nargs=2, metavar=('DATABASE', 'FORMAT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters, details=True)
+
+        print(f'汉字数: {args.characters:,}\n')
+        print(f'{"格式":8} {"首字节":>10} {"总耗时":>10} {"大小":>10} {"峰值RSS":>10} {"增量":>10}')
+        for export_format in args.formats:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.export', '--worker', database, export_format],
+                check=True, capture_output=True, text=True,
+                env=dict(os.environ, LEARNWORD_SQLITE_MMAP_SIZE='0')
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(
+                f'{export_format:8} {result["ttfb"]:9.2f}s {result["total"]:9.2f}s '
+                f'{result["size"] / 1024 / 1024:8.1f}MB {result["peak_rss"]:8.1f}MB '
+                f'{result["peak_rss"] - result["baseline_rss"]:8.1f}MB'
+            )
+
+
+if __name__ == '__main__':
+    main()
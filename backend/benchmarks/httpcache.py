@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP 缓存基准测试：汉字列表接口在关闭缓存、命中响应缓存、条件请求 304 三种情况下的吞吐量
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.httpcache --characters 5000 --requests 200
+"""
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import Timer, create_database, format_rate, load_app
+import httpcache
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP 缓存基准测试')
+    parser.add_argument('--characters', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters, details=True)
+        app = load_app(database)
+        client = app.test_client()
+
+        def run(enabled, headers=None):
+            app.config['HTTP_CACHE_ENABLED'] = enabled
+            app.extensions.pop(httpcache.EXTENSION_KEY, None)
+            with Timer() as timer:
+                for _ in range(args.requests):
+                    response = client.get('/api/characters', headers=headers or {})
+                    assert response.status_code in (200, 304)
+            return timer.elapsed
+
+        print(f'汉字数: {args.characters}  请求数: {args.requests}\n')
+        etag = client.get('/api/characters').headers['ETag']
+        cases = [
+            ('关闭缓存', run(False)),
+            ('响应缓存', run(True)),
+            ('304 条件请求', run(True, {'If-None-Match': etag})),
+        ]
+        baseline = cases[0][1]
+        for label, elapsed in cases:
+            print(f'GET /api/characters  {label:10} {format_rate(args.requests, elapsed):>12}  '
+                  f'{baseline / elapsed:6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
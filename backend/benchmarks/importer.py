@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+导入基准测试：对比原来的逐行 SELECT + INSERT/UPDATE 与批量 UPSERT 导入
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.importer --rows 100000
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+
+from openpyxl import Workbook, load_workbook
+
+from benchmarks.common import SAMPLE_DETAILS, Timer, create_database, make_character
+from db import connect
+import exporter
+import importer
+
+
+def write_files(tmp, rows):
+    """生成测试用的 xlsx 和 csv 文件"""
+    def sheet_rows():
+        for i in range(rows):
+            yield [make_character(i), *SAMPLE_DETAILS, i % 4, '是' if i % 4 == 3 else '否', '', '']
+
+    xlsx_path = os.path.join(tmp, 'import.xlsx')
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('汉字库')
+    ws.append(exporter.HEADERS)
+    for row in sheet_rows():
+        ws.append(row)
+    wb.save(xlsx_path)
+
+    csv_path = os.path.join(tmp, 'import.csv')
+    with open(csv_path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(exporter.HEADERS)
+        writer.writerows(sheet_rows())
+
+    return xlsx_path, csv_path
+
+
+def legacy_import(db, path):
+    """原来的实现：完整载入工作簿，每行先查询再更新或插入"""
+    wb = load_workbook(filename=path)
+    ws = wb.active
+    cursor = db.cursor()
+    for row in ws.iter_rows(min_row=2, values_only=True):
+        params = importer.normalize_row(row)
+        if params is None:
+            continue
+        cursor.execute('SELECT id FROM characters WHERE character = ?', (params[0],))
+        existing = cursor.fetchone()
+        if existing:
+            cursor.execute('''
+                UPDATE characters
+                SET pinyin = ?, definition = ?, words = ?, sentences = ?,
+                    recognition_count = ?, is_mastered = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', params[1:] + (existing['id'],))
+        else:
+            cursor.execute('''
+                INSERT INTO characters
+                (character, pinyin, definition, words, sentences, recognition_count, is_mastered)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', params)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导入基准测试')
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--existing', type=int, default=None, help='数据库中已有的汉字数（默认为行数的一半）')
+    args = parser.parse_args()
+    existing = args.rows // 2 if args.existing is None else args.existing
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx_path, csv_path = write_files(tmp, args.rows)
+        print(f'导入行数: {args.rows:,}  已有汉字: {existing:,}\n')
+
+        cases = [
+            ('原实现 xlsx', lambda db: legacy_import(db, xlsx_path)),
+            ('批量 xlsx', lambda db: importer.import_rows(db, importer.iter_rows(open(xlsx_path, 'rb'), xlsx_path))),
+            ('批量 csv', lambda db: importer.import_rows(db, importer.iter_rows(open(csv_path, 'rb'), csv_path))),
+        ]
+        for name, run in cases:
+            database = os.path.join(tmp, 'bench.db')
+            create_database(database, characters=existing)
+            db = connect(database)
+            with Timer() as timer:
+                run(db)
+            count = db.execute('SELECT COUNT(*) FROM characters').fetchone()[0]
+            db.close()
+            print(f'{name:12} {timer.elapsed:8.2f}s  {args.rows / timer.elapsed:10,.0f} 行/秒  (汉字总数 {count:,})')
+
+
+if __name__ == '__main__':
+    main()
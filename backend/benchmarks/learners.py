@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+多学习者基准测试：同一个学习者的抽字、作答、统计、错题接口耗时，
+对比库中只有 1 个学习者和有 500 个学习者（共 100 万条学习记录）时的差别
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.learners --learners 500 --characters 3000 --records 1000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.common import Timer, create_database, load_app
+from records import local_day
+
+ROUTES = (
+    ('random', 'GET', '/api/characters/random?count=20&learner_id={learner}'),
+    ('mark', 'POST', '/api/characters/{character}/mark?learner_id={learner}'),
+    ('stats', 'GET', '/api/stats?learner_id={learner}'),
+    ('mistakes', 'GET', '/api/mistakes?limit=50&learner_id={learner}'),
+)
+
+# 学习记录分布在最近这么多天内
+RECORD_DAYS = 90
+
+
+def record_rows(rng, learners, characters, records, first_learner=1):
+    """随机生成 (learner_id, character_id, recognized, recorded_at, day)"""
+    now = int(time.time())
+    for _ in range(records):
+        recorded_at = now - rng.randrange(RECORD_DAYS * 24 * 60 * 60)
+        yield (
+            rng.randint(first_learner, learners),
+            rng.randint(1, characters),
+            int(rng.random() < 0.7),
+            recorded_at,
+            local_day(recorded_at),
+        )
+
+
+def add_learners(path, learners, characters, records, seed=42):
+    """添加学习者（由触发器建立进度），随机设置掌握状态并写入学习记录"""
+    rng = random.Random(seed)
+    db = sqlite3.connect(path)
+    db.executemany(
+        'INSERT INTO learners (name) VALUES (?)',
+        ((f'学习者{i}',) for i in range(2, learners + 1))
+    )
+    db.execute('''
+        UPDATE learner_progress
+        SET is_mastered = 1, recognition_count = 3, due_at = NULL
+        WHERE learner_id > 1 AND (learner_id * 7919 + character_id * 104729) % 10 < 3
+    ''')
+    db.executemany(
+        '''
+        INSERT INTO learning_records (learner_id, character_id, recognized, recorded_at, day)
+        VALUES (?, ?, ?, ?, ?)
+        ''',
+        record_rows(rng, learners, characters, records, first_learner=2)
+    )
+    db.commit()
+    db.close()
+
+
+def measure(client, learner, characters, requests, rng):
+    """每个接口请求 requests 次，返回 {接口: 毫秒/次}"""
+    result = {}
+    for name, method, template in ROUTES:
+        with Timer() as timer:
+            for _ in range(requests):
+                url = template.format(learner=learner, character=rng.randint(1, characters))
+                if method == 'GET':
+                    response = client.get(url)
+                else:
+                    response = client.post(url, json={'recognized': rng.random() < 0.7})
+                assert response.status_code == 200, (url, response.status_code)
+        result[name] = timer.elapsed / requests * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多学习者基准测试')
+    parser.add_argument('--learners', type=int, default=500)
+    parser.add_argument('--characters', type=int, default=3000)
+    parser.add_argument('--records', type=int, default=1000000, help='全部学习者的学习记录总数')
+    parser.add_argument('--requests', type=int, default=200, help='每个接口的请求次数')
+    args = parser.parse_args()
+
+    # 每个学习者平均的学习记录数，基准学习者与其他学习者相同
+    per_learner = args.records // args.learners
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters, records=per_learner)
+        app = load_app(database)
+        client = app.test_client()
+
+        print(f'汉字数: {args.characters}  每个学习者的学习记录: {per_learner}  每个接口请求: {args.requests} 次\n')
+        single = measure(client, 1, args.characters, args.requests, random.Random(1))
+
+        with Timer() as timer:
+            add_learners(database, args.learners, args.characters, args.records - per_learner)
+        progress = sqlite3.connect(database).execute('SELECT COUNT(*) FROM learner_progress').fetchone()[0]
+        print(f'添加 {args.learners - 1} 个学习者: {progress} 行进度  {timer.elapsed:.1f} s\n')
+
+        many = measure(client, 1, args.characters, args.requests, random.Random(1))
+        other = measure(client, args.learners // 2, args.characters, args.requests, random.Random(1))
+
+        print(f'{"接口":<10}{"1 个学习者":>14}{f"{args.learners} 个学习者":>16}{"其他学习者":>14}')
+        for name, _, _ in ROUTES:
+            print(
+                f'{name:<10}{single[name]:>11.2f} ms{many[name]:>13.2f} ms{other[name]:>11.2f} ms'
+                f'   {many[name] / single[name]:5.2f}x'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+压力测试：用 gunicorn 以不同的工作进程数启动生产服务，测量吞吐量随进程数的变化
+
+每轮启动一组 gunicorn 进程，客户端线程按比例混合发送
+随机取字、统计、标记请求，持续 --duration 秒。
+
+用法（在 backend 目录下，需要安装 gunicorn）：
+    python3 -m benchmarks.load --workers 1 2 4 --threads 4 --clients 16
+"""
+
+import argparse
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.common import create_database, format_rate
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (权重, 方法, 路径)
+REQUEST_MIX = [
+    (6, 'GET', lambda rng, n: '/api/characters/random'),
+    (2, 'GET', lambda rng, n: '/api/stats'),
+    (2, 'POST', lambda rng, n: f'/api/characters/{rng.randint(1, n)}/mark'),
+]
+
+
+def free_port():
+    """向系统申请一个空闲端口"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port, timeout=30):
+    """等待服务开始接受请求"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/stats')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('服务启动超时')
+
+
+def start_server(database, port, workers, threads):
+    """启动 gunicorn 生产服务"""
+    env = dict(os.environ, LEARNWORD_DATABASE=database, LEARNWORD_JOBS_DIR=os.path.dirname(database))
+    return subprocess.Popen(
+        [
+            sys.executable, '-m', 'gunicorn',
+            '-c', 'gunicorn.conf.py',
+            '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers),
+            '--threads', str(threads),
+            '--access-logfile', os.devnull,
+            'wsgi:app',
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def client_process(port, clients, duration, characters, seed):
+    """一个客户端进程：多个线程持续发送请求，返回 (完成数, 错误数)"""
+    weights = [weight for weight, _, _ in REQUEST_MIX]
+    counts = [0] * clients
+    errors = [0] * clients
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(seed * 1000 + index)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while time.perf_counter() < deadline:
+            _, method, make_path = rng.choices(REQUEST_MIX, weights)[0]
+            body = '{"recognized": true}' if method == 'POST' else None
+            headers = {'Content-Type': 'application/json'} if body else {}
+            try:
+                conn.request(method, make_path(rng, characters), body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    errors[index] += 1
+                else:
+                    counts[index] += 1
+            except (OSError, http.client.HTTPException):
+                errors[index] += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts), sum(errors)
+
+
+def run_load(port, processes, clients, duration, characters):
+    """客户端分散到多个进程（避免客户端自身受 GIL 限制），返回 (完成数, 错误数, 耗时)"""
+    per_process = max(1, clients // processes)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        start = time.perf_counter()
+        futures = [
+            executor.submit(client_process, port, per_process, duration, characters, seed)
+            for seed in range(processes)
+        ]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+    return sum(r[0] for r in results), sum(r[1] for r in results), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生产服务压力测试')
+    parser.add_argument('--characters', type=int, default=3000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=4, help='每个工作进程的线程数')
+    parser.add_argument('--clients', type=int, default=16, help='并发客户端数')
+    parser.add_argument('--client-processes', type=int, default=min(4, os.cpu_count() or 1),
+                        help='运行客户端的进程数')
+    parser.add_argument('--duration', type=float, default=10, help='每轮持续秒数')
+    args = parser.parse_args()
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        print('✗ 未安装 gunicorn，请先执行 pip3 install -r requirements.txt')
+        raise SystemExit(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters)
+
+        print(f'CPU: {os.cpu_count()}  汉字数: {args.characters}  每进程线程数: {args.threads}  '
+              f'客户端: {args.clients}  每轮: {args.duration:g} 秒\n')
+        baseline = None
+        for workers in args.workers:
+            port = free_port()
+            server = start_server(database, port, workers, args.threads)
+            try:
+                wait_for_server(port)
+                count, failed, elapsed = run_load(
+                    port, args.client_processes, args.clients, args.duration, args.characters
+                )
+            finally:
+                server.terminate()
+                server.wait()
+
+            rate = count / elapsed
+            baseline = baseline or rate
+            print(f'{workers:2} 个工作进程  {format_rate(count, elapsed):>14}  '
+                  f'{rate / baseline:.2f}x  错误 {failed}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+批量标记基准测试：一轮检测逐个调用标记接口 vs 一次提交整轮作答
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.marks --session 50 --sessions 20
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import Timer, create_database, load_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量标记基准测试')
+    parser.add_argument('--characters', type=int, default=3000)
+    parser.add_argument('--session', type=int, default=50, help='每轮检测的作答数')
+    parser.add_argument('--sessions', type=int, default=20, help='检测轮数')
+    parser.add_argument('--synchronous', default='FULL', help='SQLite synchronous 级别（每次提交的刷盘代价）')
+    args = parser.parse_args()
+
+    os.environ['LEARNWORD_SQLITE_SYNCHRONOUS'] = args.synchronous
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters)
+        app = load_app(database)
+        client = app.test_client()
+
+        def session():
+            return [
+                {
+                    'character_id': rng.randint(1, args.characters),
+                    'recognized': rng.random() < 0.7,
+                    'answered_at': int(time.time()),
+                }
+                for _ in range(args.session)
+            ]
+
+        with Timer() as single:
+            for _ in range(args.sessions):
+                for mark in session():
+                    response = client.post(
+                        f"/api/characters/{mark['character_id']}/mark",
+                        json={'recognized': mark['recognized']}
+                    )
+                    assert response.status_code == 200
+
+        with Timer() as batch:
+            for _ in range(args.sessions):
+                response = client.post('/api/marks/batch', json={'marks': session()})
+                assert response.status_code == 200
+
+        answers = args.session * args.sessions
+        print(f'汉字数: {args.characters}  每轮作答: {args.session}  轮数: {args.sessions}  '
+              f'synchronous={args.synchronous}\n')
+        print(f'逐个标记  每轮 {single.elapsed / args.sessions * 1000:8.1f} ms  '
+              f'{answers / single.elapsed:,.0f} 次作答/s')
+        print(f'批量提交  每轮 {batch.elapsed / args.sessions * 1000:8.1f} ms  '
+              f'{answers / batch.elapsed:,.0f} 次作答/s')
+        print(f'提升 {single.elapsed / batch.elapsed:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+请求指标基准测试：开启和关闭 METRICS_ENABLED 时各接口的耗时，
+即计时中间件和 TracedConnection 逐条语句计时的开销
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.metrics --characters 3000 --records 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+
+from benchmarks.common import Timer, create_database, load_app
+
+# 关闭 HTTP 缓存，每次请求都执行查询
+ROUTES = (
+    ('characters', 'GET', '/api/characters?limit=500'),
+    ('random', 'GET', '/api/characters/random?count=20'),
+    ('mark', 'POST', '/api/characters/{character}/mark'),
+    ('stats', 'GET', '/api/stats'),
+    ('mistakes', 'GET', '/api/mistakes?limit=50'),
+)
+
+
+def measure(database, enabled, characters, requests):
+    """每个接口请求 requests 次，返回 {接口: 毫秒/次}"""
+    os.environ['LEARNWORD_METRICS_ENABLED'] = 'true' if enabled else 'false'
+    os.environ['LEARNWORD_HTTP_CACHE_ENABLED'] = 'false'
+    client = load_app(database).test_client()
+    rng = random.Random(1)
+    result = {}
+    for name, method, template in ROUTES:
+        with Timer() as timer:
+            for _ in range(requests):
+                url = template.format(character=rng.randint(1, characters))
+                if method == 'GET':
+                    response = client.get(url)
+                else:
+                    response = client.post(url, json={'recognized': rng.random() < 0.7})
+                assert response.status_code == 200, (url, response.status_code)
+        result[name] = timer.elapsed / requests * 1000
+    return result, client
+
+
+def main():
+    parser = argparse.ArgumentParser(description='请求指标基准测试')
+    parser.add_argument('--characters', type=int, default=3000)
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--requests', type=int, default=300, help='每个接口的请求次数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters, records=args.records)
+
+        # 先各跑一轮预热页缓存，再交替测量
+        measure(database, False, args.characters, args.requests // 10)
+        off, _ = measure(database, False, args.characters, args.requests)
+        on, client = measure(database, True, args.characters, args.requests)
+
+        print(f'汉字数: {args.characters}  学习记录: {args.records}  每个接口请求: {args.requests} 次\n')
+        print(f'{"接口":<12}{"关闭":>10}{"开启":>12}')
+        for name, _, _ in ROUTES:
+            print(f'{name:<12}{off[name]:>7.2f} ms{on[name]:>9.2f} ms   {on[name] / off[name]:5.2f}x')
+
+        print('\n/api/metrics 中每个请求的平均 SQL 语句数和耗时：')
+        text = client.get('/api/metrics').get_data(as_text=True)
+        totals = {}
+        for line in text.splitlines():
+            if line.startswith('learnword_http_request_sql_') and ('_sum{' in line or '_count{' in line):
+                key, value = line.rsplit(' ', 1)
+                totals[key] = float(value)
+        for key, value in sorted(totals.items()):
+            if key.startswith('learnword_http_request_sql_queries_sum'):
+                labels = key[key.index('{'):]
+                count = totals[f'learnword_http_request_sql_queries_count{labels}']
+                seconds = totals[f'learnword_http_request_sql_seconds_sum{labels}']
+                print(f'  {labels:<60}{value / count:6.1f} 条  {seconds / count * 1000:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
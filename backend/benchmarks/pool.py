@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+连接池基准测试：对比启用/关闭连接池时随机取字和标记接口的吞吐量
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.pool --requests 2000 --threads 4
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+
+from benchmarks.common import Timer, create_database, format_rate, load_app
+from db import reset_pool
+
+
+def run_requests(app, method, make_url, total, threads):
+    """用多个线程并发发送请求，返回耗时"""
+    per_thread = total // threads
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        for _ in range(per_thread):
+            url = make_url(rng)
+            if method == 'POST':
+                response = client.post(url, json={'recognized': rng.random() < 0.5})
+            else:
+                response = client.get(url)
+            assert response.status_code < 400, response.get_data(as_text=True)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    with Timer() as timer:
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+    return per_thread * threads, timer.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='连接池基准测试')
+    parser.add_argument('--characters', type=int, default=3000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters)
+        app = load_app(database)
+
+        endpoints = [
+            ('GET', '/api/characters/random', lambda rng: '/api/characters/random'),
+            ('POST', '/api/characters/<id>/mark',
+             lambda rng: f'/api/characters/{rng.randint(1, args.characters)}/mark'),
+        ]
+
+        print(f'汉字数: {args.characters}  请求数: {args.requests}  线程数: {args.threads}\n')
+        for method, name, make_url in endpoints:
+            results = {}
+            for pooled in (False, True):
+                app.config['DB_POOL_ENABLED'] = pooled
+                reset_pool(app)
+                count, elapsed = run_requests(app, method, make_url, args.requests, args.threads)
+                results[pooled] = count / elapsed
+                label = '连接池' if pooled else '每请求建连'
+                print(f'{method:4} {name:28} {label:8} {format_rate(count, elapsed)}')
+            print(f'{"":33} 提升 {results[True] / results[False]:.2f}x\n')
+        reset_pool(app)
+
+
+if __name__ == '__main__':
+    main()
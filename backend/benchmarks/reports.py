@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+全班报表基准测试：逐行读取 sqlite3.Row 在 Python 中累加（接口通常的写法），
+与在列式快照上向量化计算（reports.py、/api/reports/*）的耗时对比，以及导出快照的耗时
+
+两种算法的结果逐项比对，保证计算的是同一份报表。
+
+用法（在 backend 目录下，需要 numpy）：
+    python3 -m benchmarks.reports
+    python3 -m benchmarks.reports --learners 200 --records 5000000
+"""
+
+import argparse
+import datetime
+import os
+import random
+import tempfile
+from collections import defaultdict
+
+from benchmarks.common import Timer, create_database, load_app
+from benchmarks.timestamps import add_records
+from db import connect
+import reports
+import snapshot
+
+
+def rows_difficulty(db, limit):
+    """逐行累加每个字的作答次数、答错次数和作答过的学习者"""
+    reviews = defaultdict(int)
+    mistakes = defaultdict(int)
+    learners = defaultdict(set)
+    for row in db.execute('SELECT learner_id, character_id, recognized FROM learning_records'):
+        character_id = row['character_id']
+        reviews[character_id] += 1
+        if not row['recognized']:
+            mistakes[character_id] += 1
+        learners[character_id].add(row['learner_id'])
+    names = {row['id']: row['character'] for row in db.execute('SELECT id, character FROM characters')}
+    result = [
+        {
+            'id': character_id,
+            'character': names[character_id],
+            'review_count': count,
+            'mistake_count': mistakes[character_id],
+            'error_rate': round(mistakes[character_id] / count, 4),
+            'learner_count': len(learners[character_id]),
+        }
+        for character_id, count in reviews.items() if character_id in names
+    ]
+    result.sort(key=lambda item: (-item['mistake_count'] / item['review_count'], -item['mistake_count'], item['id']))
+    return result[:limit]
+
+
+def rows_learners(db):
+    """逐行累加每个学习者的作答次数和答错次数"""
+    reviews = defaultdict(int)
+    mistakes = defaultdict(int)
+    for row in db.execute('SELECT learner_id, recognized FROM learning_records'):
+        reviews[row['learner_id']] += 1
+        if not row['recognized']:
+            mistakes[row['learner_id']] += 1
+    return reviews, mistakes
+
+
+def rows_retention(db, window, periods):
+    """逐行解析日期，记下每个学习者的首次作答日和有作答的期"""
+    days = defaultdict(set)
+    for row in db.execute('SELECT learner_id, day FROM learning_records'):
+        days[row['learner_id']].add(datetime.datetime.strptime(str(row['day']), '%Y%m%d').date().toordinal())
+    first = {learner: min(values) for learner, values in days.items()}
+    origin = min(first.values())
+    cohorts = defaultdict(lambda: [0] * (periods + 1))
+    for learner, values in days.items():
+        counts = cohorts[(first[learner] - origin) // window]
+        counts[periods] += 1
+        for period in {(day - first[learner]) // window for day in values}:
+            if period < periods:
+                counts[period] += 1
+    return {cohort: counts for cohort, counts in cohorts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全班报表基准测试')
+    parser.add_argument('--learners', type=int, default=100)
+    parser.add_argument('--characters', type=int, default=3000)
+    parser.add_argument('--records', type=int, default=2000000)
+    parser.add_argument('--repeat', type=int, default=5, help='每个报表的计算次数')
+    args = parser.parse_args()
+
+    if snapshot.np is None:
+        print('✗ 未安装 numpy，请先执行 pip3 install numpy')
+        raise SystemExit(1)
+
+    os.environ['LEARNWORD_HTTP_CACHE_ENABLED'] = 'false'
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        snapshot_dir = os.path.join(tmp, 'snapshot')
+        create_database(database, characters=args.characters)
+        db = connect(database)
+        db.executemany('INSERT INTO learners (name) VALUES (?)', ((f'学习者{i}',) for i in range(2, args.learners + 1)))
+        db.commit()
+        db.close()
+        with Timer() as timer:
+            add_records(database, args.records, args.learners, args.characters, rng)
+        print(f'{args.learners} 个学习者、{args.records} 条学习记录  写入 {timer.elapsed:.1f} s')
+
+        db = connect(database)
+        with Timer() as timer:
+            snapshot.build(db, snapshot_dir)
+        print(f'导出快照  {timer.elapsed:.1f} s\n')
+        current = snapshot.open_snapshot(snapshot_dir)
+
+        window, periods = reports.DEFAULT_RETENTION_WINDOW, reports.DEFAULT_RETENTION_PERIODS
+        expected_learners = rows_learners(db)
+        _, review_counts, _ = reports.group_by(current.records['learner_id'])
+        assert sorted(review_counts.tolist()) == sorted(expected_learners[0].values())
+        assert reports.difficulty(current, limit=100) == rows_difficulty(db, 100)
+        expected_retention = rows_retention(db, window, periods)
+        origin = int(current.records['day_number'].min())
+        for cohort in reports.retention(current.records['learner_id'], current.records['day_number'], last_day=10 ** 9):
+            start = datetime.date.fromisoformat(cohort['cohort_start']).toordinal() - snapshot.EPOCH_ORDINAL
+            counts = expected_retention[(start - origin) // window]
+            assert cohort['learners'] == counts[periods]
+            assert cohort['rates'] == [round(count / counts[periods], 4) for count in counts[:periods]]
+
+        tasks = (
+            ('difficulty', lambda: rows_difficulty(db, 50), lambda: reports.difficulty(current),
+             '/api/reports/difficulty'),
+            ('learners', lambda: rows_learners(db), lambda: reports.learners(current),
+             '/api/reports/learners'),
+            ('retention', lambda: rows_retention(db, window, periods), lambda: reports.retention_report(current),
+             '/api/reports/retention'),
+        )
+        os.environ['LEARNWORD_SNAPSHOT_DIR'] = snapshot_dir
+        client = load_app(database).test_client()
+        print(f'{"":<12}{"逐行计算":>10}{"向量化":>12}{"接口":>12}')
+        for name, rows, vectorized, url in tasks:
+            with Timer() as slow:
+                rows()
+            with Timer() as fast:
+                for _ in range(args.repeat):
+                    vectorized()
+            with Timer() as route:
+                for _ in range(args.repeat):
+                    response = client.get(url)
+                    assert response.status_code == 200, response.status_code
+            fast_ms = fast.elapsed / args.repeat * 1000
+            print(f'{name:<12}{slow.elapsed * 1000:>9.0f} ms{fast_ms:>9.1f} ms'
+                  f'{route.elapsed / args.repeat * 1000:>9.1f} ms   {slow.elapsed * 1000 / fast_ms:5.0f}x')
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
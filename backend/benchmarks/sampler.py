@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+随机抽字基准测试：对比全量读取后 random.choice 与索引探测抽样
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.sampler --sizes 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+
+from benchmarks.common import Timer, create_database
+from db import connect
+from sampler import sample_characters
+
+
+def full_scan_choice(db, mastered):
+    """原来的实现：读出全部候选再随机选一个"""
+    rows = db.execute('''
+        SELECT id, character, recognition_count, is_mastered
+        FROM characters
+        WHERE is_mastered = ?
+    ''', (1 if mastered else 0,)).fetchall()
+    return random.choice([dict(row) for row in rows])
+
+
+def measure(fn, iterations):
+    """返回单次调用的平均耗时（毫秒）"""
+    with Timer() as timer:
+        for _ in range(iterations):
+            fn()
+    return timer.elapsed / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='随机抽字基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--count', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            database = os.path.join(tmp, f'bench_{size}.db')
+            create_database(database, characters=size)
+            db = connect(database)
+
+            scan_iterations = max(1, args.iterations // 20)
+            baseline = measure(lambda: full_scan_choice(db, False), scan_iterations)
+            single = measure(lambda: sample_characters(db, False, 1), args.iterations)
+            batch = measure(lambda: sample_characters(db, False, args.count), args.iterations)
+            review = measure(lambda: sample_characters(db, True, 1), args.iterations)
+
+            print(f'汉字数 {size:,}')
+            print(f'  全量读取 + random.choice   {baseline:10.3f} ms')
+            print(f'  索引探测（学习模式）       {single:10.3f} ms  ({baseline / single:,.0f}x)')
+            print(f'  索引探测（复习模式）       {review:10.3f} ms')
+            print(f'  索引探测 count={args.count:<3}        {batch:10.3f} ms')
+            print()
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+搜索基准测试：FTS5 索引与逐行 LIKE 扫描的单次查询耗时
+
+每个字生成不同的拼音、释义、组词和造句，查询包括单字、词语、拼音和拼音前缀。
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.search --characters 100000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+
+from benchmarks.common import CJK_COUNT, CJK_START, Timer, create_database
+import search
+
+INITIALS = ('', 'b', 'p', 'm', 'f', 'd', 't', 'n', 'l', 'g', 'k', 'h', 'j', 'q', 'x',
+            'zh', 'ch', 'sh', 'r', 'z', 'c', 's')
+FINALS = ('a', 'o', 'e', 'i', 'u', 'ai', 'ei', 'ao', 'ou', 'an', 'en', 'ang', 'eng', 'ong')
+# 带声调的拼音（声调标在第一个元音上），三百多个音节，接近真实词典的分布
+SYLLABLES = tuple(initial + final for initial in INITIALS for final in FINALS)
+TONES = {'a': 'āáǎà', 'o': 'ōóǒò', 'e': 'ēéěè', 'i': 'īíǐì', 'u': 'ūúǔù'}
+
+
+def with_tone(syllable, rng):
+    for index, ch in enumerate(syllable):
+        if ch in TONES:
+            return syllable[:index] + rng.choice(TONES[ch]) + syllable[index + 1:]
+    return syllable
+
+
+def fill_details(path, seed=42):
+    """为每个字生成各不相同的详情（通过触发器进入待同步队列）"""
+    rng = random.Random(seed)
+
+    def hanzi(count):
+        return ''.join(chr(CJK_START + rng.randrange(CJK_COUNT)) for _ in range(count))
+
+    db = sqlite3.connect(path)
+    ids = [row[0] for row in db.execute('SELECT id FROM characters')]
+    db.executemany(
+        'UPDATE characters SET pinyin = ?, definition = ?, words = ?, sentences = ? WHERE id = ?',
+        (
+            (
+                with_tone(rng.choice(SYLLABLES), rng),
+                hanzi(12),
+                '\n'.join(hanzi(2) for _ in range(4)),
+                '\n'.join(hanzi(10) for _ in range(3)),
+                character_id,
+            )
+            for character_id in ids
+        )
+    )
+    db.commit()
+    db.close()
+
+
+def like_search(db, text, limit):
+    """不使用索引的写法：每个文本列 LIKE '%...%'"""
+    pattern = f'%{text}%'
+    return db.execute('''
+        SELECT id, character, pinyin FROM characters
+        WHERE character = ? OR pinyin LIKE ? OR definition LIKE ? OR words LIKE ? OR sentences LIKE ?
+        LIMIT ?
+    ''', (text, f'{text}%', pattern, pattern, pattern, limit)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜索基准测试')
+    parser.add_argument('--characters', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters)
+        fill_details(database)
+
+        db = sqlite3.connect(database)
+        db.row_factory = sqlite3.Row
+        with Timer() as timer:
+            synced = search.sync(db)
+        print(f'汉字数: {args.characters}  查询数: {args.queries}')
+        print(f'同步索引: {synced} 个汉字  {timer.elapsed:.2f} s\n')
+
+        rng = random.Random(7)
+        words = [row[0].split('\n')[0] for row in db.execute(
+            'SELECT words FROM characters ORDER BY random() LIMIT ?', (args.queries,)
+        )]
+        characters = [row[0] for row in db.execute(
+            'SELECT character FROM characters ORDER BY random() LIMIT ?', (args.queries,)
+        )]
+        cases = [
+            ('单字', characters),
+            ('词语', words),
+            ('拼音', [rng.choice(SYLLABLES) for _ in range(args.queries)]),
+            ('拼音前缀', [rng.choice(SYLLABLES)[:2] for _ in range(args.queries)]),
+        ]
+
+        for label, queries in cases:
+            with Timer() as like_timer:
+                for text in queries:
+                    like_search(db, text, args.limit)
+            with Timer() as fts_timer:
+                for text in queries:
+                    search.search(db, text, args.limit)
+            like_ms = like_timer.elapsed / len(queries) * 1000
+            fts_ms = fts_timer.elapsed / len(queries) * 1000
+            print(f'{label:6} LIKE {like_ms:9.2f} ms/次   FTS5 {fts_ms:7.2f} ms/次   {like_ms / fts_ms:6.1f}x')
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
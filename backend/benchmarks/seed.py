@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+批量写入基准测试：learnword seed 写入内置识字表（含详情）和 2 万字的词典，
+与原来逐字 execute 的导入脚本对比
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.seed --characters 20000
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+
+from benchmarks.common import Timer, make_character
+from benchmarks.dictionary import make_entries
+import cli
+import dictionary
+
+
+def seed_row_by_row(db, characters):
+    """原来 import_characters.py 的写法：每个字一次 execute"""
+    cursor = db.cursor()
+    for char in characters:
+        try:
+            cursor.execute('INSERT INTO characters (character) VALUES (?)', (char,))
+        except sqlite3.IntegrityError:
+            pass
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量写入基准测试')
+    parser.add_argument('--characters', type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        grade1 = cli.unique_characters(sorted(set(cli.SEED_LISTS['grade1'])))
+        details = cli.iter_details(['builtin'])
+        db = cli.open_database(os.path.join(tmp, 'grade1.db'), quiet=True)
+        with Timer() as timer:
+            added = cli.seed(db, grade1, details, quiet=True)
+        db.close()
+        print(f'识字表 {added} 个字（含详情）      {timer.elapsed * 1000:8.1f} ms')
+
+        path = os.path.join(tmp, 'dictionary.pack')
+        dictionary.build(make_entries(args.characters), path)
+        packed = dictionary.Dictionary(path)
+        entries = dict(packed.items())
+        packed.close()
+        characters = list(entries)
+
+        db = cli.open_database(os.path.join(tmp, 'dictionary.db'), quiet=True)
+        with Timer() as seed_timer:
+            added = cli.seed(db, characters, entries, quiet=True)
+        db.close()
+        print(f'词典 {added} 个字（含详情）      {seed_timer.elapsed * 1000:8.1f} ms')
+
+        db = cli.open_database(os.path.join(tmp, 'rows.db'), quiet=True)
+        plain = [make_character(i) for i in range(args.characters)]
+        with Timer() as row_timer:
+            seed_row_by_row(db, plain)
+        db.close()
+        db = cli.open_database(os.path.join(tmp, 'batch.db'), quiet=True)
+        with Timer() as batch_timer:
+            cli.seed(db, plain, quiet=True)
+        db.close()
+        print(f'\n{args.characters} 个字（不含详情）')
+        print(f'逐字 execute                  {row_timer.elapsed * 1000:8.1f} ms')
+        print(f'executemany                   {batch_timer.elapsed * 1000:8.1f} ms   '
+              f'{row_timer.elapsed / batch_timer.elapsed:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+存储后端基准测试：同一份数据、同一组操作（随机抽字、作答、统计、错题集），
+分别在 sqlite 和 memory 后端（stores.py）上测量
+
+- 仓库：直接调用 Storage 的方法，只有存储本身的开销
+- 接口：经过 Flask 路由（test client），与实际请求相同
+
+两个后端从同一个数据库文件的副本开始，按相同的随机序列作答。
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.stores
+    python3 -m benchmarks.stores --characters 20000 --learners 50 --records 200000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from benchmarks.common import Timer, create_database, load_app
+from benchmarks.timestamps import add_records
+from db import connect
+import records
+import scheduler
+import stores
+
+OPERATIONS = ('random', 'mark', 'stats', 'mistakes')
+
+
+def store_operations(storage, learners, characters, rng):
+    policy = scheduler.get_scheduler('legacy')
+    return {
+        'random': lambda: storage.characters.sample(rng.randint(1, learners), count=1, rng=rng),
+        'mark': lambda: storage.mark(
+            rng.randint(1, learners), [(rng.randint(1, characters), rng.random() < 0.7, None)], policy
+        ),
+        'stats': lambda: (
+            storage.characters.summary(rng.randint(1, learners)),
+            storage.records.today(rng.randint(1, learners), records.local_day()),
+        ),
+        'mistakes': lambda: storage.records.mistakes(rng.randint(1, learners), limit=50),
+    }
+
+
+def route_operations(client, learners, characters, rng):
+    def get(url):
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+
+    def mark():
+        response = client.post(
+            f'/api/characters/{rng.randint(1, characters)}/mark?learner_id={rng.randint(1, learners)}',
+            json={'recognized': rng.random() < 0.7}
+        )
+        assert response.status_code == 200, response.status_code
+
+    return {
+        'random': lambda: get(f'/api/characters/random?learner_id={rng.randint(1, learners)}'),
+        'mark': mark,
+        'stats': lambda: get(f'/api/stats?learner_id={rng.randint(1, learners)}'),
+        'mistakes': lambda: get(f'/api/mistakes?limit=50&learner_id={rng.randint(1, learners)}'),
+    }
+
+
+def measure(operations, iterations):
+    """每个操作执行 iterations 次，返回 {操作: 毫秒/次}"""
+    result = {}
+    for name in OPERATIONS:
+        with Timer() as timer:
+            for _ in range(iterations):
+                operations[name]()
+        result[name] = timer.elapsed / iterations * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='存储后端基准测试')
+    parser.add_argument('--characters', type=int, default=3000)
+    parser.add_argument('--learners', type=int, default=20)
+    parser.add_argument('--records', type=int, default=100000, help='预先写入的历史学习记录数')
+    parser.add_argument('--iterations', type=int, default=1000, help='每个操作的执行次数')
+    args = parser.parse_args()
+
+    os.environ['LEARNWORD_HTTP_CACHE_ENABLED'] = 'false'
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, 'template.db')
+        create_database(template, characters=args.characters)
+        db = connect(template)
+        db.executemany('INSERT INTO learners (name) VALUES (?)', ((f'学习者{i}',) for i in range(2, args.learners + 1)))
+        db.commit()
+        db.close()
+        add_records(template, args.records, args.learners, args.characters, random.Random(42))
+
+        results = {}
+        for name in stores.STORAGES:
+            database = os.path.join(tmp, f'{name}.db')
+            shutil.copy(template, database)
+
+            db = connect(database)
+            with Timer() as loading:
+                storage = stores.SQLiteStorage(db) if name == 'sqlite' else stores.MemoryStorage.load(db)
+            direct = measure(store_operations(storage, args.learners, args.characters, random.Random(1)),
+                             args.iterations)
+            db.close()
+
+            os.environ['LEARNWORD_STORAGE'] = name
+            client = load_app(database).test_client()
+            # 第一个请求载入内存存储，不计入
+            client.get('/api/stats')
+            routes = measure(route_operations(client, args.learners, args.characters, random.Random(1)),
+                             args.iterations)
+            results[name] = (loading.elapsed, direct, routes)
+
+        print(f'汉字数: {args.characters}  学习者: {args.learners}  历史学习记录: {args.records}  '
+              f'每个操作 {args.iterations} 次（毫秒/次）\n')
+        print(f'{"":<10}' + ''.join(f'{f"{name} 仓库":>14}{f"{name} 接口":>14}' for name in results))
+        for operation in OPERATIONS:
+            print(f'{operation:<10}' + ''.join(
+                f'{direct[operation]:>14.3f}{routes[operation]:>14.3f}' for _, direct, routes in results.values()
+            ))
+        print('\n' + '  '.join(f'{name} 载入 {loading * 1000:.0f} ms' for name, (loading, _, _) in results.items()))
+
+
+if __name__ == '__main__':
+    main()
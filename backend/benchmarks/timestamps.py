@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+学习记录时间格式基准测试：学习记录从 1 万条增长到 1000 万条时，
+“今天”的查询（今日作答次数、今日认识的字、最近 24 小时）的耗时
+
+- 逐行换算：对学习者的每条记录计算本地日期再比较（版本 14 之前的 DATE(recorded_at, 'localtime')）
+- day 索引：按写入时算好的本地日期在 (learner_id, day) 索引上等值查找
+- 时间范围：整数 recorded_at 在 (learner_id, recorded_at) 索引上范围查找
+- /api/stats：读取触发器维护的按天汇总
+
+历史记录分布在多个学习者、过去几年中；默认学习者今天固定作答 TODAY_RECORDS 次。
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.timestamps
+    python3 -m benchmarks.timestamps --sizes 10000 100000 1000000 10000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import Timer, create_database, load_app
+from db import connect, paused_triggers
+import mistakes
+import records
+import stats
+
+LEARNER = 1
+TODAY_RECORDS = 300
+HISTORY_DAYS = 3 * 365
+
+QUERIES = (
+    ('逐行换算', f'''
+        SELECT COUNT(*) FROM learning_records
+        WHERE learner_id = ? AND {records.DAY_SQL.format(value='recorded_at')} = ?
+    ''', 'day'),
+    ('day 索引', '''
+        SELECT COUNT(*) FROM learning_records WHERE learner_id = ? AND day = ?
+    ''', 'day'),
+    ('今日认识的字', '''
+        SELECT DISTINCT character_id FROM learning_records
+        WHERE learner_id = ? AND day = ? AND recognized = 1
+    ''', 'day'),
+    ('最近 24 小时', '''
+        SELECT COUNT(*) FROM learning_records WHERE learner_id = ? AND recorded_at >= ?
+    ''', 'since'),
+)
+
+
+def add_records(path, count, learners, characters, rng):
+    """写入 count 条今天以前的历史记录（暂停触发器，写完后重建汇总）"""
+    db = connect(path)
+    now = int(time.time())
+    start_of_today = int(time.mktime(time.localtime(now)[:3] + (0, 0, 0, 0, 0, -1)))
+
+    def rows():
+        for _ in range(count):
+            moment = start_of_today - 1 - rng.randrange(HISTORY_DAYS * 24 * 60 * 60)
+            yield (rng.randint(1, learners), rng.randint(1, characters), int(rng.random() < 0.7),
+                   moment, records.local_day(moment))
+
+    names = [row[0] for row in db.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'learning_records'"
+    )]
+    db.execute('BEGIN IMMEDIATE')
+    with paused_triggers(db, names):
+        db.executemany('''
+            INSERT INTO learning_records (learner_id, character_id, recognized, recorded_at, day)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows())
+    stats.rebuild_learners(db)
+    mistakes.rebuild(db)
+    db.commit()
+    db.execute('ANALYZE')
+    db.close()
+
+
+def add_today(path, characters, rng):
+    """默认学习者今天的作答（经过触发器，与接口写入相同）"""
+    db = connect(path)
+    now = int(time.time())
+    db.executemany('''
+        INSERT INTO learning_records (learner_id, character_id, recognized, recorded_at, day)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (
+        (LEARNER, rng.randint(1, characters), int(rng.random() < 0.7), now - i, records.local_day(now - i))
+        for i in range(TODAY_RECORDS)
+    ))
+    db.commit()
+    db.close()
+
+
+def measure(path, client, repeat):
+    """每个查询执行 repeat 次，返回 {查询: 毫秒/次}"""
+    db = connect(path)
+    params = {'day': records.local_day(), 'since': int(time.time()) - 24 * 60 * 60}
+    result = {}
+    for name, sql, param in QUERIES:
+        with Timer() as timer:
+            for _ in range(repeat):
+                db.execute(sql, (LEARNER, params[param])).fetchall()
+        result[name] = timer.elapsed / repeat * 1000
+    db.close()
+
+    with Timer() as timer:
+        for _ in range(repeat):
+            response = client.get(f'/api/stats?learner_id={LEARNER}')
+            assert response.status_code == 200
+    result['/api/stats'] = timer.elapsed / repeat * 1000
+    assert response.json['today_count'] == TODAY_RECORDS, response.json['today_count']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='学习记录时间格式基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='依次增长到的学习记录数')
+    parser.add_argument('--learners', type=int, default=20)
+    parser.add_argument('--characters', type=int, default=3000)
+    parser.add_argument('--repeat', type=int, default=20, help='每个查询的执行次数')
+    args = parser.parse_args()
+
+    os.environ['LEARNWORD_HTTP_CACHE_ENABLED'] = 'false'
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters)
+        db = connect(database)
+        db.executemany('INSERT INTO learners (name) VALUES (?)', ((f'学习者{i}',) for i in range(2, args.learners + 1)))
+        db.commit()
+        db.close()
+        add_today(database, args.characters, rng)
+        client = load_app(database).test_client()
+
+        rows = TODAY_RECORDS
+        results = []
+        for size in sorted(args.sizes):
+            with Timer() as timer:
+                add_records(database, max(size - rows, 0), args.learners, args.characters, rng)
+            rows = max(size, rows)
+            print(f'学习记录 {rows:>9}  写入 {timer.elapsed:.1f} s')
+            results.append((rows, measure(database, client, args.repeat)))
+
+        names = [name for name, _, _ in QUERIES] + ['/api/stats']
+        print(f'\n默认学习者今天作答 {TODAY_RECORDS} 次，历史记录分布在 {args.learners} 个学习者、'
+              f'{HISTORY_DAYS} 天内（毫秒/次）\n')
+        print(f'{"学习记录":<8}' + ''.join(f'{name:>14}' for name in names))
+        for size, result in results:
+            print(f'{size:<12}' + ''.join(f'{result[name]:>14.3f}' for name in names))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+词语基准测试：“只由已掌握的字组成的词”在拆分后的词语表上查询，与逐字拆分 words 文本对比
+
+用法（在 backend 目录下）：
+    python3 -m benchmarks.vocabulary --characters 20000 --queries 50
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+
+from benchmarks.common import Timer, create_database, make_character
+import vocabulary
+
+
+def fill_words(path, characters, seed=42):
+    """为每个字生成 5 个由字库中的字组成的双字词"""
+    rng = random.Random(seed)
+    db = sqlite3.connect(path)
+    db.executemany(
+        'UPDATE characters SET words = ? WHERE id = ?',
+        (
+            (
+                '\n'.join(make_character(i) + make_character(rng.randrange(characters)) for _ in range(5)),
+                i + 1,
+            )
+            for i in range(characters)
+        )
+    )
+    db.commit()
+    db.close()
+
+
+def scan_mastered_words(db, limit):
+    """拆分表之前的写法：读出全部 words 文本，逐个检查词中的字是否都已掌握"""
+    mastered = {row[0] for row in db.execute('SELECT character FROM characters WHERE is_mastered = 1')}
+    result = []
+    for (words,) in db.execute('SELECT words FROM characters WHERE words IS NOT NULL'):
+        for word in vocabulary.split_lines(words):
+            if all(ch in mastered for ch in vocabulary.word_characters(word)) and word not in result:
+                result.append(word)
+                if len(result) == limit:
+                    return result
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='词语基准测试')
+    parser.add_argument('--characters', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--limit', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        create_database(database, characters=args.characters)
+        fill_words(database, args.characters)
+
+        db = sqlite3.connect(database)
+        db.row_factory = sqlite3.Row
+        with Timer() as timer:
+            synced = vocabulary.sync(db)
+        words = db.execute('SELECT COUNT(*) FROM words').fetchone()[0]
+        print(f'汉字数: {args.characters}  词数: {words}  查询数: {args.queries}')
+        print(f'拆分组词: {synced} 个汉字  {timer.elapsed:.2f} s\n')
+
+        rng = random.Random(7)
+        mastered = [row[0] for row in db.execute('SELECT character FROM characters WHERE is_mastered = 1')]
+        contains = [rng.choice(mastered) for _ in range(args.queries)]
+
+        with Timer() as scan_timer:
+            for _ in range(args.queries):
+                scan_mastered_words(db, args.limit)
+        with Timer() as table_timer:
+            for _ in range(args.queries):
+                vocabulary.query_mastered_words(db, limit=args.limit)
+        with Timer() as contains_timer:
+            for ch in contains:
+                vocabulary.query_mastered_words(db, contains=ch, limit=args.limit)
+
+        scan_ms = scan_timer.elapsed / args.queries * 1000
+        table_ms = table_timer.elapsed / args.queries * 1000
+        contains_ms = contains_timer.elapsed / args.queries * 1000
+        print(f'拆分文本扫描        {scan_ms:9.2f} ms/次')
+        print(f'词语表（前 {args.limit} 个）  {table_ms:9.2f} ms/次   {scan_ms / table_ms:8.1f}x')
+        print(f'词语表（包含某字）  {contains_ms:9.2f} ms/次')
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+汉字列表查询
+
+按 created_at DESC, id DESC 排序，支持键集分页、字段选择和按状态筛选。
+排序和每种筛选都有对应的索引（rowid 隐含在索引末尾，作为同一时间的次序），
+翻页只做一次索引范围扫描，不再每次在临时 B 树里排序整张表。
+
+总数不做 COUNT(*)，直接读 stats_summary 中由触发器维护的计数；
+has_details 筛选没有对应的计数，不返回总数。
+"""
+
+# 不指定 fields 时返回的字段（与原来的接口一致）
+DEFAULT_FIELDS = ('id', 'character', 'recognition_count', 'is_mastered', 'created_at', 'updated_at')
+
+# 可以通过 fields 选择的字段
+FIELDS = DEFAULT_FIELDS + ('pinyin', 'definition', 'words', 'sentences', 'due_at')
+
+# 状态筛选条件，以及 stats_summary 中对应的计数列
+# 与 stats.py 中的判断相同（WHERE 中 NULL 本来就不满足，省去 IFNULL 才能使用索引）
+STATUS_FILTERS = {
+    'mastered': ('is_mastered = 1', 'mastered'),
+    'learning': ('is_mastered = 0 AND recognition_count > 0', 'learning'),
+    'not_started': ('recognition_count = 0', 'not_started'),
+}
+
+# 是否已填写详情（与部分索引的条件完全一致，查询才能使用该索引）
+HAS_DETAILS = '(pinyin IS NOT NULL OR definition IS NOT NULL OR words IS NOT NULL OR sentences IS NOT NULL)'
+
+SCHEMA = [
+    'CREATE INDEX IF NOT EXISTS idx_characters_created_at ON characters(created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_characters_mastered_created ON characters(is_mastered, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_characters_count_created ON characters(recognition_count, created_at)',
+    f'''
+    CREATE INDEX IF NOT EXISTS idx_characters_details_created
+    ON characters(created_at) WHERE {HAS_DETAILS}
+    ''',
+]
+
+
+def parse_fields(value):
+    """解析 fields 参数（逗号分隔），未传入时返回默认字段，包含未知字段时抛出 ValueError"""
+    if not value:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown or not fields:
+        raise ValueError(f'未知的字段: {", ".join(unknown)}（可选: {", ".join(FIELDS)}）')
+    return fields
+
+
+def parse_filters(status=None, has_details=None):
+    """校验筛选参数，返回 (状态, 是否有详情)"""
+    if status is not None and status not in STATUS_FILTERS:
+        raise ValueError(f'status 只能是 {" / ".join(STATUS_FILTERS)}')
+    if has_details is not None:
+        if has_details.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError('has_details 只能是 true 或 false')
+        has_details = has_details.lower() in ('true', '1')
+    return status, has_details
+
+
+def query_characters(db, fields=DEFAULT_FIELDS, status=None, has_details=None, limit=None, after=None):
+    """按创建时间倒序读取汉字
+
+    after 为上一页最后一行的 (created_at, id)。返回的每行都带有 created_at 和 id，
+    用于生成下一页游标，调用方按需去掉。
+    """
+    columns = list(dict.fromkeys(fields + ('created_at', 'id')))
+    conditions = []
+    params = []
+    if status is not None:
+        conditions.append(STATUS_FILTERS[status][0])
+    if has_details is True:
+        conditions.append(HAS_DETAILS)
+    elif has_details is False:
+        conditions.append(f'NOT {HAS_DETAILS}')
+    if after is not None:
+        conditions.append('(created_at, id) < (?, ?)')
+        params.extend(after)
+
+    sql = f'SELECT {", ".join(columns)} FROM characters'
+    if conditions:
+        sql += f' WHERE {" AND ".join(conditions)}'
+    sql += ' ORDER BY created_at DESC, id DESC'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+
+    return [dict(row) for row in db.execute(sql, params)]
+
+
+def count_characters(db, status=None, has_details=None):
+    """从汇总表读取符合筛选条件的总数，没有对应计数时返回 None"""
+    if has_details is not None:
+        return None
+    column = STATUS_FILTERS[status][1] if status is not None else 'total'
+    row = db.execute(f'SELECT {column} FROM stats_summary WHERE id = 1').fetchone()
+    return row[0] if row else None
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+learnword 命令行工具
+
+原来的 import_characters.py、batch_add_details.py 等脚本各自按相对路径打开
+characters.db，逐字 execute、逐行 print。这里统一成一个命令：按批 executemany
+写入（UPSERT），每批一个事务，终端上显示进度条，数据库路径由 --db 指定。
+
+    ./learnword seed                          # 一年级下册识字表
+    ./learnword seed --details                # 同时写入内置的汉字详情
+    ./learnword seed --dict dictionary.pack   # 词典中的全部汉字和详情
+    ./learnword seed --file chars.txt         # 文本文件中的汉字
+    ./learnword details apply [来源 ...] [--overwrite]
+    ./learnword migrate [--status]
+    ./learnword vacuum
+    ./learnword bench search --characters 100000
+
+--db 默认为 backend/characters.db（或 LEARNWORD_DATABASE）。写入前会先把数据库
+迁移到最新结构，空路径会新建数据库。
+"""
+
+import argparse
+import importlib
+import os
+import pkgutil
+import sys
+import time
+
+from config import env_str
+from db import connect, paused_triggers
+import dictionary
+import httpcache
+import import_characters
+import learners
+import migrations
+import search
+import stats
+import vocabulary
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_DATABASE = env_str('DATABASE', os.path.join(BACKEND_DIR, 'characters.db'))
+
+# 每批写入的行数（每批提交一次）
+DEFAULT_BATCH_SIZE = 5000
+
+# 内置的汉字表
+SEED_LISTS = {
+    'grade1': import_characters.characters_list,
+}
+
+SEED_SQL = 'INSERT INTO characters (character) VALUES (?) ON CONFLICT(character) DO NOTHING'
+
+# 带详情写入：新字直接插入，已有的字只补空字段（详情完整的行不会被改写）
+SEED_DETAILS_SQL = '''
+    INSERT INTO characters (character, pinyin, definition, words, sentences)
+    VALUES (?5, ?1, ?2, ?3, ?4)
+    ON CONFLICT(character) DO UPDATE SET
+        pinyin = IFNULL(characters.pinyin, excluded.pinyin),
+        definition = IFNULL(characters.definition, excluded.definition),
+        words = IFNULL(characters.words, excluded.words),
+        sentences = IFNULL(characters.sentences, excluded.sentences),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE characters.pinyin IS NULL OR characters.definition IS NULL
+       OR characters.words IS NULL OR characters.sentences IS NULL
+'''
+
+
+# 新增汉字时逐行维护派生数据的触发器。seed 写入时先在事务内暂停这些触发器，
+# 写完一批后由各模块按 id 范围一次补上，再恢复触发器（其余触发器照常执行）
+DEFERRED_TRIGGERS = (
+    ('trg_stats_characters_insert', stats.characters_added),
+    ('trg_counter_characters_insert', lambda db, first_id: httpcache.bump(db, 'characters')),
+    ('trg_search_characters_insert', search.characters_added),
+    ('trg_vocabulary_characters_insert', vocabulary.characters_added),
+    ('trg_learners_characters_insert', learners.characters_added),
+)
+
+
+class ProgressBar:
+    """在终端上显示写入进度（输出不是终端时不显示）"""
+
+    width = 30
+
+    def __init__(self, total, label, stream=None, enabled=True):
+        self.total = total
+        self.label = label
+        self.stream = stream or sys.stderr
+        self.enabled = enabled and total > 0 and self.stream.isatty()
+        self.done = 0
+
+    def update(self, count):
+        self.done += count
+        if not self.enabled:
+            return
+        ratio = min(self.done / self.total, 1)
+        filled = int(ratio * self.width)
+        self.stream.write(
+            f"\r{self.label} [{'#' * filled}{'.' * (self.width - filled)}] "
+            f"{ratio * 100:5.1f}% {self.done}/{self.total}"
+        )
+        self.stream.flush()
+
+    def close(self):
+        if self.enabled:
+            self.stream.write('\n')
+            self.stream.flush()
+
+
+def open_database(path, quiet=False):
+    """打开数据库并迁移到最新结构"""
+    db = connect(path)
+    for version, description in migrations.migrate(db):
+        if not quiet:
+            print(f"✓ 迁移 {version}: {description}")
+    return db
+
+
+def write_batches(db, sql, rows, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """按批 executemany 写入，每批一个事务，返回改动的行数"""
+    changed = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        cursor = db.executemany(sql, batch)
+        db.commit()
+        changed += max(cursor.rowcount, 0)
+        if progress is not None:
+            progress.update(len(batch))
+    return changed
+
+
+def insert_batches(db, sql, rows, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """与 write_batches 相同，但每批写入时暂停 DEFERRED_TRIGGERS，写完后按集合补上
+
+    暂停和恢复都在这一批的事务里（BEGIN IMMEDIATE），其他连接看不到没有触发器的状态，
+    也不能在这期间写入。
+    """
+    changed = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if not db.in_transaction:
+            db.execute('BEGIN IMMEDIATE')
+        try:
+            # AUTOINCREMENT 保证新字的 id 都大于现有的最大 id
+            first_id = db.execute('SELECT IFNULL(MAX(id), 0) + 1 FROM characters').fetchone()[0]
+            names = [name for name, _ in DEFERRED_TRIGGERS]
+            with paused_triggers(db, names):
+                cursor = db.executemany(sql, batch)
+                for _, added in DEFERRED_TRIGGERS:
+                    added(db, first_id)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        changed += max(cursor.rowcount, 0)
+        if progress is not None:
+            progress.update(len(batch))
+    return changed
+
+
+def unique_characters(characters):
+    """去掉空白和重复（保持第一次出现的顺序）"""
+    return list(dict.fromkeys(ch.strip() for ch in characters if ch.strip()))
+
+
+def _detail_row(character, details):
+    return tuple(details.get(field) for field in dictionary.FIELDS) + (character,)
+
+
+def seed(db, characters, details=None, batch_size=DEFAULT_BATCH_SIZE, quiet=False):
+    """写入汉字（已存在的跳过），details 为 {汉字: 详情} 时一起写入详情，返回新增的汉字数"""
+    before = db.execute('SELECT COUNT(*) FROM characters').fetchone()[0]
+    progress = ProgressBar(len(characters), '写入汉字', enabled=not quiet)
+    if details:
+        rows = [_detail_row(ch, details.get(ch, {})) for ch in characters]
+        insert_batches(db, SEED_DETAILS_SQL, rows, batch_size, progress)
+    else:
+        insert_batches(db, SEED_SQL, [(ch,) for ch in characters], batch_size, progress)
+    progress.close()
+    return db.execute('SELECT COUNT(*) FROM characters').fetchone()[0] - before
+
+
+def apply_details(db, entries, overwrite=False, batch_size=DEFAULT_BATCH_SIZE, quiet=False):
+    """把 (汉字, 详情) 按批写入已有的汉字，返回更新的行数
+
+    默认只补空字段；overwrite 为真时以来源为准覆盖已有的详情。
+    """
+    rows = [_detail_row(character, details) for character, details in entries]
+    progress = ProgressBar(len(rows), '写入详情', enabled=not quiet)
+    sql = dictionary.FILL_SQL if overwrite else dictionary.FILL_MISSING_SQL
+    updated = write_batches(db, sql, rows, batch_size, progress)
+    progress.close()
+    return updated
+
+
+def iter_details(sources):
+    """读取各来源的详情，合并成 {汉字: 详情}，后面的来源覆盖前面的
+
+    来源可以是 builtin（全部内置详情）、内置脚本的模块名（如 batch_add_details）、
+    词典文件（.pack）或 JSON / JSONL / CSV / TSV / Excel 文件。
+    """
+    builtin = {module_name for module_name, _ in dictionary.BUILTIN_SOURCES}
+    merged = {}
+    for source in sources:
+        if source == 'builtin':
+            entries = dictionary.iter_builtin()
+        elif source in builtin:
+            entries = dictionary.iter_builtin([source])
+        elif source.endswith('.pack'):
+            packed = dictionary.Dictionary(source)
+            entries = list(packed.items())
+            packed.close()
+        else:
+            entries = dictionary.iter_file(source)
+        merged.update(entries)
+    return merged
+
+
+def list_benchmarks():
+    """benchmarks 目录下可运行的基准测试"""
+    import benchmarks
+    return sorted(
+        module.name for module in pkgutil.iter_modules(benchmarks.__path__)
+        if module.name != 'common'
+    )
+
+
+def command_seed(args):
+    if args.dict:
+        packed = dictionary.Dictionary(args.dict)
+        details = dict(packed.items())
+        packed.close()
+        characters = list(details)
+    else:
+        if args.file:
+            with open(args.file, encoding='utf-8-sig') as f:
+                characters = [ch for line in f for ch in line if not ch.isspace()]
+        else:
+            characters = sorted(set(SEED_LISTS[args.list]))
+        details = iter_details(['builtin']) if args.details else None
+    characters = unique_characters(characters)
+
+    db = open_database(args.db, args.quiet)
+    try:
+        start = time.perf_counter()
+        added = seed(db, characters, details, args.batch_size, args.quiet)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    print(f"✓ 共 {len(characters)} 个汉字，新增 {added} 个，已存在 {len(characters) - added} 个")
+    print(f"✓ 耗时 {elapsed * 1000:.1f} ms")
+
+
+def command_details_apply(args):
+    try:
+        details = iter_details(args.sources or ['builtin'])
+    except (OSError, ValueError) as e:
+        print(f"✗ 读取详情失败: {e}")
+        raise SystemExit(1)
+
+    db = open_database(args.db, args.quiet)
+    try:
+        start = time.perf_counter()
+        updated = apply_details(db, details.items(), args.overwrite, args.batch_size, args.quiet)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    print(f"✓ 详情 {len(details)} 个汉字，更新 {updated} 个（{len(details) - updated} 个不存在或无需更新）")
+    print(f"✓ 耗时 {elapsed * 1000:.1f} ms")
+
+
+def command_migrate(args):
+    db = connect(args.db)
+    try:
+        version = migrations.get_version(db)
+        print(f"当前版本: {version}，最新版本: {migrations.LATEST_VERSION}")
+        if args.status:
+            for number, description, _ in migrations.MIGRATIONS:
+                mark = '✓' if number <= version else '-'
+                print(f"{mark} {number}: {description}")
+            return
+        applied = migrations.migrate(db)
+        for number, description in applied:
+            print(f"✓ 迁移 {number}: {description}")
+        if not applied:
+            print("- 已是最新版本")
+    finally:
+        db.close()
+
+
+def _database_size(db):
+    page_size = db.execute('PRAGMA page_size').fetchone()[0]
+    return db.execute('PRAGMA page_count').fetchone()[0] * page_size
+
+
+def command_vacuum(args):
+    db = open_database(args.db, quiet=True)
+    try:
+        before = _database_size(db)
+        start = time.perf_counter()
+        # 先把 WAL 写回主文件并截断，再整理碎片、更新查询规划器的统计信息
+        db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        db.execute('VACUUM')
+        db.execute('ANALYZE')
+        db.commit()
+        elapsed = time.perf_counter() - start
+        after = _database_size(db)
+    finally:
+        db.close()
+    print(f"✓ {before / 1024:.0f} KiB → {after / 1024:.0f} KiB，耗时 {elapsed:.2f} 秒")
+
+
+def command_bench(args):
+    names = list_benchmarks()
+    if not args.name:
+        print('可用的基准测试: ' + ', '.join(names))
+        return
+    if args.name not in names:
+        print(f"✗ 没有基准测试 {args.name}（可选: {', '.join(names)}）")
+        raise SystemExit(1)
+    module = importlib.import_module(f'benchmarks.{args.name}')
+    sys.argv = [f'learnword bench {args.name}'] + args.args
+    module.main()
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=DEFAULT_DATABASE, help='数据库文件路径')
+
+    writer = argparse.ArgumentParser(add_help=False)
+    writer.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='每批写入的行数')
+    writer.add_argument('--quiet', action='store_true', help='不显示进度条和迁移信息')
+
+    parser = argparse.ArgumentParser(prog='learnword', description='汉字学习数据库工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', parents=[common, writer], help='批量写入汉字')
+    source = seed_parser.add_mutually_exclusive_group()
+    source.add_argument('--list', default='grade1', choices=sorted(SEED_LISTS), help='内置汉字表')
+    source.add_argument('--file', help='文本文件中的汉字（空白分隔或连写）')
+    source.add_argument('--dict', help='词典文件（dictionary.py build 生成），写入其中全部汉字和详情')
+    seed_parser.add_argument('--details', action='store_true', help='同时写入内置的汉字详情')
+    seed_parser.set_defaults(handler=command_seed)
+
+    details_parser = subparsers.add_parser('details', help='汉字详情')
+    details_commands = details_parser.add_subparsers(dest='details_command', required=True)
+    apply_parser = details_commands.add_parser(
+        'apply', parents=[common, writer], help='把详情写入已有的汉字'
+    )
+    apply_parser.add_argument(
+        'sources', nargs='*',
+        help='builtin、内置脚本模块名、.pack 词典或 JSON / CSV / Excel 文件，默认 builtin'
+    )
+    apply_parser.add_argument('--overwrite', action='store_true', help='覆盖数据库中已有的详情')
+    apply_parser.set_defaults(handler=command_details_apply)
+
+    migrate_parser = subparsers.add_parser('migrate', parents=[common], help='升级数据库结构')
+    migrate_parser.add_argument('--status', action='store_true', help='只显示当前版本')
+    migrate_parser.set_defaults(handler=command_migrate)
+
+    vacuum_parser = subparsers.add_parser('vacuum', parents=[common], help='整理数据库文件')
+    vacuum_parser.set_defaults(handler=command_vacuum)
+
+    bench_parser = subparsers.add_parser('bench', help='运行性能基准测试')
+    bench_parser.add_argument('name', nargs='?', help='基准测试名称，省略时列出全部')
+    bench_parser.add_argument('args', nargs=argparse.REMAINDER, help='传给基准测试的参数')
+    bench_parser.set_defaults(handler=command_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
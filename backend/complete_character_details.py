@@ -5,7 +5,9 @@
 包含小学一年级常用汉字的拼音、释义、组词、造句
 """
 
-import sqlite3
+import sys
+
+import cli
 
 # 完整的汉字详细信息数据库（按拼音排序）
 complete_details = {
@@ -117,54 +119,9 @@ complete_details = {
     # 实际使用时需要继续添加剩余的汉字
 }
 
-def get_all_characters():
-    """获取数据库中所有汉字"""
-    db = sqlite3.connect('characters.db')
-    cursor = db.cursor()
-    cursor.execute('SELECT id, character FROM characters ORDER BY character')
-    characters = cursor.fetchall()
-    db.close()
-    return characters
-
 def batch_update_details():
-    """批量更新汉字详细信息"""
-    db = sqlite3.connect('characters.db')
-    cursor = db.cursor()
-    
-    all_chars = get_all_characters()
-    total = len(all_chars)
-    success_count = 0
-    skip_count = 0
-    
-    print(f"数据库中共有 {total} 个汉字")
-    print(f"详情数据中有 {len(complete_details)} 个汉字\n")
-    print("开始更新...\n")
-    
-    for char_id, char in all_chars:
-        if char in complete_details:
-            details = complete_details[char]
-            cursor.execute('''
-                UPDATE characters
-                SET pinyin = ?, definition = ?, words = ?, sentences = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            ''', (details['pinyin'], details['definition'], details['words'], details['sentences'], char_id))
-            
-            success_count += 1
-            print(f"✓ 更新 '{char}' - {details['pinyin']}")
-        else:
-            skip_count += 1
-            # print(f"○ 跳过 '{char}' (暂无详情数据)")
-    
-    db.commit()
-    db.close()
-    
-    print(f"\n" + "="*50)
-    print(f"更新完成！")
-    print(f"="*50)
-    print(f"成功更新: {success_count} 个 ({success_count/total*100:.1f}%)")
-    print(f"跳过未添加: {skip_count} 个 ({skip_count/total*100:.1f}%)")
-    print(f"总计: {total} 个汉字")
-    print(f"\n建议：可以通过Web界面继续为剩余 {skip_count} 个汉字添加详情")
+    """批量更新汉字详细信息（等同于 learnword details apply complete_character_details --overwrite）"""
+    cli.main(['details', 'apply', 'complete_character_details', '--overwrite'] + sys.argv[1:])
 
 if __name__ == '__main__':
     batch_update_details()
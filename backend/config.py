@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+后端配置
+
+所有配置项都可以通过同名的 LEARNWORD_ 前缀环境变量覆盖，例如：
+    LEARNWORD_DATABASE=/data/characters.db python3 app.py
+
+LEARNWORD_ENV 选择运行环境：development（默认，python3 app.py 开发服务器）
+或 production（gunicorn 多进程部署，见 gunicorn.conf.py）。
+"""
+
+import os
+
+
+def env_str(name, default):
+    """读取字符串类型的环境变量"""
+    return os.environ.get(f'LEARNWORD_{name}', default)
+
+
+def env_int(name, default):
+    """读取整数类型的环境变量"""
+    value = os.environ.get(f'LEARNWORD_{name}')
+    return int(value) if value not in (None, '') else default
+
+
+def env_bool(name, default):
+    """读取布尔类型的环境变量"""
+    value = os.environ.get(f'LEARNWORD_{name}')
+    if value in (None, ''):
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class Config:
+    """默认配置"""
+
+    DEBUG = False
+
+    # 服务监听地址和端口
+    HOST = env_str('HOST', '0.0.0.0')
+    PORT = env_int('PORT', 5000)
+
+    # 生产服务器（gunicorn）的工作进程数、每个进程的线程数
+    WORKERS = env_int('WORKERS', 2 * (os.cpu_count() or 1) + 1)
+    THREADS = env_int('THREADS', 4)
+    # 请求处理超时时间（秒），超时的工作进程会被重启
+    WORKER_TIMEOUT = env_int('WORKER_TIMEOUT', 120)
+    # 收到退出信号后等待处理中请求完成的时间（秒）
+    GRACEFUL_TIMEOUT = env_int('GRACEFUL_TIMEOUT', 30)
+
+    # 数据库文件路径
+    DATABASE = env_str('DATABASE', 'characters.db')
+    # 启动时自动执行数据库结构迁移（见 migrations.py）
+    MIGRATE_ON_STARTUP = env_bool('MIGRATE_ON_STARTUP', True)
+
+    # 是否启用连接池（关闭后每个请求单独建立连接）
+    DB_POOL_ENABLED = env_bool('DB_POOL_ENABLED', True)
+    # 连接池中保留的空闲连接数上限
+    DB_POOL_SIZE = env_int('DB_POOL_SIZE', 8)
+    # 等待数据库锁的超时时间（秒）
+    DB_TIMEOUT = env_int('DB_TIMEOUT', 10)
+    # 每个连接缓存的预编译语句数量
+    DB_CACHED_STATEMENTS = env_int('DB_CACHED_STATEMENTS', 256)
+
+    # 复习调度器：legacy（累计认识 3 次即掌握）或 sm2（间隔重复）
+    SCHEDULER = env_str('SCHEDULER', 'legacy')
+
+    # 随机抽字、作答、统计、错题集的存储后端（stores.py）：sqlite（默认）或 memory
+    # （启动后从数据库载入、只在进程内读写，写入不保存，只用于测试和基准测试）
+    STORAGE = env_str('STORAGE', 'sqlite')
+
+    # 导出时每批从数据库读取的行数
+    EXPORT_BATCH_SIZE = env_int('EXPORT_BATCH_SIZE', 1000)
+
+    # 导入时每批写入的行数（每批提交一次）
+    IMPORT_BATCH_SIZE = env_int('IMPORT_BATCH_SIZE', 500)
+
+    # 后台任务的上传文件和导出结果存放目录
+    JOBS_DIR = env_str('JOBS_DIR', 'jobs')
+    # 同时执行的后台任务数上限（多个进程共享）
+    JOBS_MAX_CONCURRENT = env_int('JOBS_MAX_CONCURRENT', 2)
+    # 执行中的任务超过该时间（秒）没有进展，视为已中断，重新排队
+    JOBS_LEASE_SECONDS = env_int('JOBS_LEASE_SECONDS', 600)
+
+    # 学习记录归档（archive.py）：保留最近几个月（含本月）的原始记录，更早的压缩存放到 ARCHIVE_DIR
+    ARCHIVE_KEEP_MONTHS = env_int('ARCHIVE_KEEP_MONTHS', 3)
+    ARCHIVE_DIR = env_str('ARCHIVE_DIR', 'archive')
+    # 批量作答接口接受的客户端作答时间最早为几天前（离线队列的保留时间），更早的按这个时间计
+    MARKS_MAX_AGE_DAYS = env_int('MARKS_MAX_AGE_DAYS', 7)
+
+    # 学习记录列式快照目录（snapshot.py build 生成，/api/reports/* 读取，需要 numpy）
+    SNAPSHOT_DIR = env_str('SNAPSHOT_DIR', 'snapshot')
+
+    # 汉字详情词典（dictionary.py build 生成），数据库中为空的详情从这里补上；文件不存在时不使用
+    DICTIONARY_PATH = env_str('DICTIONARY_PATH', 'dictionary.pack')
+
+    # 汉字列表、详情等读接口的 ETag 和响应缓存
+    HTTP_CACHE_ENABLED = env_bool('HTTP_CACHE_ENABLED', True)
+    # 进程内缓存的响应数
+    HTTP_CACHE_SIZE = env_int('HTTP_CACHE_SIZE', 128)
+    # 从数据库同步表版本号的间隔（秒），即其他进程的写入最多延迟多久可见
+    HTTP_CACHE_SYNC_INTERVAL = env_int('HTTP_CACHE_SYNC_INTERVAL', 1)
+
+    # 学习分析接口每个请求最多回放的新增学习记录数（在写事务中执行），其余留给后续请求或 analytics.py refresh
+    ANALYTICS_REFRESH_LIMIT = env_int('ANALYTICS_REFRESH_LIMIT', 10000)
+
+    # 按路由统计请求耗时、SQL 语句数和耗时、响应大小（/api/metrics）；每条语句多一层 Python 调用，默认关闭
+    METRICS_ENABLED = env_bool('METRICS_ENABLED', False)
+    # 多进程部署时各进程写出指标的目录，/api/metrics 汇总其中所有进程的数据；为空时只有本进程
+    METRICS_DIR = env_str('METRICS_DIR', '')
+    # 慢查询阈值（毫秒），超过的语句连同查询计划写入日志；0 为关闭
+    SLOW_QUERY_MS = env_int('SLOW_QUERY_MS', 0)
+    # 慢查询日志文件，为空时输出到标准错误
+    SLOW_QUERY_LOG = env_str('SLOW_QUERY_LOG', '')
+
+    # 建立连接时执行一次的 PRAGMA
+    SQLITE_PRAGMAS = {
+        'journal_mode': env_str('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': env_str('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        # 负数表示以 KiB 为单位
+        'cache_size': env_int('SQLITE_CACHE_SIZE', -16000),
+    }
+
+
+class DevelopmentConfig(Config):
+    """开发环境：调试模式、自动重载"""
+
+    DEBUG = env_bool('DEBUG', True)
+
+
+class ProductionConfig(Config):
+    """生产环境：由 gunicorn 运行，只监听本机，由 Nginx 反向代理"""
+
+    DEBUG = False
+    HOST = env_str('HOST', '127.0.0.1')
+    METRICS_DIR = env_str('METRICS_DIR', 'metrics')
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
+
+
+def get_config(name=None):
+    """按名称获取配置类，默认读取 LEARNWORD_ENV"""
+    name = name or env_str('ENV', 'development')
+    if name not in CONFIGS:
+        raise ValueError(f'未知的运行环境: {name}，可选: {", ".join(CONFIGS)}')
+    return CONFIGS[name]
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+数据库连接管理
+
+请求内通过 get_db() 获取连接，连接挂在 flask.g 上，请求结束时由
+teardown 归还到连接池。连接在建立时执行一次 PRAGMA，并开启预编译语句缓存，
+之后的请求直接复用，省去反复建连和解析表结构的开销。
+"""
+
+import contextlib
+import queue
+import sqlite3
+import threading
+
+from flask import current_app, g
+
+from config import Config
+from metrics import TracedConnection
+
+EXTENSION_KEY = 'learnword_db_pool'
+
+
+def connect(database=None, timeout=None, cached_statements=None, pragmas=None, factory=sqlite3.Connection):
+    """建立一个新的数据库连接并执行连接级 PRAGMA"""
+    db = sqlite3.connect(
+        database or Config.DATABASE,
+        timeout=timeout if timeout is not None else Config.DB_TIMEOUT,
+        cached_statements=cached_statements or Config.DB_CACHED_STATEMENTS,
+        # 连接会在不同的工作线程之间复用，同一时刻只归一个请求使用
+        check_same_thread=False,
+        factory=factory,
+    )
+    db.row_factory = sqlite3.Row
+
+    if pragmas is None:
+        pragmas = Config.SQLITE_PRAGMAS
+    for name, value in pragmas.items():
+        db.execute(f'PRAGMA {name} = {value}')
+
+    return db
+
+
+def connect_from_config(config):
+    """按 Flask 配置建立连接（开启指标时为统计 SQL 耗时的 TracedConnection）"""
+    db = connect(
+        config['DATABASE'],
+        timeout=config['DB_TIMEOUT'],
+        cached_statements=config['DB_CACHED_STATEMENTS'],
+        pragmas=config['SQLITE_PRAGMAS'],
+        factory=TracedConnection if config['METRICS_ENABLED'] else sqlite3.Connection,
+    )
+    if config['METRICS_ENABLED']:
+        db.slow_query_seconds = config['SLOW_QUERY_MS'] / 1000
+    return db
+
+
+class ConnectionPool:
+    """SQLite 连接池
+
+    空闲连接放在后进先出队列里，最近用过的连接（缓存最热）优先被取出。
+    池中没有空闲连接时直接新建，归还时超过 size 的连接会被关闭。
+    """
+
+    def __init__(self, config, size=8):
+        self.config = config
+        self.size = size
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self):
+        """取出一个连接"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return connect_from_config(self.config)
+
+    def release(self, db):
+        """归还连接，未提交的事务会被回滚"""
+        if db.in_transaction:
+            db.rollback()
+
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._idle.put_nowait(db)
+                    return
+                except queue.Full:
+                    pass
+        db.close()
+
+    def close(self):
+        """关闭池中所有空闲连接"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def get_pool(app=None):
+    """获取应用的连接池，首次调用时创建"""
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get(EXTENSION_KEY)
+    if pool is None:
+        pool = ConnectionPool(app.config, size=app.config['DB_POOL_SIZE'])
+        app.extensions[EXTENSION_KEY] = pool
+    return pool
+
+
+def reset_pool(app):
+    """关闭并丢弃当前连接池（修改数据库配置后调用）"""
+    pool = app.extensions.pop(EXTENSION_KEY, None)
+    if pool is not None:
+        pool.close()
+
+
+def get_db():
+    """获取当前请求的数据库连接"""
+    if 'db' not in g:
+        if current_app.config['DB_POOL_ENABLED']:
+            g.db = get_pool().acquire()
+        else:
+            g.db = connect_from_config(current_app.config)
+    return g.db
+
+
+def close_db(exception=None):
+    """请求结束时归还或关闭连接"""
+    db = g.pop('db', None)
+    if db is None:
+        return
+
+    if current_app.config['DB_POOL_ENABLED']:
+        get_pool().release(db)
+    else:
+        db.close()
+
+
+def init_app(app):
+    """在应用上注册连接管理"""
+    app.teardown_appcontext(close_db)
+
+
+def add_columns(db, table, columns):
+    """为已有表补充缺少的列，返回实际新增的列名"""
+    existing = {row[1] for row in db.execute(f'PRAGMA table_info({table})')}
+    added = []
+    for name, definition in columns:
+        if name not in existing:
+            db.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+            added.append(name)
+    return added
+
+
+@contextlib.contextmanager
+def paused_triggers(db, names):
+    """在当前事务中暂时删除触发器，退出时按原来的定义重建（不存在的触发器忽略）
+
+    必须在事务（BEGIN IMMEDIATE）中使用：其他连接看不到没有触发器的状态，也不能在这期间写入。
+    """
+    saved = []
+    for name in names:
+        row = db.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = ?", (name,)
+        ).fetchone()
+        if row is not None:
+            db.execute(f'DROP TRIGGER {name}')
+            saved.append(row[0])
+    yield
+    for statement in saved:
+        db.execute(statement)
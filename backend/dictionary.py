@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+汉字详情词典
+
+把各处的汉字详情（batch_add_details.py 等脚本中的字典、外部 JSON / CSV 文件）
+编译成一个紧凑的打包文件。文件内容按汉字排序，由固定长度的索引和数据区组成，
+以内存映射方式打开：第一次查询时只读出索引中的汉字，之后二分查找，只解码命中的
+一条详情，不需要把整个词典读进内存，多个进程共享同一份页缓存。
+
+接口读取汉字详情时，数据库中为空的字段从词典补上，不必把详情复制到每一行；
+也可以用 load 一次 executemany 把词典写入数据库（例如导出前）。
+
+文件格式（整数均为小端）：
+    文件头   magic(8) 条目数(uint32) 内容摘要(sha1, 20)
+    索引     每条 (汉字偏移, 汉字长度, 详情偏移, 详情长度)，4 个 uint32，按汉字的 UTF-8 排序
+    数据区   汉字和详情的 UTF-8 文本；内容相同的详情只保存一份
+偏移相对于数据区开头。内容摘要由全部条目计算，内容相同的词典摘要相同。
+
+    python3 dictionary.py build                           # 编译内置的详情数据
+    python3 dictionary.py build --source extra.json more.csv
+    python3 dictionary.py get 字
+    python3 dictionary.py load [--overwrite]              # 写入数据库
+"""
+
+import argparse
+import bisect
+import hashlib
+import importlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+from db import connect
+import importer
+
+MAGIC = b'LWDICT01'
+HEADER = struct.Struct('<8sI20s')
+ENTRY = struct.Struct('<IIII')
+
+FIELDS = ('pinyin', 'definition', 'words', 'sentences')
+
+# 详情各字段之间的分隔符（单元分隔符，不会出现在正文中）
+SEPARATOR = '\x1f'
+
+DEFAULT_PATH = 'dictionary.pack'
+
+# 内置的详情数据：(模块, 变量名)，后面的覆盖前面的
+BUILTIN_SOURCES = (
+    ('add_sample_details', 'sample_details'),
+    ('complete_character_details', 'complete_details'),
+    ('batch_add_details', 'character_details'),
+)
+
+EXTENSION_KEY = 'learnword_dictionary'
+
+FILL_SQL = '''
+    UPDATE characters
+    SET pinyin = ?, definition = ?, words = ?, sentences = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE character = ?
+'''
+
+# 只补空字段，已有的详情不动
+FILL_MISSING_SQL = '''
+    UPDATE characters
+    SET pinyin = IFNULL(pinyin, ?), definition = IFNULL(definition, ?),
+        words = IFNULL(words, ?), sentences = IFNULL(sentences, ?),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE character = ?
+      AND (pinyin IS NULL OR definition IS NULL OR words IS NULL OR sentences IS NULL)
+'''
+
+
+def encode_details(details):
+    """详情字典编码成一段文本，缺少的字段为空"""
+    return SEPARATOR.join(details.get(field) or '' for field in FIELDS).encode('utf-8')
+
+
+def decode_details(data):
+    """encode_details 的逆过程，空字段为 None"""
+    values = bytes(data).decode('utf-8').split(SEPARATOR)
+    return {field: value or None for field, value in zip(FIELDS, values)}
+
+
+def _normalize(character, details):
+    character = str(character).strip()
+    if not character:
+        return None
+    return character, {field: (details.get(field) or None) for field in FIELDS}
+
+
+def iter_builtin(modules=None):
+    """内置脚本中的详情数据，产出 (汉字, 详情)；modules 为模块名列表，默认全部"""
+    for module_name, attribute in BUILTIN_SOURCES:
+        if modules is not None and module_name not in modules:
+            continue
+        data = getattr(importlib.import_module(module_name), attribute)
+        items = data.items() if isinstance(data, dict) else ((item['character'], item) for item in data)
+        for character, details in items:
+            entry = _normalize(character, details)
+            if entry:
+                yield entry
+
+
+def iter_file(path):
+    """外部详情文件，产出 (汉字, 详情)
+
+    - .json: {"汉字": {"pinyin": ...}} 或 [{"character": "汉字", "pinyin": ...}]
+    - .jsonl: 每行一个对象（与导出的 JSONL 相同）
+    - .csv / .tsv / .xlsx: 与导出的表格相同，前五列为 汉字, 拼音, 释义, 组词, 造句
+    """
+    extension = os.path.splitext(path.lower())[1]
+    if extension == '.json':
+        with open(path, encoding='utf-8-sig') as f:
+            data = json.load(f)
+        items = data.items() if isinstance(data, dict) else ((item.get('character'), item) for item in data)
+    elif extension == '.jsonl':
+        with open(path, encoding='utf-8-sig') as f:
+            objects = [json.loads(line) for line in f if line.strip()]
+        items = ((item.get('character'), item) for item in objects)
+    else:
+        if not importer.is_supported(path):
+            raise ValueError(f'不支持的文件格式: {path}')
+        with open(path, 'rb') as f:
+            rows = [row for _, row in importer.iter_rows(f, path)]
+        items = (
+            (row[0], {field: importer._text(row, index) for index, field in enumerate(FIELDS, start=1)})
+            for row in rows if row and row[0] not in (None, '')
+        )
+    for character, details in items:
+        if character:
+            entry = _normalize(character, details)
+            if entry:
+                yield entry
+
+
+def build(entries, path):
+    """把 (汉字, 详情) 编译成打包文件（同一个字出现多次时以最后一次为准），返回 (条目数, 内容摘要)
+
+    先写临时文件再替换，已经打开旧文件的进程不受影响。
+    """
+    merged = {}
+    for character, details in entries:
+        merged[character.encode('utf-8')] = encode_details(details)
+    keys = sorted(merged)
+
+    data = bytearray()
+    index = []
+    shared = {}
+    digest = hashlib.sha1()
+    for key in keys:
+        value = merged[key]
+        key_offset = len(data)
+        data += key
+        value_offset = shared.get(value)
+        if value_offset is None:
+            value_offset = shared[value] = len(data)
+            data += value
+        index.append(ENTRY.pack(key_offset, len(key), value_offset, len(value)))
+        digest.update(struct.pack('<II', len(key), len(value)) + key + value)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(keys), digest.digest()))
+            f.write(b''.join(index))
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(keys), digest.hexdigest()
+
+
+class Dictionary:
+    """以内存映射方式打开的打包词典（只读，可以在线程间共享）"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, digest = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f'不是词典文件: {path}')
+        self.path = path
+        self.digest = digest.hex()
+        self._data = HEADER.size + self._count * ENTRY.size
+        self._keys = None
+        self._values = None
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return self._count
+
+    def _index(self):
+        return ENTRY.iter_unpack(self._map[HEADER.size:self._data])
+
+    def _key(self, key_offset, key_length):
+        start = self._data + key_offset
+        return self._map[start:start + key_length]
+
+    def _value(self, value_offset, value_length):
+        start = self._data + value_offset
+        return decode_details(self._map[start:start + value_length])
+
+    def _load_keys(self):
+        # 第一次查询时读出索引和全部汉字（只有几个字节一个），之后用 bisect 二分查找，
+        # 详情仍然留在映射的文件中，命中时才读取
+        if self._keys is None:
+            entries = list(self._index())
+            self._keys = [self._key(key_offset, key_length) for key_offset, key_length, _, _ in entries]
+            self._values = [(value_offset, value_length) for _, _, value_offset, value_length in entries]
+        return self._keys
+
+    def get(self, character):
+        """查询一个字的详情，不存在时返回 None"""
+        key = character.encode('utf-8')
+        keys = self._load_keys()
+        position = bisect.bisect_left(keys, key)
+        if position < len(keys) and keys[position] == key:
+            return self._value(*self._values[position])
+        return None
+
+    def __contains__(self, character):
+        key = character.encode('utf-8')
+        keys = self._load_keys()
+        position = bisect.bisect_left(keys, key)
+        return position < len(keys) and keys[position] == key
+
+    def items(self):
+        """按顺序产出全部 (汉字, 详情)"""
+        for key_offset, key_length, value_offset, value_length in self._index():
+            yield self._key(key_offset, key_length).decode('utf-8'), self._value(value_offset, value_length)
+
+
+def get_dictionary(app):
+    """应用使用的词典（每个进程打开一次），未配置或文件不存在时返回 None"""
+    if EXTENSION_KEY not in app.extensions:
+        path = app.config.get('DICTIONARY_PATH')
+        app.extensions[EXTENSION_KEY] = Dictionary(path) if path and os.path.exists(path) else None
+    return app.extensions[EXTENSION_KEY]
+
+
+def fill_missing(character, dictionary):
+    """数据库中为空的详情字段从词典补上（原地修改并返回 character）"""
+    if dictionary is None or all(character.get(field) for field in FIELDS):
+        return character
+    details = dictionary.get(character['character'])
+    if details:
+        for field in FIELDS:
+            if not character.get(field):
+                character[field] = details[field]
+    return character
+
+
+def load(db, dictionary, overwrite=False):
+    """把词典写入汉字表（一次 executemany），返回更新的行数
+
+    默认只补空字段；overwrite 为真时以词典为准覆盖已有的详情。
+    """
+    cursor = db.executemany(
+        FILL_SQL if overwrite else FILL_MISSING_SQL,
+        (
+            tuple(details[field] for field in FIELDS) + (character,)
+            for character, details in dictionary.items()
+        )
+    )
+    db.commit()
+    return cursor.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description='汉字详情词典')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='编译内置详情和外部文件')
+    build_parser.add_argument('--source', nargs='*', default=[], help='外部 JSON / JSONL / CSV / TSV / Excel 文件')
+    build_parser.add_argument('--no-builtin', action='store_true', help='不包含内置脚本中的详情')
+    build_parser.add_argument('--output', default=DEFAULT_PATH, help='词典文件路径')
+
+    get_parser = subparsers.add_parser('get', help='查询一个字')
+    get_parser.add_argument('character')
+    get_parser.add_argument('--dict', default=DEFAULT_PATH, help='词典文件路径')
+
+    load_parser = subparsers.add_parser('load', help='把词典写入数据库')
+    load_parser.add_argument('--overwrite', action='store_true', help='覆盖数据库中已有的详情')
+    load_parser.add_argument('--dict', default=DEFAULT_PATH, help='词典文件路径')
+    load_parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        def entries():
+            if not args.no_builtin:
+                yield from iter_builtin()
+            for source in args.source:
+                yield from iter_file(source)
+        try:
+            count, digest = build(entries(), args.output)
+        except (OSError, ValueError) as e:
+            print(f"✗ 编译失败: {e}")
+            raise SystemExit(1)
+        size = os.path.getsize(args.output)
+        print(f"✓ {args.output}: {count} 个汉字，{size / 1024:.1f} KiB，摘要 {digest[:12]}")
+        return
+
+    dictionary = Dictionary(args.dict)
+    try:
+        if args.command == 'get':
+            details = dictionary.get(args.character)
+            if details is None:
+                print(f"✗ 词典中没有 '{args.character}'")
+                raise SystemExit(1)
+            print(json.dumps(details, ensure_ascii=False, indent=2))
+            return
+
+        db = connect(args.db)
+        try:
+            updated = load(db, dictionary, overwrite=args.overwrite)
+        finally:
+            db.close()
+        print(f"✓ 词典 {len(dictionary)} 个汉字，更新数据库 {updated} 行")
+    finally:
+        dictionary.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+汉字库导出
+
+游标按批读取（fetchmany），数据不会一次性全部载入内存：
+- csv / jsonl: 生成器逐批编码后直接写进响应，内存占用和汉字库大小无关，
+  第一批数据编码完就开始发送
+- xlsx:        openpyxl 只写模式逐行写入临时文件，再以文件方式分块发送
+"""
+
+import csv
+import io
+import json
+from urllib.parse import quote
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+
+HEADERS = ['汉字', '拼音', '释义', '组词', '造句', '认识次数', '是否已掌握', '创建时间', '更新时间']
+
+# JSONL 使用的字段名（与表头一一对应）
+FIELDS = [
+    'character', 'pinyin', 'definition', 'words', 'sentences',
+    'recognition_count', 'is_mastered', 'created_at', 'updated_at',
+]
+
+# 列宽，与表头一一对应
+COLUMN_WIDTHS = {
+    'A': 8,   # 汉字
+    'B': 15,  # 拼音
+    'C': 30,  # 释义
+    'D': 40,  # 组词
+    'E': 50,  # 造句
+    'F': 10,  # 认识次数
+    'G': 12,  # 是否已掌握
+    'H': 20,  # 创建时间
+    'I': 20,  # 更新时间
+}
+
+FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+}
+
+EXPORT_SQL = '''
+    SELECT character, pinyin, definition, words, sentences,
+           recognition_count, is_mastered, created_at, updated_at
+    FROM characters
+    ORDER BY character
+'''
+
+
+def iter_batches(db, batch_size=1000):
+    """按批读取要导出的汉字"""
+    cursor = db.cursor()
+    cursor.execute(EXPORT_SQL)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def to_sheet_row(row):
+    """转换成表格中的一行（与原来的 Excel 格式一致）"""
+    return [
+        row['character'],
+        row['pinyin'] or '',
+        row['definition'] or '',
+        row['words'] or '',
+        row['sentences'] or '',
+        row['recognition_count'],
+        '是' if row['is_mastered'] else '否',
+        row['created_at'],
+        row['updated_at'],
+    ]
+
+
+def iter_csv(batches):
+    """逐批生成 CSV 内容（带 BOM，方便 Excel 直接打开）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(HEADERS)
+    for rows in batches:
+        writer.writerows(to_sheet_row(row) for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_jsonl(batches):
+    """逐批生成 JSON Lines 内容，每行一个汉字"""
+    for rows in batches:
+        lines = [json.dumps(dict(zip(FIELDS, row)), ensure_ascii=False) for row in rows]
+        yield ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def write_xlsx(batches, fileobj):
+    """用只写模式把汉字库写入 Excel 文件"""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title='汉字库')
+
+    # 调整列宽（只写模式下必须在写入数据前设置）
+    for column, width in COLUMN_WIDTHS.items():
+        ws.column_dimensions[column].width = width
+
+    # 设置表头样式
+    header_fill = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    header_alignment = Alignment(horizontal='center', vertical='center')
+    header = []
+    for title in HEADERS:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = header_alignment
+        header.append(cell)
+    ws.append(header)
+
+    for rows in batches:
+        for row in rows:
+            ws.append(to_sheet_row(row))
+
+    wb.save(fileobj)
+
+
+def content_disposition(filename):
+    """生成下载用的 Content-Disposition（支持中文文件名）"""
+    try:
+        filename.encode('ascii')
+        return f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        fallback = filename.encode('ascii', 'ignore').decode('ascii') or 'export'
+        return f'attachment; filename="{fallback}"; filename*=UTF-8\'\'{quote(filename)}'
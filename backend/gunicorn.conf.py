@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+gunicorn 配置
+
+    cd backend && gunicorn -c gunicorn.conf.py wsgi:app
+
+进程数、线程数、超时等读取 config.ProductionConfig，可以用 LEARNWORD_ 环境变量调整：
+    LEARNWORD_WORKERS=4 LEARNWORD_THREADS=8 gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+
+from config import ProductionConfig
+
+bind = f'{ProductionConfig.HOST}:{ProductionConfig.PORT}'
+
+# gthread：每个工作进程用线程池处理请求，流式导出不会占满进程
+worker_class = 'gthread'
+workers = ProductionConfig.WORKERS
+threads = ProductionConfig.THREADS
+
+timeout = ProductionConfig.WORKER_TIMEOUT
+graceful_timeout = ProductionConfig.GRACEFUL_TIMEOUT
+keepalive = 5
+
+# 不预加载应用：连接池和后台任务线程在各个工作进程 fork 之后再创建
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    """主进程启动时初始化数据库（在 fork 工作进程之前，只执行一次）"""
+    from app import init_db
+
+    if not os.path.exists(ProductionConfig.DATABASE):
+        init_db(ProductionConfig.DATABASE)
+        server.log.info('数据库初始化完成')
+
+    # 上次运行留下的各进程指标（计数从这次启动开始）
+    if ProductionConfig.METRICS_DIR and os.path.isdir(ProductionConfig.METRICS_DIR):
+        for filename in os.listdir(ProductionConfig.METRICS_DIR):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(ProductionConfig.METRICS_DIR, filename))
+
+
+def worker_exit(server, worker):
+    """工作进程退出前等待后台任务结束并关闭数据库连接
+
+    工作进程在加载应用之前退出时没有 wsgi 属性；加载失败（例如导入出错）时 wsgi 是 gunicorn 的
+    错误页应用，app 模块也可能导入不了。两种情况都没有需要清理的东西。
+    """
+    from flask import Flask
+
+    app = getattr(worker, 'wsgi', None)
+    if isinstance(app, Flask):
+        from app import shutdown_app
+
+        shutdown_app(app)
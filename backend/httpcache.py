@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP 缓存
+
+每张被缓存的表在 change_counters 中有一个版本号，由触发器在每次写入时加一
+（接口、导入任务、命令行脚本都会经过触发器）。读接口用版本号生成 ETag /
+Last-Modified：
+- 请求带 If-None-Match 且版本没变时直接返回 304，不查询、不序列化
+- 版本没变时重复请求直接返回缓存的 JSON（进程内 LRU），版本变化后自然失效
+
+版本号在进程内缓存，最多每 HTTP_CACHE_SYNC_INTERVAL 秒从数据库同步一次；
+本进程处理过写请求后立即重新同步，其他进程的写入最多延迟一个同步间隔可见。
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+from db import get_db
+
+EXTENSION_KEY = 'learnword_http_cache'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS change_counters (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0,
+        changed_at INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+]
+
+
+def bump(db, table):
+    """手动把表的版本号加一（绕过触发器批量写入之后调用）"""
+    db.execute(
+        '''
+        UPDATE change_counters
+        SET version = version + 1, changed_at = CAST(strftime('%s', 'now') AS INTEGER)
+        WHERE table_name = ?
+        ''',
+        (table,)
+    )
+
+
+class VersionTracker:
+    """进程内缓存的表版本号"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._versions = {}
+        self._synced_at = 0
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """本进程写入后调用，下次读取时重新同步"""
+        self._stale = True
+
+    def get(self, tables):
+        """返回 (各表版本号元组, 最近修改时间)"""
+        with self._lock:
+            if self._stale or time.monotonic() - self._synced_at >= self.interval:
+                self._stale = False
+                self._synced_at = time.monotonic()
+                self._versions = {
+                    row['table_name']: (row['version'], row['changed_at'])
+                    for row in get_db().execute('SELECT * FROM change_counters')
+                }
+            entries = [self._versions.get(table, (0, 0)) for table in tables]
+        return tuple(version for version, _ in entries), max(changed for _, changed in entries)
+
+
+class ResponseCache:
+    """按 URL 缓存序列化好的响应，容量满时淘汰最久未使用的"""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, versions, response):
+        with self._lock:
+            self._entries[key] = (versions, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class HttpCache:
+    def __init__(self, config):
+        self.enabled = config['HTTP_CACHE_ENABLED']
+        self.tracker = VersionTracker(config['HTTP_CACHE_SYNC_INTERVAL'])
+        self.responses = ResponseCache(config['HTTP_CACHE_SIZE'])
+
+
+def get_cache(app=None):
+    """获取应用的 HTTP 缓存"""
+    app = app or current_app._get_current_object()
+    cache = app.extensions.get(EXTENSION_KEY)
+    if cache is None:
+        cache = HttpCache(app.config)
+        app.extensions[EXTENSION_KEY] = cache
+    return cache
+
+
+def _make_etag(tables, versions):
+    return '-'.join(f'{table}.{version}' for table, version in zip(tables, versions))
+
+
+def _conditional(response, etag, changed_at):
+    response.set_etag(etag)
+    response.last_modified = changed_at
+    # 浏览器每次都要带 If-None-Match 重新验证
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def cached(*tables, vary=None):
+    """读接口装饰器：按 tables 的版本号做条件请求和响应缓存
+
+    响应还取决于表以外的东西（例如当天日期）时，vary 返回描述它的字符串，计入 ETag 和缓存键。
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_cache()
+            if not cache.enabled:
+                return view(*args, **kwargs)
+
+            versions, changed_at = cache.tracker.get(tables)
+            etag = _make_etag(tables, versions)
+            key = request.full_path
+            if vary is not None:
+                variant = vary()
+                etag = f'{etag}-{variant}'
+                key = f'{key}#{variant}'
+            if request.if_none_match.contains(etag):
+                # 客户端的副本仍然有效，不执行查询
+                response = current_app.response_class(status=304)
+                return _conditional(response, etag, changed_at)
+
+            stored = cache.responses.get(key, versions)
+            if stored is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed or response.cache_control.no_store:
+                    return response
+                stored = (response.get_data(), response.headers.to_wsgi_list())
+                cache.responses.put(key, versions, stored)
+
+            body, headers = stored
+            response = current_app.response_class(body, headers=headers)
+            return _conditional(response, etag, changed_at)
+        return wrapper
+    return decorator
+
+
+def no_store_unless(condition, response):
+    """condition 为假时（例如数据还没有更新完）标记响应不缓存，cached 原样返回"""
+    if not condition:
+        response.cache_control.no_store = True
+    return response
+
+
+def invalidate_on_write(response):
+    """after_request：本进程处理了写请求，版本号需要重新同步"""
+    if request.method not in SAFE_METHODS:
+        get_cache().tracker.invalidate()
+    return response
+
+
+def init_app(app):
+    """在应用上注册写请求后的失效处理"""
+    app.after_request(invalidate_on_write)
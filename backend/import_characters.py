@@ -4,7 +4,7 @@
 批量导入小学一年级下册识字表的汉字
 """
 
-import sqlite3
+import sys
 
 # 小学语文一年级下册识字表 410个生字（根据图片识别）
 characters_list = [
@@ -36,41 +36,11 @@ characters_list = [
 ]
 
 def import_characters():
-    """批量导入汉字到数据库"""
-    # 连接数据库
-    db = sqlite3.connect('characters.db')
-    cursor = db.cursor()
-    
-    # 去重
-    chars = list(set(characters_list))
-    chars.sort()  # 排序
-    
-    print(f"共有 {len(characters_list)} 个汉字（包含重复）")
-    print(f"去重后 {len(chars)} 个不重复的汉字")
-    
-    # 批量插入
-    success_count = 0
-    skip_count = 0
-    
-    for char in chars:
-        try:
-            cursor.execute(
-                'INSERT INTO characters (character) VALUES (?)',
-                (char,)
-            )
-            success_count += 1
-            print(f"✓ 添加: {char}")
-        except sqlite3.IntegrityError:
-            skip_count += 1
-            print(f"- 跳过（已存在）: {char}")
-    
-    db.commit()
-    db.close()
-    
-    print(f"\n导入完成！")
-    print(f"成功添加: {success_count} 个")
-    print(f"已存在跳过: {skip_count} 个")
-    print(f"总计: {len(chars)} 个汉字")
+    """批量导入汉字到数据库（等同于 learnword seed）"""
+    # cli 导入本模块的识字表，在这里导入（直接执行 cli.py 时避免循环导入）
+    import cli
+
+    cli.main(['seed'] + sys.argv[1:])
 
 if __name__ == '__main__':
     import_characters()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+汉字库导入
+
+按行流式读取上传的文件（Excel 只读模式 / CSV / TSV），每批校验整理后用
+INSERT ... ON CONFLICT DO UPDATE 通过 executemany 一次写入，每批提交一次。
+文件格式与导出的一致：
+    汉字, 拼音, 释义, 组词, 造句, 认识次数, 是否已掌握, 创建时间, 更新时间
+第一行是表头。
+"""
+
+import csv
+import io
+import os
+
+from openpyxl import load_workbook
+
+# 支持的文件扩展名
+EXTENSIONS = ('.xlsx', '.xlsm', '.csv', '.tsv')
+
+# 最多返回的错误信息条数
+MAX_ERRORS = 10
+
+# 视为“已掌握”的取值
+MASTERED_VALUES = ('是', 'Yes', 'TRUE', '1', 'true')
+
+UPSERT_SQL = '''
+    INSERT INTO characters
+    (character, pinyin, definition, words, sentences, recognition_count, is_mastered, due_at)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, CASE WHEN ?7 = 1 THEN NULL ELSE 0 END)
+    ON CONFLICT(character) DO UPDATE SET
+        pinyin = excluded.pinyin,
+        definition = excluded.definition,
+        words = excluded.words,
+        sentences = excluded.sentences,
+        recognition_count = excluded.recognition_count,
+        is_mastered = excluded.is_mastered,
+        due_at = CASE WHEN excluded.is_mastered = 1 THEN NULL ELSE IFNULL(characters.due_at, 0) END,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+
+def is_supported(filename):
+    """是否是支持导入的文件"""
+    return filename.lower().endswith(EXTENSIONS)
+
+
+def iter_rows(fileobj, filename):
+    """逐行读取数据（跳过表头），产出 (行号, 单元格元组)"""
+    extension = os.path.splitext(filename.lower())[1]
+
+    if extension in ('.csv', '.tsv'):
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        reader = csv.reader(text, delimiter='\t' if extension == '.tsv' else ',')
+        for line_no, row in enumerate(reader, start=1):
+            if line_no > 1:
+                yield line_no, row
+        text.detach()
+        return
+
+    # 只读模式按需解析工作表，不把整个文件载入内存
+    wb = load_workbook(filename=fileobj, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        for line_no, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+            yield line_no, row
+    finally:
+        wb.close()
+
+
+def _text(row, index):
+    """读取文本单元格，空值返回 None"""
+    if len(row) > index and row[index] not in (None, ''):
+        return str(row[index]).strip() or None
+    return None
+
+
+def normalize_row(row):
+    """把一行单元格整理成写入参数，空行返回 None，格式错误时抛出 ValueError"""
+    if not row or row[0] in (None, ''):
+        return None
+
+    character = str(row[0]).strip()
+    if not character:
+        return None
+
+    count = row[5] if len(row) > 5 else None
+    try:
+        recognition_count = int(float(count)) if count not in (None, '') else 0
+    except (TypeError, ValueError):
+        raise ValueError(f'认识次数无效: {count}')
+
+    is_mastered_str = _text(row, 6) or '否'
+    is_mastered = 1 if is_mastered_str in MASTERED_VALUES else 0
+
+    return (
+        character,
+        _text(row, 1),
+        _text(row, 2),
+        _text(row, 3),
+        _text(row, 4),
+        recognition_count,
+        is_mastered,
+    )
+
+
+def _existing_characters(db, characters):
+    """查询一批汉字中已存在的"""
+    placeholders = ','.join('?' * len(characters))
+    return {
+        row[0] for row in db.execute(
+            f'SELECT character FROM characters WHERE character IN ({placeholders})',
+            characters
+        )
+    }
+
+
+def import_rows(db, rows, batch_size=500, progress=None):
+    """分批写入数据，返回导入结果
+
+    rows 为 iter_rows 产出的 (行号, 单元格元组)；progress(已处理行数) 在每批提交后调用。
+    """
+    result = {'success': 0, 'updated': 0, 'skipped': 0, 'errors': []}
+    processed = 0
+
+    def flush(batch):
+        characters = list({params[0] for params in batch})
+        existing = _existing_characters(db, characters)
+        for params in batch:
+            if params[0] in existing:
+                result['updated'] += 1
+            else:
+                result['success'] += 1
+                # 同一批中重复出现的字，后面的按更新计
+                existing.add(params[0])
+        db.executemany(UPSERT_SQL, batch)
+        db.commit()
+        if progress:
+            progress(processed)
+
+    batch = []
+    for line_no, row in rows:
+        processed += 1
+        try:
+            params = normalize_row(row)
+        except ValueError as e:
+            result['skipped'] += 1
+            if len(result['errors']) < MAX_ERRORS:
+                result['errors'].append(f'第{line_no}行: {e}')
+            continue
+        if params is None:
+            continue
+
+        batch.append(params)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
+    elif progress:
+        progress(processed)
+
+    return result
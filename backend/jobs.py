@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+"""
+后台任务
+
+耗时较长的导入、导出放到后台线程池里执行，接口立即返回任务 id，
+客户端通过 /api/jobs/<id> 查询进度，导出完成后从 /api/jobs/<id>/download 下载。
+
+任务保存在 SQLite 的 jobs 表中，服务重启后排队中的任务会继续执行；
+执行中的任务如果超过 JOBS_LEASE_SECONDS 没有进展（进程已退出），会重新排队。
+同时运行的任务数由 JOBS_MAX_CONCURRENT 限制，多个进程共享同一个上限。
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import exporter
+import importer
+from db import connect_from_config
+
+EXTENSION_KEY = 'learnword_jobs'
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        params TEXT,
+        progress INTEGER NOT NULL DEFAULT 0,
+        result TEXT,
+        error TEXT,
+        input_path TEXT,
+        output_path TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        heartbeat_at INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)',
+]
+
+# 任务状态
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# 任务被中断后最多执行的次数，超过后标记为失败
+MAX_ATTEMPTS = 3
+
+
+def install(db):
+    """创建任务表"""
+    for statement in SCHEMA:
+        db.execute(statement)
+
+
+def to_dict(row):
+    """任务行转换成接口返回的数据"""
+    job = {
+        'id': row['id'],
+        'kind': row['kind'],
+        'status': row['status'],
+        'params': json.loads(row['params']) if row['params'] else {},
+        'progress': row['progress'],
+        'result': json.loads(row['result']) if row['result'] else None,
+        'error': row['error'],
+        'created_at': row['created_at'],
+        'started_at': row['started_at'],
+        'finished_at': row['finished_at'],
+    }
+    if row['kind'] == 'export' and row['status'] == SUCCEEDED:
+        job['download_url'] = f"/api/jobs/{row['id']}/download"
+    return job
+
+
+def run_export(db, job, report):
+    """导出任务：写入结果文件，返回结果说明"""
+    params = json.loads(job['params'])
+    batch_size = params.get('batch_size', 1000)
+    rows = 0
+
+    def batches():
+        nonlocal rows
+        for batch in exporter.iter_batches(db, batch_size):
+            rows += len(batch)
+            report(rows)
+            yield batch
+
+    with open(job['output_path'], 'wb') as output:
+        if params['format'] == 'xlsx':
+            exporter.write_xlsx(batches(), output)
+        elif params['format'] == 'csv':
+            output.writelines(exporter.iter_csv(batches()))
+        else:
+            output.writelines(exporter.iter_jsonl(batches()))
+
+    return {'rows': rows, 'filename': params['filename']}
+
+
+def run_import(db, job, report):
+    """导入任务：读取上传时保存的文件"""
+    params = json.loads(job['params'])
+    with open(job['input_path'], 'rb') as f:
+        result = importer.import_rows(
+            db,
+            importer.iter_rows(f, params['filename']),
+            batch_size=params.get('batch_size', 500),
+            progress=report
+        )
+    os.remove(job['input_path'])
+    return result
+
+
+HANDLERS = {
+    'export': run_export,
+    'import': run_import,
+}
+
+
+class JobManager:
+    """任务队列：任务存在数据库里，本进程的线程池负责执行"""
+
+    def __init__(self, config):
+        self.config = config
+        self.directory = config['JOBS_DIR']
+        self.max_concurrent = config['JOBS_MAX_CONCURRENT']
+        self.lease = config['JOBS_LEASE_SECONDS']
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent,
+            thread_name_prefix='learnword-job'
+        )
+        self._started = False
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        return connect_from_config(self.config)
+
+    def start(self):
+        """建表，并开始执行排队中的任务（只执行一次）"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        os.makedirs(self.directory, exist_ok=True)
+        db = self._connect()
+        try:
+            install(db)
+            db.commit()
+            # 租约过期的任务在领取时重新排队，也算作待执行
+            pending = db.execute(
+                'SELECT COUNT(*) FROM jobs WHERE status = ? OR (status = ? AND heartbeat_at < ?)',
+                (QUEUED, RUNNING, int(time.time()) - self.lease)
+            ).fetchone()[0]
+        finally:
+            db.close()
+
+        for _ in range(min(pending, self.max_concurrent)):
+            self._wake()
+
+    def shutdown(self):
+        """不再领取新任务，等待执行中的任务结束"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def path_for(self, job_id, suffix):
+        """任务文件的存放路径"""
+        return os.path.join(self.directory, f'{job_id}{suffix}')
+
+    def submit(self, kind, params, input_path=None, output_path=None, job_id=None):
+        """新建任务并放入队列，返回任务数据"""
+        self.start()
+        job_id = job_id or uuid.uuid4().hex
+        db = self._connect()
+        try:
+            db.execute('''
+                INSERT INTO jobs (id, kind, params, input_path, output_path)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (job_id, kind, json.dumps(params, ensure_ascii=False), input_path, output_path))
+            db.commit()
+            job = to_dict(db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+        finally:
+            db.close()
+        self._wake()
+        return job
+
+    def _wake(self):
+        self.executor.submit(self._drain)
+
+    def _claim(self, db):
+        """在并发上限内领取最早排队的任务
+
+        同一个事务里先把租约过期（进程已退出）的任务重新排队，
+        这样它们不占并发名额，也不必等进程重启才恢复。
+        """
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            now = int(time.time())
+            expired = now - self.lease
+            # 反复中断的任务（例如每次都让进程崩溃）不再重试
+            db.execute('''
+                UPDATE jobs
+                SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END,
+                    error = CASE WHEN attempts >= ? THEN '任务多次中断' END,
+                    heartbeat_at = NULL
+                WHERE status = ? AND heartbeat_at < ?
+            ''', (MAX_ATTEMPTS, FAILED, QUEUED, MAX_ATTEMPTS, RUNNING, expired))
+            running = db.execute(
+                'SELECT COUNT(*) FROM jobs WHERE status = ? AND heartbeat_at >= ?', (RUNNING, expired)
+            ).fetchone()[0]
+            row = None
+            if running < self.max_concurrent:
+                row = db.execute('''
+                    SELECT * FROM jobs
+                    WHERE status = ?
+                    ORDER BY created_at, rowid
+                    LIMIT 1
+                ''', (QUEUED,)).fetchone()
+            if row is not None:
+                db.execute('''
+                    UPDATE jobs
+                    SET status = ?, attempts = attempts + 1, heartbeat_at = ?,
+                        started_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (RUNNING, now, row['id']))
+            db.commit()
+            return row
+        except Exception:
+            db.rollback()
+            raise
+
+    def _drain(self):
+        """循环领取并执行任务，直到没有可执行的任务"""
+        db = self._connect()
+        try:
+            while True:
+                job = self._claim(db)
+                if job is None:
+                    return
+                self._run(job)
+        finally:
+            db.close()
+
+    def _run(self, job):
+        """执行一个任务并记录结果"""
+        db = self._connect()
+        status_db = self._connect()
+
+        def report(progress):
+            status_db.execute(
+                'UPDATE jobs SET progress = ?, heartbeat_at = ? WHERE id = ?',
+                (progress, int(time.time()), job['id'])
+            )
+            status_db.commit()
+
+        try:
+            result = HANDLERS[job['kind']](db, job, report)
+        except Exception as e:
+            db.rollback()
+            if job['output_path'] and os.path.exists(job['output_path']):
+                os.remove(job['output_path'])
+            status_db.execute('''
+                UPDATE jobs
+                SET status = ?, error = ?, heartbeat_at = NULL, finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (FAILED, str(e), job['id']))
+            status_db.commit()
+        else:
+            status_db.execute('''
+                UPDATE jobs
+                SET status = ?, result = ?, error = NULL, heartbeat_at = NULL,
+                    finished_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (SUCCEEDED, json.dumps(result, ensure_ascii=False), job['id']))
+            status_db.commit()
+        finally:
+            db.close()
+            status_db.close()
+
+
+def find_job(db, job_id):
+    """查询任务行，不存在时返回 None"""
+    return db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+
+
+def get_manager(app):
+    """获取应用的任务管理器"""
+    manager = app.extensions.get(EXTENSION_KEY)
+    if manager is None:
+        manager = JobManager(app.config)
+        app.extensions[EXTENSION_KEY] = manager
+    return manager
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多学习者
+
+每个学习者对每个字有一行学习进度（learner_progress），学习记录带 learner_id。
+抽字、复习计划、作答、统计和错题都只访问以 learner_id 开头的索引，
+学习者再多，单个学习者的查询也只是在自己那一段索引里做范围查找。
+
+默认学习者（id 为 1）就是升级前的唯一学习者：它的进度同时保存在 characters 表
+原来的 recognition_count / is_mastered / 调度字段中，两边由触发器互相同步，
+汉字列表的状态筛选、导入导出等按字库工作的功能继续以默认学习者为准。
+
+新增学习者时由触发器为每个已有的字补一行进度，新增汉字时为每个学习者补一行。
+
+    python3 learners.py list
+    python3 learners.py add 小明
+"""
+
+import argparse
+import sqlite3
+
+from db import connect
+
+DEFAULT_LEARNER = 1
+DEFAULT_LEARNER_NAME = '默认'
+
+# 学习进度字段（与 characters 表上默认学习者的字段一一对应）
+PROGRESS_FIELDS = ('recognition_count', 'is_mastered', 'ease', 'interval_days', 'repetitions', 'due_at')
+
+
+def _differs(left, right):
+    return ' OR '.join(f'{left}.{field} IS NOT {right}.{field}' for field in PROGRESS_FIELDS)
+
+
+def _assign(source):
+    return ', '.join(f'{field} = {source}.{field}' for field in PROGRESS_FIELDS)
+
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS learners (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS learner_progress (
+        learner_id INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        recognition_count INTEGER DEFAULT 0,
+        is_mastered BOOLEAN DEFAULT 0,
+        ease REAL DEFAULT 2.5,
+        interval_days REAL DEFAULT 0,
+        repetitions INTEGER DEFAULT 0,
+        due_at INTEGER DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (learner_id, character_id)
+    ) WITHOUT ROWID
+    ''',
+    # 抽字：(learner_id, is_mastered) 后面隐含主键 character_id，按 id 区间探测
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learner_progress_mastered
+    ON learner_progress(learner_id, is_mastered)
+    ''',
+    # 复习计划：学习者最早到期的字
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learner_progress_due
+    ON learner_progress(learner_id, due_at)
+    ''',
+    # 删除汉字时清理所有学习者的进度
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learner_progress_character
+    ON learner_progress(character_id)
+    ''',
+    # 最近学习记录、按学习者回放学习记录
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learning_records_learner
+    ON learning_records(learner_id, recorded_at)
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_learners_insert
+    AFTER INSERT ON learners
+    BEGIN
+        INSERT INTO learner_progress (learner_id, character_id)
+        SELECT NEW.id, id FROM characters;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_learners_characters_insert
+    AFTER INSERT ON characters
+    BEGIN
+        INSERT INTO learner_progress (learner_id, character_id)
+        SELECT id, NEW.id FROM learners WHERE id != {DEFAULT_LEARNER};
+        INSERT INTO learner_progress (learner_id, character_id, {', '.join(PROGRESS_FIELDS)})
+        VALUES ({DEFAULT_LEARNER}, NEW.id, {', '.join(f'NEW.{field}' for field in PROGRESS_FIELDS)});
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_learners_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM learner_progress WHERE character_id = OLD.id;
+    END
+    ''',
+    # 默认学习者的进度与 characters 表互相同步（值相同时不再写，不会来回触发）
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_learners_characters_progress
+    AFTER UPDATE OF {', '.join(PROGRESS_FIELDS)} ON characters
+    BEGIN
+        UPDATE learner_progress
+        SET {_assign('NEW')}, updated_at = NEW.updated_at
+        WHERE learner_id = {DEFAULT_LEARNER} AND character_id = NEW.id
+          AND ({_differs('learner_progress', 'NEW')});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_learners_default_progress
+    AFTER UPDATE ON learner_progress
+    WHEN NEW.learner_id = {DEFAULT_LEARNER}
+    BEGIN
+        UPDATE characters
+        SET {_assign('NEW')}, updated_at = NEW.updated_at
+        WHERE id = NEW.character_id AND ({_differs('characters', 'NEW')});
+    END
+    ''',
+]
+
+
+def characters_added(db, first_id):
+    """批量写入新字（暂停了逐行触发器）后，为每个学习者补上 id >= first_id 的新字的进度"""
+    db.execute('''
+        INSERT INTO learner_progress (learner_id, character_id)
+        SELECT l.id, c.id FROM learners l, characters c
+        WHERE l.id != ? AND c.id >= ?
+    ''', (DEFAULT_LEARNER, first_id))
+    db.execute(f'''
+        INSERT INTO learner_progress (learner_id, character_id, {', '.join(PROGRESS_FIELDS)})
+        SELECT ?, id, {', '.join(PROGRESS_FIELDS)} FROM characters WHERE id >= ?
+    ''', (DEFAULT_LEARNER, first_id))
+
+
+def parse_learner_id(value):
+    """解析 learner_id 参数，未传入时为默认学习者，格式错误时抛出 ValueError"""
+    if value is None or value == '':
+        return DEFAULT_LEARNER
+    try:
+        learner_id = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('learner_id 必须是整数')
+    if learner_id < 1:
+        raise ValueError('learner_id 必须是正整数')
+    return learner_id
+
+
+def find_learner(db, learner_id):
+    """查询学习者，不存在时返回 None"""
+    return db.execute('SELECT * FROM learners WHERE id = ?', (learner_id,)).fetchone()
+
+
+def list_learners(db):
+    """全部学习者及其掌握情况"""
+    return [dict(row) for row in db.execute('''
+        SELECT l.id, l.name, l.created_at,
+               IFNULL(s.mastered, 0) AS mastered, IFNULL(s.learning, 0) AS learning
+        FROM learners l
+        LEFT JOIN learner_stats s ON s.learner_id = l.id
+        ORDER BY l.id
+    ''')]
+
+
+def create_learner(db, name):
+    """新增学习者（为每个已有的字建立进度），名称重复时抛出 ValueError"""
+    name = (name or '').strip()
+    if not name:
+        raise ValueError('请输入学习者名称')
+    try:
+        cursor = db.execute('INSERT INTO learners (name) VALUES (?)', (name,))
+    except sqlite3.IntegrityError:
+        db.rollback()
+        raise ValueError('学习者已存在')
+    db.commit()
+    return dict(find_learner(db, cursor.lastrowid))
+
+
+def load_character(db, learner_id, character_id):
+    """汉字信息，学习状态字段为该学习者的进度；汉字不存在时返回 None"""
+    row = db.execute('''
+        SELECT c.*, p.recognition_count AS p_recognition_count, p.is_mastered AS p_is_mastered,
+               p.ease AS p_ease, p.interval_days AS p_interval_days,
+               p.repetitions AS p_repetitions, p.due_at AS p_due_at, p.updated_at AS p_updated_at
+        FROM characters c
+        JOIN learner_progress p ON p.character_id = c.id AND p.learner_id = ?
+        WHERE c.id = ?
+    ''', (learner_id, character_id)).fetchone()
+    if row is None:
+        return None
+    character = {key: row[key] for key in row.keys() if not key.startswith('p_')}
+    for field in PROGRESS_FIELDS + ('updated_at',):
+        character[field] = row[f'p_{field}']
+    return character
+
+
+def main():
+    parser = argparse.ArgumentParser(description='学习者管理')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    list_parser = subparsers.add_parser('list', help='列出全部学习者')
+    list_parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    add_parser = subparsers.add_parser('add', help='新增学习者')
+    add_parser.add_argument('name')
+    add_parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    try:
+        if args.command == 'list':
+            for learner in list_learners(db):
+                print(f"{learner['id']:>5}  {learner['name']}  已掌握 {learner['mastered']}")
+            return
+        try:
+            learner = create_learner(db, args.name)
+        except ValueError as e:
+            print(f"✗ {e}")
+            raise SystemExit(1)
+        print(f"✓ 已添加学习者 {learner['name']}（id {learner['id']}）")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
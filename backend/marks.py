@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+作答记录写入
+
+单个标记接口和批量标记接口共用存储后端的 mark（stores.py）：一次读出涉及的汉字，
+按顺序由调度器计算状态（review_marks），学习记录和最终状态各用一次 executemany 写入，
+整批只提交一次（一次 fsync）。
+"""
+
+import datetime
+import time
+
+import archive
+from config import Config
+from learners import DEFAULT_LEARNER
+from records import local_day
+
+# 批量接口一次最多接受的作答数
+MAX_BATCH = 500
+
+# SQLite 单条语句的参数个数有上限，IN (...) 查询分段执行
+QUERY_CHUNK = 500
+
+# 接口返回的精简状态字段
+RESULT_FIELDS = ('id', 'recognition_count', 'is_mastered', 'due_at')
+
+RECORD_INSERT_SQL = '''
+    INSERT INTO learning_records (learner_id, character_id, recognized, recorded_at, day)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+STATE_UPDATE_SQL = '''
+    UPDATE learner_progress
+    SET recognition_count = ?, is_mastered = ?, ease = ?, interval_days = ?,
+        repetitions = ?, due_at = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE learner_id = ? AND character_id = ?
+'''
+
+
+def parse_marks(items):
+    """校验批量接口的请求数据，返回 (汉字 id, 是否认识, 作答时间) 列表
+
+    作答时间为秒级时间戳，可以省略（写入时的取值范围见 earliest_answer）；格式错误时抛出 ValueError。
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError('marks 必须是非空数组')
+    if len(items) > MAX_BATCH:
+        raise ValueError(f'一次最多提交 {MAX_BATCH} 条作答')
+
+    marks = []
+    for index, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f'第{index}条作答格式错误')
+        character_id = item.get('character_id')
+        if not isinstance(character_id, int) or isinstance(character_id, bool):
+            raise ValueError(f'第{index}条作答缺少 character_id')
+        answered_at = item.get('answered_at')
+        if answered_at is not None and (
+            not isinstance(answered_at, (int, float)) or isinstance(answered_at, bool)
+        ):
+            raise ValueError(f'第{index}条作答的 answered_at 必须是时间戳')
+        marks.append((character_id, bool(item.get('recognized', False)), answered_at))
+    return marks
+
+
+def load_characters(db, character_ids, learner_id=DEFAULT_LEARNER):
+    """按 id 读取汉字和学习者的进度，返回 {id: 行数据}"""
+    ids = list(character_ids)
+    characters = {}
+    for start in range(0, len(ids), QUERY_CHUNK):
+        chunk = ids[start:start + QUERY_CHUNK]
+        placeholders = ','.join('?' * len(chunk))
+        for row in db.execute(f'''
+            SELECT c.id, c.character, p.recognition_count, p.is_mastered, p.ease,
+                   p.interval_days, p.repetitions, p.due_at
+            FROM learner_progress p
+            JOIN characters c ON c.id = p.character_id
+            WHERE p.learner_id = ? AND p.character_id IN ({placeholders})
+        ''', [learner_id] + chunk):
+            characters[row['id']] = dict(row)
+    return characters
+
+
+def earliest_answer(now, max_age_days=None, keep_months=None):
+    """客户端作答时间最早可以是什么时候
+
+    离线补交的作答不早于 MARKS_MAX_AGE_DAYS 天前，也不早于归档范围（已归档的月份不再写入原始记录）。
+    时钟错误的设备提交的更早时间按这个时间计，不会改写以前的每日统计。
+    应用里由调用方传入 current_app.config 的取值，省略时用 Config 的默认值。
+    """
+    if max_age_days is None:
+        max_age_days = Config.MARKS_MAX_AGE_DAYS
+    if keep_months is None:
+        keep_months = Config.ARCHIVE_KEEP_MONTHS
+    cutoff = archive.cutoff_month(keep_months, datetime.date.fromtimestamp(now))
+    return max(now - max_age_days * 24 * 60 * 60, archive.month_range(cutoff)[0])
+
+
+def review_marks(states, marks, policy, now=None, learner_id=DEFAULT_LEARNER,
+                 max_age_days=None, keep_months=None):
+    """按顺序由调度器计算状态（原地更新 states），返回 (要写入的学习记录, 不存在的汉字 id)
+
+    marks 为 (汉字 id, 是否认识, 作答时间) 列表；作答时间为空或晚于当前时间时按当前时间计，
+    早于 earliest_answer(now, max_age_days, keep_months) 时按这个时间计。
+    学习记录为 (learner_id, character_id, recognized, recorded_at, day)。
+    """
+    now = int(time.time()) if now is None else now
+    earliest = earliest_answer(now, max_age_days, keep_months)
+    records = []
+    missing = []
+    for character_id, recognized, answered_at in marks:
+        state = states.get(character_id)
+        if state is None:
+            if character_id not in missing:
+                missing.append(character_id)
+            continue
+        answered_at = now if answered_at is None else min(max(int(answered_at), earliest), now)
+        states[character_id] = policy.review(state, recognized, answered_at)
+        records.append((learner_id, character_id, recognized, answered_at, local_day(answered_at)))
+    return records, missing
+
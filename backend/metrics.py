@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+请求性能指标
+
+每个请求记录以下直方图，按路由（URL 规则，如 /api/characters/<int:char_id>）和方法区分，
+由 /api/metrics 以 Prometheus 文本格式输出：
+- learnword_http_request_duration_seconds   请求处理耗时
+- learnword_http_request_sql_queries        执行的 SQL 语句数
+- learnword_http_request_sql_seconds        SQL 耗时（执行语句，SELECT 为取到第一行）
+- learnword_http_response_size_bytes        响应大小（流式响应不计）
+另有按状态码计数的 learnword_http_requests_total。
+
+SQL 由 TracedConnection 统计：get_db() 的连接在 METRICS_ENABLED 时使用这个连接类，
+每条语句的耗时记到当前请求上（请求之外的连接，如后台任务，只参与慢查询日志）。
+只在 execute / executemany 上计时，读取结果仍走原生游标，不给逐行读取加 Python 调用。
+METRICS_ENABLED 默认关闭，需要时打开。
+
+慢查询日志默认关闭。LEARNWORD_SLOW_QUERY_MS 大于 0 时，执行超过该毫秒数的语句连同
+EXPLAIN QUERY PLAN 写入 learnword.slow_query 日志（LEARNWORD_SLOW_QUERY_LOG 指定文件，
+默认输出到标准错误）。
+
+指标保存在进程内存中。gunicorn 有多个工作进程时设置 METRICS_DIR：各进程定期把指标
+写到这个目录，/api/metrics 汇总所有进程的数据。
+"""
+
+import bisect
+import contextvars
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, request
+
+EXTENSION_KEY = 'learnword_metrics'
+
+SLOW_QUERY_LOGGER = 'learnword.slow_query'
+
+# 写入 METRICS_DIR 的最短间隔（秒）
+FLUSH_INTERVAL = 5
+
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# (指标名, 说明, 桶)
+HISTOGRAMS = {
+    'learnword_http_request_duration_seconds': ('请求处理耗时（秒）', TIME_BUCKETS),
+    'learnword_http_request_sql_queries': ('每个请求执行的 SQL 语句数', QUERY_BUCKETS),
+    'learnword_http_request_sql_seconds': ('每个请求的 SQL 耗时（秒）', TIME_BUCKETS),
+    'learnword_http_response_size_bytes': ('响应大小（字节）', SIZE_BUCKETS),
+}
+COUNTERS = {
+    'learnword_http_requests_total': '请求数',
+}
+
+# 没有匹配到路由的请求（404）
+UNMATCHED_ROUTE = '<unmatched>'
+
+_current = contextvars.ContextVar('learnword_query_stats', default=None)
+_slow_log = logging.getLogger(SLOW_QUERY_LOGGER)
+
+
+class QueryStats:
+    """一个请求中执行的 SQL 语句数和耗时"""
+
+    __slots__ = ('route', 'queries', 'seconds')
+
+    def __init__(self, route=None):
+        self.route = route
+        self.queries = 0
+        self.seconds = 0.0
+
+
+def _plan(db, sql, parameters):
+    """EXPLAIN QUERY PLAN，按层级缩进"""
+    try:
+        rows = sqlite3.Connection.execute(db, f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+    except (sqlite3.Error, ValueError):
+        return []
+    depth = {0: 0}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, 0) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return lines
+
+
+def _log_slow(db, sql, parameters, elapsed):
+    stats = _current.get()
+    route = stats.route if stats is not None else '-'
+    lines = [f'{elapsed * 1000:.1f} ms  {route}  {" ".join(sql.split())}']
+    lines.extend(_plan(db, sql, parameters))
+    _slow_log.warning('\n'.join(lines))
+
+
+class TracedCursor(sqlite3.Cursor):
+    """把执行语句的耗时记到当前请求上（读取结果不计时）"""
+
+    def _add(self, start):
+        elapsed = time.perf_counter() - start
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+        return elapsed
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = self._add(start)
+            threshold = self.connection.slow_query_seconds
+            if threshold and elapsed >= threshold:
+                _log_slow(self.connection, sql, parameters, elapsed)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            elapsed = self._add(start)
+            threshold = self.connection.slow_query_seconds
+            if threshold and elapsed >= threshold:
+                _log_slow(self.connection, sql, (), elapsed)
+
+
+class TracedConnection(sqlite3.Connection):
+    """游标默认为 TracedCursor 的连接（sqlite3.connect 的 factory）"""
+
+    # 慢查询阈值（秒），0 为不记录
+    slow_query_seconds = 0
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # 最后一个为 +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def merge(self, counts, total):
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.sum += total
+
+
+class Registry:
+    """进程内的指标：{(指标名, 标签元组): Histogram 或计数}"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, labels, value):
+        with self._lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = Histogram(HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+    def increment(self, name, labels):
+        with self._lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + 1
+
+    def snapshot(self):
+        """可以写成 JSON 的副本"""
+        with self._lock:
+            return {
+                'histograms': [
+                    [name, list(labels), histogram.counts, histogram.sum]
+                    for (name, labels), histogram in self.histograms.items()
+                ],
+                'counters': [
+                    [name, list(labels), value] for (name, labels), value in self.counters.items()
+                ],
+            }
+
+    def merge(self, snapshot):
+        with self._lock:
+            for name, labels, counts, total in snapshot['histograms']:
+                if name not in HISTOGRAMS:
+                    continue
+                key = (name, tuple(tuple(label) for label in labels))
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = Histogram(HISTOGRAMS[name][1])
+                histogram.merge(counts, total)
+            for name, labels, value in snapshot['counters']:
+                key = (name, tuple(tuple(label) for label in labels))
+                self.counters[key] = self.counters.get(key, 0) + value
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def render(registry):
+    """Prometheus 文本格式（0.0.4）"""
+    lines = []
+    for name, (description, buckets) in HISTOGRAMS.items():
+        series = sorted((labels, h) for (n, labels), h in registry.histograms.items() if n == name)
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, histogram in series:
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {histogram.sum:.6f}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    for name, description in COUNTERS.items():
+        series = sorted((labels, value) for (n, labels), value in registry.counters.items() if n == name)
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} counter')
+        for labels, value in series:
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class Metrics:
+    def __init__(self, config):
+        self.enabled = config['METRICS_ENABLED']
+        self.directory = config['METRICS_DIR']
+        self.registry = Registry()
+        self._flushed_at = time.monotonic()
+        self._flush_lock = threading.Lock()
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'{os.getpid()}.json')
+
+    def flush(self, force=False):
+        """把本进程的指标写到 METRICS_DIR（最多每 FLUSH_INTERVAL 秒一次）"""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < FLUSH_INTERVAL:
+            return
+        with self._flush_lock:
+            self._flushed_at = now
+            os.makedirs(self.directory, exist_ok=True)
+            temporary = f'{self.path}.tmp'
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(self.registry.snapshot(), f)
+            os.replace(temporary, self.path)
+
+    def collect(self):
+        """本进程的指标，设置了 METRICS_DIR 时汇总所有进程写出的指标"""
+        if not self.directory:
+            return self.registry
+        self.flush(force=True)
+        merged = Registry()
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename), encoding='utf-8') as f:
+                    merged.merge(json.load(f))
+            except (OSError, ValueError):
+                # 另一个进程正在替换文件，下次再读
+                continue
+        return merged
+
+
+def get_metrics(app=None):
+    """获取应用的指标"""
+    app = app or current_app._get_current_object()
+    metrics = app.extensions.get(EXTENSION_KEY)
+    if metrics is None:
+        metrics = Metrics(app.config)
+        app.extensions[EXTENSION_KEY] = metrics
+    return metrics
+
+
+def start_request():
+    """before_request：开始计时，之后的 SQL 记到这个请求上"""
+    if not get_metrics().enabled:
+        return
+    rule = request.url_rule
+    g.metrics_started = time.perf_counter()
+    g.metrics_token = _current.set(QueryStats(rule.rule if rule is not None else UNMATCHED_ROUTE))
+
+
+def finish_request(response):
+    """after_request：记录耗时、SQL 和响应大小"""
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    stats = _current.get()
+    _current.reset(g.pop('metrics_token'))
+
+    metrics = get_metrics()
+    labels = (('route', stats.route), ('method', request.method))
+    registry = metrics.registry
+    registry.observe('learnword_http_request_duration_seconds', labels, time.perf_counter() - started)
+    registry.observe('learnword_http_request_sql_queries', labels, stats.queries)
+    registry.observe('learnword_http_request_sql_seconds', labels, stats.seconds)
+    if not response.is_streamed and response.content_length is not None:
+        registry.observe('learnword_http_response_size_bytes', labels, response.content_length)
+    registry.increment('learnword_http_requests_total', labels + (('status', str(response.status_code)),))
+    metrics.flush()
+    return response
+
+
+def init_app(app):
+    """注册请求计时，按配置打开慢查询日志文件"""
+    app.before_request(start_request)
+    app.after_request(finish_request)
+
+    path = app.config['SLOW_QUERY_LOG']
+    if path and not any(getattr(h, 'baseFilename', None) == os.path.abspath(path) for h in _slow_log.handlers):
+        handler = logging.FileHandler(path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        _slow_log.addHandler(handler)
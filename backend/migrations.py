@@ -0,0 +1,1362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库结构迁移
+
+数据库当前的结构版本记录在 PRAGMA user_version 中，MIGRATIONS 按版本号排列，
+启动时（create_app）自动执行尚未执行的迁移。每个迁移在单独的事务中执行，
+版本号和结构修改一起提交，失败时整体回滚，下次启动重新执行。
+
+版本 1~6 覆盖了 user_version 出现之前的各种旧数据库（旧版 init_db 创建的、
+执行过 upgrade_db.py 的），写法上可以重复执行；之后新增的迁移只会执行一次。
+
+每个版本的建表、索引和触发器语句按发布时的样子保存在这里，不引用各模块的 SCHEMA
+（那里是最新的结构）。表结构有变化时新增一个版本，不要修改已发布的语句；
+搜索索引、词语拆分、分析汇总等派生数据仍由对应模块的 rebuild 计算。
+
+手动执行：
+    python3 migrations.py              # 迁移到最新版本
+    python3 migrations.py --status     # 只查看当前版本
+"""
+
+import argparse
+
+from config import Config
+from db import add_columns, connect
+import analytics
+import scheduler
+import search
+import vocabulary
+
+# 汉字详情字段（旧数据库由 upgrade_db.py 逐个添加）
+DETAIL_COLUMNS = [
+    ('words', 'TEXT DEFAULT NULL'),
+    ('sentences', 'TEXT DEFAULT NULL'),
+    ('pinyin', 'TEXT DEFAULT NULL'),
+    ('definition', 'TEXT DEFAULT NULL'),
+]
+
+BASE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS characters (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        character TEXT UNIQUE NOT NULL,
+        recognition_count INTEGER DEFAULT 0,
+        is_mastered BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        words TEXT DEFAULT NULL,
+        sentences TEXT DEFAULT NULL,
+        pinyin TEXT DEFAULT NULL,
+        definition TEXT DEFAULT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS learning_records (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        character_id INTEGER NOT NULL,
+        recognized BOOLEAN NOT NULL,
+        recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (character_id) REFERENCES characters(id)
+    )
+    ''',
+]
+
+# 高频查询使用的索引：按字统计认识/不认识次数、按时间查询最近记录和每日统计，抽字按掌握状态
+INDEXES = [
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learning_records_character
+    ON learning_records(character_id, recognized)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learning_records_recorded_at
+    ON learning_records(recorded_at)
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_characters_is_mastered ON characters(is_mastered)',
+]
+
+
+# 以下是各版本发布时的表结构，与当时各模块的 SCHEMA 相同。各模块的 SCHEMA 是最新的结构
+# （供新功能和命令行工具参考），这里的语句不随它们改动：表结构有变化时新增一个版本
+
+# 版本 3：复习调度字段
+SCHEDULE_COLUMNS_V3 = [
+    ('ease', 'REAL DEFAULT 2.5'),
+    ('interval_days', 'REAL DEFAULT 0'),
+    ('repetitions', 'INTEGER DEFAULT 0'),
+    ('due_at', 'INTEGER DEFAULT 0'),
+]
+
+SCHEDULE_SCHEMA_V3 = [
+    'CREATE INDEX IF NOT EXISTS idx_characters_due_at ON characters(due_at)',
+]
+
+# 统计汇总的判断条件，NULL 视为不满足
+MASTERED = 'IFNULL({row}.is_mastered = 1, 0)'
+LEARNING = 'IFNULL({row}.is_mastered = 0 AND {row}.recognition_count > 0, 0)'
+NOT_STARTED = 'IFNULL({row}.recognition_count = 0, 0)'
+
+
+def _summary_delta(row, sign):
+    """汇总行随一行学习状态增减的 SET 子句"""
+    return f'''
+        total = total {sign} 1,
+        mastered = mastered {sign} {MASTERED.format(row=row)},
+        learning = learning {sign} {LEARNING.format(row=row)},
+        not_started = not_started {sign} {NOT_STARTED.format(row=row)}
+    '''
+
+
+# 版本 4：全局汇总和不区分学习者的按天统计（版本 12 改为按学习者统计）
+STATS_SCHEMA_V4 = [
+    '''
+    CREATE TABLE IF NOT EXISTS stats_summary (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL DEFAULT 0,
+        mastered INTEGER NOT NULL DEFAULT 0,
+        learning INTEGER NOT NULL DEFAULT 0,
+        not_started INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        day TEXT PRIMARY KEY,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        recognized_count INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS daily_recognized (
+        day TEXT NOT NULL,
+        character_id INTEGER NOT NULL,
+        last_recorded_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (day, character_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_daily_recognized_character
+    ON daily_recognized(character_id)
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_characters_insert
+    AFTER INSERT ON characters
+    BEGIN
+        UPDATE stats_summary SET {_summary_delta('NEW', '+')} WHERE id = 1;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_characters_update
+    AFTER UPDATE OF recognition_count, is_mastered ON characters
+    BEGIN
+        UPDATE stats_summary SET {_summary_delta('OLD', '-')} WHERE id = 1;
+        UPDATE stats_summary SET {_summary_delta('NEW', '+')} WHERE id = 1;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        UPDATE stats_summary SET {_summary_delta('OLD', '-')} WHERE id = 1;
+        DELETE FROM daily_recognized WHERE character_id = OLD.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_records_insert
+    AFTER INSERT ON learning_records
+    BEGIN
+        INSERT INTO daily_stats (day, review_count, recognized_count)
+        VALUES (DATE(NEW.recorded_at, 'localtime'), 1, IFNULL(NEW.recognized = 1, 0))
+        ON CONFLICT(day) DO UPDATE SET
+            review_count = review_count + 1,
+            recognized_count = recognized_count + excluded.recognized_count;
+
+        INSERT INTO daily_recognized (day, character_id, last_recorded_at)
+        SELECT DATE(NEW.recorded_at, 'localtime'), NEW.character_id, NEW.recorded_at
+        WHERE NEW.recognized = 1
+        ON CONFLICT(day, character_id) DO UPDATE SET
+            last_recorded_at = MAX(last_recorded_at, excluded.last_recorded_at);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_records_delete
+    AFTER DELETE ON learning_records
+    BEGIN
+        UPDATE daily_stats SET
+            review_count = review_count - 1,
+            recognized_count = recognized_count - IFNULL(OLD.recognized = 1, 0)
+        WHERE day = DATE(OLD.recorded_at, 'localtime');
+    END
+    ''',
+]
+
+# 版本 5：不区分学习者的错题集（版本 12 改为按学习者记录）
+MISTAKES_SCHEMA_V5 = [
+    '''
+    CREATE TABLE IF NOT EXISTS character_mistakes (
+        character_id INTEGER PRIMARY KEY,
+        mistake_count INTEGER NOT NULL DEFAULT 0,
+        last_mistake_at TIMESTAMP,
+        ever_recognized INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_character_mistakes_open
+    ON character_mistakes(ever_recognized, last_mistake_at, character_id, mistake_count)
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_mistakes_records_insert
+    AFTER INSERT ON learning_records
+    BEGIN
+        INSERT INTO character_mistakes (character_id, mistake_count, last_mistake_at, ever_recognized)
+        VALUES (
+            NEW.character_id,
+            IFNULL(NEW.recognized = 0, 0),
+            CASE WHEN NEW.recognized = 0 THEN NEW.recorded_at END,
+            IFNULL(NEW.recognized = 1, 0)
+        )
+        ON CONFLICT(character_id) DO UPDATE SET
+            mistake_count = mistake_count + excluded.mistake_count,
+            last_mistake_at = COALESCE(
+                MAX(last_mistake_at, excluded.last_mistake_at),
+                last_mistake_at,
+                excluded.last_mistake_at
+            ),
+            ever_recognized = MAX(ever_recognized, excluded.ever_recognized);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_mistakes_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM character_mistakes WHERE character_id = OLD.id;
+    END
+    ''',
+]
+
+# 版本 6：后台任务
+JOBS_SCHEMA_V6 = [
+    '''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        params TEXT,
+        progress INTEGER NOT NULL DEFAULT 0,
+        result TEXT,
+        error TEXT,
+        input_path TEXT,
+        output_path TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        heartbeat_at INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)',
+]
+
+# 版本 7：学习会话
+SESSIONS_SCHEMA_V7 = [
+    '''
+    CREATE TABLE IF NOT EXISTS study_sessions (
+        id TEXT PRIMARY KEY,
+        mode TEXT NOT NULL,
+        card_count INTEGER NOT NULL DEFAULT 0,
+        created_at INTEGER NOT NULL,
+        last_active_at INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_study_sessions_last_active
+    ON study_sessions(last_active_at)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS session_cards (
+        session_id TEXT NOT NULL,
+        character_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (session_id, character_id)
+    ) WITHOUT ROWID
+    ''',
+]
+
+# 版本 8：表版本号（之后新增的表在各自的版本中调用 track_table）
+COUNTERS_SCHEMA_V8 = [
+    '''
+    CREATE TABLE IF NOT EXISTS change_counters (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0,
+        changed_at INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+]
+
+COUNTED_TABLES_V8 = ('characters', 'learning_records')
+
+
+def _counter_triggers(table):
+    bump = f'''
+        UPDATE change_counters
+        SET version = version + 1, changed_at = CAST(strftime('%s', 'now') AS INTEGER)
+        WHERE table_name = '{table}';
+    '''
+    return [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_counter_{table}_{event.lower()}
+        AFTER {event} ON {table}
+        BEGIN
+            {bump}
+        END
+        '''
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ]
+
+
+def track_table(db, table):
+    """为表创建版本号和维护版本号的触发器"""
+    for statement in _counter_triggers(table):
+        db.execute(statement)
+    db.execute(
+        '''
+        INSERT OR IGNORE INTO change_counters (table_name, version, changed_at)
+        VALUES (?, 1, CAST(strftime('%s', 'now') AS INTEGER))
+        ''',
+        (table,)
+    )
+
+
+# 版本 9：汉字列表排序和筛选
+HAS_DETAILS = '(pinyin IS NOT NULL OR definition IS NOT NULL OR words IS NOT NULL OR sentences IS NOT NULL)'
+
+CATALOG_INDEXES_V9 = [
+    'CREATE INDEX IF NOT EXISTS idx_characters_created_at ON characters(created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_characters_mastered_created ON characters(is_mastered, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_characters_count_created ON characters(recognition_count, created_at)',
+    f'''
+    CREATE INDEX IF NOT EXISTS idx_characters_details_created
+    ON characters(created_at) WHERE {HAS_DETAILS}
+    ''',
+]
+
+# 版本 10：全文搜索索引和各列的 bm25 权重
+SEARCH_SCHEMA_V10 = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS character_search USING fts5(
+        character, pinyin, pinyin_plain, pinyin_initials, definition, words, sentences,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS search_pending (
+        character_id INTEGER PRIMARY KEY
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_search_characters_insert
+    AFTER INSERT ON characters
+    BEGIN
+        INSERT OR IGNORE INTO search_pending (character_id) VALUES (NEW.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_search_characters_update
+    AFTER UPDATE OF character, pinyin, definition, words, sentences ON characters
+    BEGIN
+        INSERT OR IGNORE INTO search_pending (character_id) VALUES (NEW.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_search_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        INSERT OR IGNORE INTO search_pending (character_id) VALUES (OLD.id);
+    END
+    ''',
+]
+
+SEARCH_WEIGHTS_V10 = (10.0, 5.0, 5.0, 2.0, 1.0, 2.0, 0.5)
+
+# 版本 11：词语和例句
+VOCABULARY_SCHEMA_V11 = [
+    '''
+    CREATE TABLE IF NOT EXISTS words (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT UNIQUE NOT NULL,
+        char_count INTEGER NOT NULL,
+        unmastered_count INTEGER NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_words_unmastered ON words(unmastered_count, id)',
+    '''
+    CREATE TABLE IF NOT EXISTS word_characters (
+        character TEXT NOT NULL,
+        word_id INTEGER NOT NULL,
+        PRIMARY KEY (character, word_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_word_characters_word ON word_characters(word_id)',
+    '''
+    CREATE TABLE IF NOT EXISTS character_words (
+        character_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        word_id INTEGER NOT NULL,
+        PRIMARY KEY (character_id, position)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_character_words_word ON character_words(word_id)',
+    '''
+    CREATE TABLE IF NOT EXISTS sentences (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        character_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        text TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_sentences_character ON sentences(character_id, position)',
+    '''
+    CREATE TABLE IF NOT EXISTS vocabulary_pending (
+        character_id INTEGER PRIMARY KEY
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_vocabulary_characters_insert
+    AFTER INSERT ON characters
+    BEGIN
+        INSERT OR IGNORE INTO vocabulary_pending (character_id)
+        SELECT NEW.id WHERE NEW.words IS NOT NULL OR NEW.sentences IS NOT NULL;
+        UPDATE words SET unmastered_count = unmastered_count - 1
+        WHERE NEW.is_mastered = 1
+          AND id IN (SELECT word_id FROM word_characters WHERE character = NEW.character);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_vocabulary_characters_text
+    AFTER UPDATE OF words, sentences ON characters
+    BEGIN
+        INSERT OR IGNORE INTO vocabulary_pending (character_id) VALUES (NEW.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_vocabulary_characters_mastered
+    AFTER UPDATE OF character, is_mastered ON characters
+    WHEN OLD.is_mastered IS NOT NEW.is_mastered OR OLD.character IS NOT NEW.character
+    BEGIN
+        UPDATE words SET unmastered_count = unmastered_count + 1
+        WHERE OLD.is_mastered = 1
+          AND id IN (SELECT word_id FROM word_characters WHERE character = OLD.character);
+        UPDATE words SET unmastered_count = unmastered_count - 1
+        WHERE NEW.is_mastered = 1
+          AND id IN (SELECT word_id FROM word_characters WHERE character = NEW.character);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_vocabulary_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        INSERT OR IGNORE INTO vocabulary_pending (character_id) VALUES (OLD.id);
+        UPDATE words SET unmastered_count = unmastered_count + 1
+        WHERE OLD.is_mastered = 1
+          AND id IN (SELECT word_id FROM word_characters WHERE character = OLD.character);
+    END
+    ''',
+]
+
+# 版本 12：多学习者。升级前的进度属于默认学习者，与 characters 上的字段互相同步
+DEFAULT_LEARNER = 1
+DEFAULT_LEARNER_NAME = '默认'
+
+PROGRESS_FIELDS_V12 = ('recognition_count', 'is_mastered', 'ease', 'interval_days', 'repetitions', 'due_at')
+
+LEARNER_COLUMNS_V12 = [
+    ('learning_records', [('learner_id', f'INTEGER NOT NULL DEFAULT {DEFAULT_LEARNER}')]),
+    ('study_sessions', [('learner_id', f'INTEGER NOT NULL DEFAULT {DEFAULT_LEARNER}')]),
+]
+
+
+def _differs(left, right):
+    return ' OR '.join(f'{left}.{field} IS NOT {right}.{field}' for field in PROGRESS_FIELDS_V12)
+
+
+def _assign(source):
+    return ', '.join(f'{field} = {source}.{field}' for field in PROGRESS_FIELDS_V12)
+
+
+LEARNERS_SCHEMA_V12 = [
+    '''
+    CREATE TABLE IF NOT EXISTS learners (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT UNIQUE NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS learner_progress (
+        learner_id INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        recognition_count INTEGER DEFAULT 0,
+        is_mastered BOOLEAN DEFAULT 0,
+        ease REAL DEFAULT 2.5,
+        interval_days REAL DEFAULT 0,
+        repetitions INTEGER DEFAULT 0,
+        due_at INTEGER DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (learner_id, character_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learner_progress_mastered
+    ON learner_progress(learner_id, is_mastered)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learner_progress_due
+    ON learner_progress(learner_id, due_at)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learner_progress_character
+    ON learner_progress(character_id)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learning_records_learner
+    ON learning_records(learner_id, recorded_at)
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_learners_insert
+    AFTER INSERT ON learners
+    BEGIN
+        INSERT INTO learner_progress (learner_id, character_id)
+        SELECT NEW.id, id FROM characters;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_learners_characters_insert
+    AFTER INSERT ON characters
+    BEGIN
+        INSERT INTO learner_progress (learner_id, character_id)
+        SELECT id, NEW.id FROM learners WHERE id != {DEFAULT_LEARNER};
+        INSERT INTO learner_progress (learner_id, character_id, {', '.join(PROGRESS_FIELDS_V12)})
+        VALUES ({DEFAULT_LEARNER}, NEW.id, {', '.join(f'NEW.{field}' for field in PROGRESS_FIELDS_V12)});
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_learners_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM learner_progress WHERE character_id = OLD.id;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_learners_characters_progress
+    AFTER UPDATE OF {', '.join(PROGRESS_FIELDS_V12)} ON characters
+    BEGIN
+        UPDATE learner_progress
+        SET {_assign('NEW')}, updated_at = NEW.updated_at
+        WHERE learner_id = {DEFAULT_LEARNER} AND character_id = NEW.id
+          AND ({_differs('learner_progress', 'NEW')});
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_learners_default_progress
+    AFTER UPDATE ON learner_progress
+    WHEN NEW.learner_id = {DEFAULT_LEARNER}
+    BEGIN
+        UPDATE characters
+        SET {_assign('NEW')}, updated_at = NEW.updated_at
+        WHERE id = NEW.character_id AND ({_differs('characters', 'NEW')});
+    END
+    ''',
+]
+
+# 版本 4 的按天统计和错题集不区分学习者，版本 12 删除后按学习者重建
+STATS_LEGACY_OBJECTS_V12 = [
+    ('TRIGGER', 'trg_stats_records_insert'),
+    ('TRIGGER', 'trg_stats_records_delete'),
+    ('TRIGGER', 'trg_stats_characters_delete'),
+    ('TABLE', 'daily_stats'),
+    ('TABLE', 'daily_recognized'),
+]
+
+MISTAKES_LEGACY_OBJECTS_V12 = [
+    ('TRIGGER', 'trg_mistakes_records_insert'),
+    ('TRIGGER', 'trg_mistakes_characters_delete'),
+    ('INDEX', 'idx_character_mistakes_open'),
+    ('TABLE', 'character_mistakes'),
+]
+
+# 按学习者的汇总，以及不再清理按天统计的全局汇总删除触发器
+STATS_SCHEMA_V12 = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        UPDATE stats_summary SET {_summary_delta('OLD', '-')} WHERE id = 1;
+    END
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS learner_stats (
+        learner_id INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        mastered INTEGER NOT NULL DEFAULT 0,
+        learning INTEGER NOT NULL DEFAULT 0,
+        not_started INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        learner_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        recognized_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (learner_id, day)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS daily_recognized (
+        learner_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        character_id INTEGER NOT NULL,
+        last_recorded_at TIMESTAMP NOT NULL,
+        PRIMARY KEY (learner_id, day, character_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_daily_recognized_character
+    ON daily_recognized(character_id)
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_progress_insert
+    AFTER INSERT ON learner_progress
+    BEGIN
+        INSERT INTO learner_stats (learner_id, total, mastered, learning, not_started)
+        VALUES (
+            NEW.learner_id, 1,
+            {MASTERED.format(row='NEW')}, {LEARNING.format(row='NEW')}, {NOT_STARTED.format(row='NEW')}
+        )
+        ON CONFLICT(learner_id) DO UPDATE SET
+            total = total + 1,
+            mastered = mastered + excluded.mastered,
+            learning = learning + excluded.learning,
+            not_started = not_started + excluded.not_started;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_progress_update
+    AFTER UPDATE OF recognition_count, is_mastered ON learner_progress
+    BEGIN
+        UPDATE learner_stats SET {_summary_delta('OLD', '-')} WHERE learner_id = OLD.learner_id;
+        UPDATE learner_stats SET {_summary_delta('NEW', '+')} WHERE learner_id = NEW.learner_id;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_progress_delete
+    AFTER DELETE ON learner_progress
+    BEGIN
+        UPDATE learner_stats SET {_summary_delta('OLD', '-')} WHERE learner_id = OLD.learner_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_records_insert
+    AFTER INSERT ON learning_records
+    BEGIN
+        INSERT INTO daily_stats (learner_id, day, review_count, recognized_count)
+        VALUES (NEW.learner_id, DATE(NEW.recorded_at, 'localtime'), 1, IFNULL(NEW.recognized = 1, 0))
+        ON CONFLICT(learner_id, day) DO UPDATE SET
+            review_count = review_count + 1,
+            recognized_count = recognized_count + excluded.recognized_count;
+
+        INSERT INTO daily_recognized (learner_id, day, character_id, last_recorded_at)
+        SELECT NEW.learner_id, DATE(NEW.recorded_at, 'localtime'), NEW.character_id, NEW.recorded_at
+        WHERE NEW.recognized = 1
+        ON CONFLICT(learner_id, day, character_id) DO UPDATE SET
+            last_recorded_at = MAX(last_recorded_at, excluded.last_recorded_at);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_records_delete
+    AFTER DELETE ON learning_records
+    BEGIN
+        UPDATE daily_stats SET
+            review_count = review_count - 1,
+            recognized_count = recognized_count - IFNULL(OLD.recognized = 1, 0)
+        WHERE learner_id = OLD.learner_id AND day = DATE(OLD.recorded_at, 'localtime');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_daily_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM daily_recognized WHERE character_id = OLD.id;
+    END
+    ''',
+]
+
+MISTAKES_SCHEMA_V12 = [
+    '''
+    CREATE TABLE IF NOT EXISTS character_mistakes (
+        learner_id INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        mistake_count INTEGER NOT NULL DEFAULT 0,
+        last_mistake_at TIMESTAMP,
+        ever_recognized INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (learner_id, character_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_character_mistakes_open
+    ON character_mistakes(learner_id, ever_recognized, last_mistake_at, character_id, mistake_count)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_character_mistakes_character
+    ON character_mistakes(character_id)
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_mistakes_records_insert
+    AFTER INSERT ON learning_records
+    BEGIN
+        INSERT INTO character_mistakes
+            (learner_id, character_id, mistake_count, last_mistake_at, ever_recognized)
+        VALUES (
+            NEW.learner_id,
+            NEW.character_id,
+            IFNULL(NEW.recognized = 0, 0),
+            CASE WHEN NEW.recognized = 0 THEN NEW.recorded_at END,
+            IFNULL(NEW.recognized = 1, 0)
+        )
+        ON CONFLICT(learner_id, character_id) DO UPDATE SET
+            mistake_count = mistake_count + excluded.mistake_count,
+            last_mistake_at = COALESCE(
+                MAX(last_mistake_at, excluded.last_mistake_at),
+                last_mistake_at,
+                excluded.last_mistake_at
+            ),
+            ever_recognized = MAX(ever_recognized, excluded.ever_recognized);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_mistakes_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM character_mistakes WHERE character_id = OLD.id;
+    END
+    ''',
+]
+
+# 版本 13：学习记录归档（版本 14 把日期和时间列改为整数）
+ARCHIVE_SCHEMA_V13 = [
+    '''
+    CREATE TABLE IF NOT EXISTS record_rollups (
+        learner_id INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        recognized_count INTEGER NOT NULL DEFAULT 0,
+        mistake_count INTEGER NOT NULL DEFAULT 0,
+        last_recognized_at TIMESTAMP,
+        last_mistake_at TIMESTAMP,
+        PRIMARY KEY (learner_id, character_id, day)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_record_rollups_character
+    ON record_rollups(character_id)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS record_archives (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        month TEXT NOT NULL,
+        path TEXT NOT NULL,
+        record_count INTEGER NOT NULL,
+        first_record_id INTEGER NOT NULL,
+        last_record_id INTEGER NOT NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_archive_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM record_rollups WHERE character_id = OLD.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_archive_rollups_delete
+    AFTER DELETE ON record_rollups
+    BEGIN
+        UPDATE daily_stats SET
+            review_count = review_count - OLD.review_count,
+            recognized_count = recognized_count - OLD.recognized_count
+        WHERE learner_id = OLD.learner_id AND day = OLD.day;
+    END
+    ''',
+]
+
+# 版本 14：学习记录的时间改为时间戳和本地日期两个整数列
+RECORDS_TABLE_V14 = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        character_id INTEGER NOT NULL,
+        recognized BOOLEAN NOT NULL,
+        recorded_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+        day INTEGER NOT NULL DEFAULT (CAST(strftime('%Y%m%d', 'now', 'localtime') AS INTEGER)),
+        learner_id INTEGER NOT NULL DEFAULT 1,
+        FOREIGN KEY (character_id) REFERENCES characters(id)
+    )
+'''
+
+RECORDS_INDEXES_V14 = [
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learning_records_learner_day
+    ON learning_records(learner_id, day)
+    ''',
+]
+
+# 版本 14 之前 recorded_at 为 CURRENT_TIMESTAMP 格式的文本
+LEGACY_TIMESTAMP_SQL = "CAST(strftime('%s', {value}) AS INTEGER)"
+LEGACY_DAY_SQL = "CAST(strftime('%Y%m%d', {value}, 'localtime') AS INTEGER)"
+
+ROLLUPS_TABLE_V14 = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        learner_id INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        recognized_count INTEGER NOT NULL DEFAULT 0,
+        mistake_count INTEGER NOT NULL DEFAULT 0,
+        last_recognized_at INTEGER,
+        last_mistake_at INTEGER,
+        PRIMARY KEY (learner_id, character_id, day)
+    ) WITHOUT ROWID
+'''
+
+STATS_SCHEMA_V14 = [
+    '''
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        learner_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        recognized_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (learner_id, day)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS daily_recognized (
+        learner_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        last_recorded_at INTEGER NOT NULL,
+        PRIMARY KEY (learner_id, day, character_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_daily_recognized_character
+    ON daily_recognized(character_id)
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_records_insert
+    AFTER INSERT ON learning_records
+    BEGIN
+        INSERT INTO daily_stats (learner_id, day, review_count, recognized_count)
+        VALUES (NEW.learner_id, NEW.day, 1, IFNULL(NEW.recognized = 1, 0))
+        ON CONFLICT(learner_id, day) DO UPDATE SET
+            review_count = review_count + 1,
+            recognized_count = recognized_count + excluded.recognized_count;
+
+        INSERT INTO daily_recognized (learner_id, day, character_id, last_recorded_at)
+        SELECT NEW.learner_id, NEW.day, NEW.character_id, NEW.recorded_at
+        WHERE NEW.recognized = 1
+        ON CONFLICT(learner_id, day, character_id) DO UPDATE SET
+            last_recorded_at = MAX(last_recorded_at, excluded.last_recorded_at);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_records_delete
+    AFTER DELETE ON learning_records
+    BEGIN
+        UPDATE daily_stats SET
+            review_count = review_count - 1,
+            recognized_count = recognized_count - IFNULL(OLD.recognized = 1, 0)
+        WHERE learner_id = OLD.learner_id AND day = OLD.day;
+    END
+    ''',
+]
+
+MISTAKES_SCHEMA_V14 = [
+    '''
+    CREATE TABLE IF NOT EXISTS character_mistakes (
+        learner_id INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        mistake_count INTEGER NOT NULL DEFAULT 0,
+        last_mistake_at INTEGER,
+        ever_recognized INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (learner_id, character_id)
+    ) WITHOUT ROWID
+    ''',
+] + MISTAKES_SCHEMA_V12[1:]
+
+# 版本 15：学习分析汇总
+ANALYTICS_SCHEMA_V15 = [
+    '''
+    CREATE TABLE IF NOT EXISTS character_analytics (
+        learner_id INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        mistake_count INTEGER NOT NULL DEFAULT 0,
+        relapse_count INTEGER NOT NULL DEFAULT 0,
+        first_review_at INTEGER NOT NULL,
+        mastered_at INTEGER,
+        recognition_count INTEGER NOT NULL DEFAULT 0,
+        is_mastered INTEGER NOT NULL DEFAULT 0,
+        ease REAL NOT NULL DEFAULT 2.5,
+        interval_days REAL NOT NULL DEFAULT 0,
+        repetitions INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (learner_id, character_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_character_analytics_character
+    ON character_analytics(character_id)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS activity_heatmap (
+        learner_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        hour INTEGER NOT NULL,
+        weekday INTEGER NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        recognized_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (learner_id, day, hour)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS analytics_state (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_record_id INTEGER NOT NULL DEFAULT 0,
+        scheduler TEXT NOT NULL
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_analytics_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM character_analytics WHERE character_id = OLD.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_analytics_records_delete
+    AFTER DELETE ON learning_records
+    WHEN OLD.id <= (SELECT last_record_id FROM analytics_state WHERE id = 1)
+    BEGIN
+        UPDATE activity_heatmap SET
+            review_count = review_count - 1,
+            recognized_count = recognized_count - IFNULL(OLD.recognized = 1, 0)
+        WHERE learner_id = OLD.learner_id
+          AND day = CAST(strftime('%Y%m%d', OLD.recorded_at, 'unixepoch', 'localtime') AS INTEGER)
+          AND hour = CAST(strftime('%H', OLD.recorded_at, 'unixepoch', 'localtime') AS INTEGER);
+    END
+    ''',
+]
+
+
+def _execute_all(db, statements):
+    for statement in statements:
+        db.execute(statement)
+
+
+def _drop_all(db, objects):
+    for kind, name in objects:
+        db.execute(f'DROP {kind} IF EXISTS {name}')
+
+
+def create_base_tables(db):
+    """汉字表和学习记录表，补齐旧数据库缺少的详情字段"""
+    _execute_all(db, BASE_SCHEMA)
+    add_columns(db, 'characters', DETAIL_COLUMNS)
+
+
+def create_indexes(db):
+    """高频查询使用的索引"""
+    _execute_all(db, INDEXES)
+
+
+def add_schedule_columns(db):
+    """复习调度字段和到期时间索引"""
+    added = add_columns(db, 'characters', SCHEDULE_COLUMNS_V3)
+    if 'due_at' in added:
+        # 按原来的规则，已掌握的字不再进入复习队列
+        db.execute('UPDATE characters SET due_at = NULL WHERE is_mastered = 1')
+    _execute_all(db, SCHEDULE_SCHEMA_V3)
+
+
+def create_summary_tables(db):
+    """全局汇总和不区分学习者的按天统计，首次创建时从原始数据填充"""
+    _execute_all(db, STATS_SCHEMA_V4)
+    if db.execute('SELECT 1 FROM stats_summary WHERE id = 1').fetchone() is None:
+        db.execute('DELETE FROM daily_stats')
+        db.execute('DELETE FROM daily_recognized')
+        db.execute(f'''
+            INSERT INTO stats_summary (id, total, mastered, learning, not_started)
+            SELECT 1, COUNT(*),
+                   IFNULL(SUM({MASTERED.format(row='c')}), 0),
+                   IFNULL(SUM({LEARNING.format(row='c')}), 0),
+                   IFNULL(SUM({NOT_STARTED.format(row='c')}), 0)
+            FROM characters c
+        ''')
+        db.execute('''
+            INSERT INTO daily_stats (day, review_count, recognized_count)
+            SELECT DATE(recorded_at, 'localtime'), COUNT(*), SUM(IFNULL(recognized = 1, 0))
+            FROM learning_records
+            GROUP BY DATE(recorded_at, 'localtime')
+        ''')
+        db.execute('''
+            INSERT INTO daily_recognized (day, character_id, last_recorded_at)
+            SELECT DATE(recorded_at, 'localtime'), character_id, MAX(recorded_at)
+            FROM learning_records
+            WHERE recognized = 1
+            GROUP BY DATE(recorded_at, 'localtime'), character_id
+        ''')
+
+
+def create_mistakes_table(db):
+    """不区分学习者的错题集，首次创建时从学习记录填充"""
+    exists = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'character_mistakes'"
+    ).fetchone()
+    _execute_all(db, MISTAKES_SCHEMA_V5)
+    if not exists:
+        db.execute('''
+            INSERT INTO character_mistakes (character_id, mistake_count, last_mistake_at, ever_recognized)
+            SELECT lr.character_id,
+                   SUM(IFNULL(lr.recognized = 0, 0)),
+                   MAX(CASE WHEN lr.recognized = 0 THEN lr.recorded_at END),
+                   MAX(IFNULL(lr.recognized = 1, 0))
+            FROM learning_records lr
+            JOIN characters c ON c.id = lr.character_id
+            GROUP BY lr.character_id
+        ''')
+
+
+def create_jobs_table(db):
+    """后台任务表"""
+    _execute_all(db, JOBS_SCHEMA_V6)
+
+
+def create_session_tables(db):
+    """学习会话和会话中的卡片"""
+    _execute_all(db, SESSIONS_SCHEMA_V7)
+
+
+def create_change_counters(db):
+    """表版本号和维护版本号的触发器"""
+    _execute_all(db, COUNTERS_SCHEMA_V8)
+    for table in COUNTED_TABLES_V8:
+        track_table(db, table)
+
+
+def create_catalog_indexes(db):
+    """汉字列表排序和筛选使用的索引"""
+    _execute_all(db, CATALOG_INDEXES_V9)
+
+
+def create_search_index(db):
+    """全文搜索索引，并为已有的汉字建立索引"""
+    _execute_all(db, SEARCH_SCHEMA_V10)
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS_V10)
+    db.execute(
+        "INSERT INTO character_search (character_search, rank) VALUES ('rank', ?)",
+        (f'bm25({weights})',)
+    )
+    # 索引内容由 search.py 从汉字表计算，只写索引自己的表
+    search.rebuild(db)
+
+
+def create_vocabulary_tables(db):
+    """词语和例句表，从汉字表拆分已有的组词和造句"""
+    _execute_all(db, VOCABULARY_SCHEMA_V11)
+    vocabulary.rebuild(db)
+
+
+def add_learners(db):
+    """多学习者
+
+    补充 learner_id 列、创建学习者和进度表，把已有的进度作为默认学习者复制过来，
+    再把按天统计和错题集删除后按学习者重建。
+    """
+    for table, columns in LEARNER_COLUMNS_V12:
+        add_columns(db, table, columns)
+    _execute_all(db, LEARNERS_SCHEMA_V12)
+    db.execute(
+        'INSERT OR IGNORE INTO learners (id, name) VALUES (?, ?)',
+        (DEFAULT_LEARNER, DEFAULT_LEARNER_NAME)
+    )
+    # 插入默认学习者时触发器已经建好了初始进度，这里用已有的进度覆盖
+    db.execute(f'''
+        INSERT INTO learner_progress
+            (learner_id, character_id, {', '.join(PROGRESS_FIELDS_V12)}, updated_at)
+        SELECT ?, id, {', '.join(PROGRESS_FIELDS_V12)}, updated_at FROM characters WHERE true
+        ON CONFLICT (learner_id, character_id) DO UPDATE SET
+            {', '.join(f'{field} = excluded.{field}' for field in PROGRESS_FIELDS_V12 + ('updated_at',))}
+    ''', (DEFAULT_LEARNER,))
+
+    _drop_all(db, STATS_LEGACY_OBJECTS_V12)
+    _execute_all(db, STATS_SCHEMA_V12)
+    db.execute('DELETE FROM learner_stats')
+    db.execute(f'''
+        INSERT INTO learner_stats (learner_id, total, mastered, learning, not_started)
+        SELECT learner_id, COUNT(*),
+               IFNULL(SUM({MASTERED.format(row='p')}), 0),
+               IFNULL(SUM({LEARNING.format(row='p')}), 0),
+               IFNULL(SUM({NOT_STARTED.format(row='p')}), 0)
+        FROM learner_progress p
+        GROUP BY learner_id
+    ''')
+    db.execute('''
+        INSERT INTO daily_stats (learner_id, day, review_count, recognized_count)
+        SELECT learner_id, DATE(recorded_at, 'localtime'), COUNT(*), SUM(IFNULL(recognized = 1, 0))
+        FROM learning_records
+        GROUP BY learner_id, DATE(recorded_at, 'localtime')
+    ''')
+    db.execute('''
+        INSERT INTO daily_recognized (learner_id, day, character_id, last_recorded_at)
+        SELECT learner_id, DATE(recorded_at, 'localtime'), character_id, MAX(recorded_at)
+        FROM learning_records
+        WHERE recognized = 1
+        GROUP BY learner_id, DATE(recorded_at, 'localtime'), character_id
+    ''')
+
+    _drop_all(db, MISTAKES_LEGACY_OBJECTS_V12)
+    _execute_all(db, MISTAKES_SCHEMA_V12)
+    db.execute('''
+        INSERT INTO character_mistakes
+            (learner_id, character_id, mistake_count, last_mistake_at, ever_recognized)
+        SELECT lr.learner_id, lr.character_id,
+               SUM(IFNULL(lr.recognized = 0, 0)),
+               MAX(CASE WHEN lr.recognized = 0 THEN lr.recorded_at END),
+               MAX(IFNULL(lr.recognized = 1, 0))
+        FROM learning_records lr
+        JOIN characters c ON c.id = lr.character_id
+        GROUP BY lr.learner_id, lr.character_id
+    ''')
+
+    track_table(db, 'learner_progress')
+
+
+def create_archive_tables(db):
+    """学习记录归档的按天汇总和归档文件列表"""
+    _execute_all(db, ARCHIVE_SCHEMA_V13)
+
+
+def _rebuild_table(db, name, create_sql, select_sql):
+    """按新结构重建表：新表中写入转换后的数据，删除旧表后改名
+
+    旧表上的索引和触发器随旧表一起删除，由调用方重新创建。
+    """
+    db.execute(create_sql.format(name=f'{name}_new'))
+    db.execute(f'INSERT INTO {name}_new {select_sql}')
+    db.execute(f'DROP TABLE {name}')
+    # 改名时不要改写、校验其他表上引用这个表的触发器（旧表删除后它们暂时引用不到）
+    db.execute('PRAGMA legacy_alter_table = ON')
+    try:
+        db.execute(f'ALTER TABLE {name}_new RENAME TO {name}')
+    finally:
+        db.execute('PRAGMA legacy_alter_table = OFF')
+
+
+def integer_timestamps(db):
+    """学习记录的时间改为时间戳和本地日期两个整数列（records.py）
+
+    learning_records 按新结构重建（保留 id 和自增序列），原有的索引和触发器重新创建；
+    已归档的汇总转换格式，按天统计和错题集按新格式重建。
+    """
+    if 'day' not in {row[1] for row in db.execute('PRAGMA table_info(learning_records)')}:
+        sequence = db.execute("SELECT seq FROM sqlite_sequence WHERE name = 'learning_records'").fetchone()
+        _rebuild_table(db, 'learning_records', RECORDS_TABLE_V14, f'''
+            SELECT id, character_id, recognized,
+                   IFNULL({LEGACY_TIMESTAMP_SQL.format(value='recorded_at')},
+                          CAST(strftime('%s', 'now') AS INTEGER)),
+                   IFNULL({LEGACY_DAY_SQL.format(value='recorded_at')},
+                          CAST(strftime('%Y%m%d', 'now', 'localtime') AS INTEGER)),
+                   learner_id
+            FROM learning_records
+        ''')
+        if sequence is not None:
+            db.execute(
+                "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'learning_records'",
+                (sequence[0],)
+            )
+
+    rollup_columns = {row[1]: row[2] for row in db.execute('PRAGMA table_info(record_rollups)')}
+    if rollup_columns.get('day') == 'TEXT':
+        _rebuild_table(db, 'record_rollups', ROLLUPS_TABLE_V14, '''
+            SELECT learner_id, character_id, CAST(REPLACE(day, '-', '') AS INTEGER),
+                   review_count, recognized_count, mistake_count,
+                   CAST(strftime('%s', last_recognized_at) AS INTEGER),
+                   CAST(strftime('%s', last_mistake_at) AS INTEGER)
+            FROM record_rollups
+        ''')
+
+    # 两个表上原有的索引和触发器（版本 2、12、13 创建的）重新创建，都是 IF NOT EXISTS
+    create_indexes(db)
+    _execute_all(db, LEARNERS_SCHEMA_V12 + RECORDS_INDEXES_V14 + ARCHIVE_SCHEMA_V13[1:])
+    track_table(db, 'learning_records')
+
+    # 按天统计和错题集按整数格式重建（包括已归档月份的汇总）
+    for name in ('daily_stats', 'daily_recognized'):
+        db.execute(f'DROP TABLE {name}')
+    _execute_all(db, STATS_SCHEMA_V14)
+    db.execute('''
+        INSERT INTO daily_stats (learner_id, day, review_count, recognized_count)
+        SELECT learner_id, day, SUM(review_count), SUM(recognized_count)
+        FROM (
+            SELECT learner_id, day, COUNT(*) AS review_count,
+                   SUM(IFNULL(recognized = 1, 0)) AS recognized_count
+            FROM learning_records
+            GROUP BY learner_id, day
+            UNION ALL
+            SELECT learner_id, day, SUM(review_count), SUM(recognized_count)
+            FROM record_rollups
+            GROUP BY learner_id, day
+        )
+        GROUP BY learner_id, day
+    ''')
+    db.execute('''
+        INSERT INTO daily_recognized (learner_id, day, character_id, last_recorded_at)
+        SELECT learner_id, day, character_id, MAX(last_recorded_at)
+        FROM (
+            SELECT learner_id, day, character_id, MAX(recorded_at) AS last_recorded_at
+            FROM learning_records
+            WHERE recognized = 1
+            GROUP BY learner_id, day, character_id
+            UNION ALL
+            SELECT learner_id, day, character_id, last_recognized_at
+            FROM record_rollups
+            WHERE recognized_count > 0
+        )
+        GROUP BY learner_id, day, character_id
+    ''')
+
+    _drop_all(db, MISTAKES_LEGACY_OBJECTS_V12)
+    _execute_all(db, MISTAKES_SCHEMA_V14)
+    db.execute('''
+        INSERT INTO character_mistakes
+            (learner_id, character_id, mistake_count, last_mistake_at, ever_recognized)
+        SELECT learner_id, character_id, SUM(mistakes), MAX(last_mistake_at), MAX(recognized)
+        FROM (
+            SELECT lr.learner_id, lr.character_id,
+                   SUM(IFNULL(lr.recognized = 0, 0)) AS mistakes,
+                   MAX(CASE WHEN lr.recognized = 0 THEN lr.recorded_at END) AS last_mistake_at,
+                   MAX(IFNULL(lr.recognized = 1, 0)) AS recognized
+            FROM learning_records lr
+            JOIN characters c ON c.id = lr.character_id
+            GROUP BY lr.learner_id, lr.character_id
+            UNION ALL
+            SELECT r.learner_id, r.character_id, r.mistake_count, r.last_mistake_at, r.recognized_count > 0
+            FROM record_rollups r
+            JOIN characters c ON c.id = r.character_id
+        )
+        GROUP BY learner_id, character_id
+    ''')
+
+
+def create_analytics_tables(db):
+    """学习分析汇总表，按当前配置的调度器回放全部学习记录"""
+    _execute_all(db, ANALYTICS_SCHEMA_V15)
+    # 汇总内容由 analytics.py 回放学习记录计算，只写分析汇总自己的表
+    analytics.rebuild(db, scheduler.get_scheduler(Config.SCHEDULER))
+
+
+# (版本号, 说明, 迁移函数)，版本号从 1 开始连续递增，已发布的迁移不要修改
+MIGRATIONS = [
+    (1, '汉字表和学习记录表', create_base_tables),
+    (2, '学习记录和掌握状态索引', create_indexes),
+    (3, '复习调度字段', add_schedule_columns),
+    (4, '统计汇总表', create_summary_tables),
+    (5, '错题集', create_mistakes_table),
+    (6, '后台任务表', create_jobs_table),
+    (7, '学习会话', create_session_tables),
+    (8, '表版本号（HTTP 缓存）', create_change_counters),
+    (9, '汉字列表排序和筛选索引', create_catalog_indexes),
+    (10, '全文搜索索引', create_search_index),
+    (11, '词语和例句表', create_vocabulary_tables),
+    (12, '多学习者', add_learners),
+    (13, '学习记录归档', create_archive_tables),
+    (14, '学习记录时间改为整数', integer_timestamps),
+    (15, '学习分析汇总', create_analytics_tables),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# 汉字表已有全部基础字段、但还没有汇总触发器的版本（批量写入测试数据时先迁移到这里）
+SCHEDULER_VERSION = 3
+
+
+def get_version(db):
+    """数据库当前的结构版本"""
+    return db.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(db, target=None):
+    """执行尚未执行的迁移，返回本次执行的 (版本号, 说明) 列表
+
+    多个进程同时启动时，BEGIN IMMEDIATE 保证同一个迁移只会被执行一次。
+    """
+    target = LATEST_VERSION if target is None else target
+    if get_version(db) > LATEST_VERSION:
+        raise RuntimeError(
+            f'数据库版本 {get_version(db)} 高于程序支持的版本 {LATEST_VERSION}，请升级程序'
+        )
+
+    if db.in_transaction:
+        db.commit()
+    isolation_level = db.isolation_level
+    # 由我们自己控制事务边界：DDL 不会被 sqlite3 模块隐式提交
+    db.isolation_level = None
+    applied = []
+    try:
+        for version, description, apply in MIGRATIONS:
+            if version > target:
+                break
+            if get_version(db) >= version:
+                continue
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                # 获取写锁后重新读取版本，其他进程可能已经执行过
+                if get_version(db) < version:
+                    apply(db)
+                    db.execute(f'PRAGMA user_version = {int(version)}')
+                    applied.append((version, description))
+                db.execute('COMMIT')
+            except Exception:
+                db.execute('ROLLBACK')
+                raise
+    finally:
+        db.isolation_level = isolation_level
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description='数据库结构迁移')
+    parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    parser.add_argument('--status', action='store_true', help='只显示当前版本')
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    try:
+        version = get_version(db)
+        print(f"当前版本: {version}，最新版本: {LATEST_VERSION}")
+        if args.status:
+            for number, description, _ in MIGRATIONS:
+                mark = '✓' if number <= version else '-'
+                print(f"{mark} {number}: {description}")
+            return
+
+        applied = migrate(db)
+        for number, description in applied:
+            print(f"✓ 迁移 {number}: {description}")
+        if not applied:
+            print("- 已是最新版本")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
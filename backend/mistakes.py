@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+错题集
+
+每个学习者每个字的错误次数、最近一次答错时间和是否认识过，由 learning_records
+上的触发器随每次作答更新。/api/mistakes 通过以学习者开头的覆盖索引直接读取
+错题集，不再每次把汉字表和全部学习记录做连接、分组和排序。
+
+如果怀疑错题集不一致，可以从学习记录重建：
+    python3 mistakes.py check          # 只检查
+    python3 mistakes.py check --fix    # 检查并重建
+"""
+
+import argparse
+import sqlite3
+
+import archive
+from db import connect
+import records
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS character_mistakes (
+        learner_id INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        mistake_count INTEGER NOT NULL DEFAULT 0,
+        last_mistake_at INTEGER,
+        ever_recognized INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (learner_id, character_id)
+    ) WITHOUT ROWID
+    ''',
+    # 错题查询的过滤、排序和返回列都在索引里
+    '''
+    CREATE INDEX IF NOT EXISTS idx_character_mistakes_open
+    ON character_mistakes(learner_id, ever_recognized, last_mistake_at, character_id, mistake_count)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_character_mistakes_character
+    ON character_mistakes(character_id)
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_mistakes_records_insert
+    AFTER INSERT ON learning_records
+    BEGIN
+        INSERT INTO character_mistakes
+            (learner_id, character_id, mistake_count, last_mistake_at, ever_recognized)
+        VALUES (
+            NEW.learner_id,
+            NEW.character_id,
+            IFNULL(NEW.recognized = 0, 0),
+            CASE WHEN NEW.recognized = 0 THEN NEW.recorded_at END,
+            IFNULL(NEW.recognized = 1, 0)
+        )
+        ON CONFLICT(learner_id, character_id) DO UPDATE SET
+            mistake_count = mistake_count + excluded.mistake_count,
+            last_mistake_at = COALESCE(
+                MAX(last_mistake_at, excluded.last_mistake_at),
+                last_mistake_at,
+                excluded.last_mistake_at
+            ),
+            ever_recognized = MAX(ever_recognized, excluded.ever_recognized);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_mistakes_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM character_mistakes WHERE character_id = OLD.id;
+    END
+    ''',
+]
+
+# 默认返回的字段
+LIGHT_COLUMNS = '''
+    c.id, c.character, p.recognition_count, p.is_mastered,
+    m.mistake_count, datetime(m.last_mistake_at, 'unixepoch') AS last_mistake_time
+'''
+
+# fields=details 时额外返回的字段
+DETAIL_COLUMNS = ', c.pinyin, c.definition, c.words, c.sentences'
+
+# 由学习记录计算错题集（重建和校验共用），{recorded_at} 为 records.source_columns 返回的表达式
+COMPUTE_SQL = '''
+    SELECT lr.learner_id, lr.character_id,
+           SUM(IFNULL(lr.recognized = 0, 0)) AS mistakes,
+           MAX(CASE WHEN lr.recognized = 0 THEN {recorded_at} END) AS last_mistake_at,
+           MAX(IFNULL(lr.recognized = 1, 0)) AS recognized
+    FROM learning_records lr
+    JOIN characters c ON c.id = lr.character_id
+    GROUP BY lr.learner_id, lr.character_id
+'''
+
+
+def compute_sql(db):
+    """错题集的原始数据：learning_records 加上已归档月份的汇总（archive.py）"""
+    compute = COMPUTE_SQL.format(recorded_at=records.source_columns(db, 'lr')[0])
+    if not archive.has_rollups(db):
+        return compute
+    return f'''
+        SELECT learner_id, character_id, SUM(mistakes), MAX(last_mistake_at), MAX(recognized)
+        FROM ({compute} UNION ALL {archive.ROLLUP_MISTAKES_SQL})
+        GROUP BY learner_id, character_id
+    '''
+
+
+def rebuild(db):
+    """丢弃错题集并从学习记录重新计算"""
+    db.execute('DELETE FROM character_mistakes')
+    db.execute(f'''
+        INSERT INTO character_mistakes
+            (learner_id, character_id, mistake_count, last_mistake_at, ever_recognized)
+        {compute_sql(db)}
+    ''')
+
+
+def check(db):
+    """返回与学习记录不一致的错题集行数"""
+    compute = compute_sql(db)
+    stored = '''
+        SELECT learner_id, character_id, mistake_count, last_mistake_at, ever_recognized
+        FROM character_mistakes
+    '''
+    return db.execute(f'''
+        SELECT (SELECT COUNT(*) FROM ({compute} EXCEPT {stored}))
+             + (SELECT COUNT(*) FROM ({stored} EXCEPT {compute}))
+    ''').fetchone()[0]
+
+
+def query_mistakes(db, learner_id, limit=None, after=None, details=False):
+    """按最近答错时间倒序读取学习者的错题
+
+    after 为上一页最后一行的 (last_mistake_time, id)，接口返回的时间在比较前转回时间戳。
+    """
+    columns = LIGHT_COLUMNS + (DETAIL_COLUMNS if details else '')
+    conditions = ['m.learner_id = ?', 'm.ever_recognized = 0', 'm.mistake_count > 0', 'p.is_mastered = 0']
+    params = [learner_id]
+    if after is not None:
+        conditions.append("(m.last_mistake_at, m.character_id) < (CAST(strftime('%s', ?) AS INTEGER), ?)")
+        params.extend(after)
+
+    sql = f'''
+        SELECT {columns}
+        FROM character_mistakes m
+        JOIN learner_progress p ON p.learner_id = m.learner_id AND p.character_id = m.character_id
+        JOIN characters c ON c.id = m.character_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY m.last_mistake_at DESC, m.character_id DESC
+    '''
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+
+    return [dict(row) for row in db.execute(sql, params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='错题集工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    check_parser = subparsers.add_parser('check', help='检查错题集是否与学习记录一致')
+    check_parser.add_argument('--fix', action='store_true', help='从学习记录重建错题集')
+    check_parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    args = parser.parse_args()
+
+    # migrations 依赖本模块，在这里导入
+    from migrations import migrate
+
+    db = connect(args.db)
+    try:
+        migrate(db)
+        mismatched = check(db)
+
+        if mismatched:
+            print(f"✗ 错题集有 {mismatched} 行与学习记录不一致")
+        else:
+            print("✓ 错题集与学习记录一致")
+
+        if args.fix:
+            rebuild(db)
+            db.commit()
+            print("✓ 已从学习记录重建错题集")
+    except (sqlite3.Error, OSError) as e:
+        print(f"✗ 检查失败: {e}")
+        raise SystemExit(1)
+    finally:
+        db.close()
+
+    if mismatched and not args.fix:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
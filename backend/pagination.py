@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+键集分页（keyset pagination）
+
+游标是上一页最后一行排序键的编码，下一页从该位置之后继续查找，
+每页都是一次索引范围扫描，不需要 OFFSET 跳过前面的行。
+下一页的游标放在响应头 X-Next-Cursor 中，没有更多数据时不返回该响应头。
+"""
+
+import base64
+import json
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+# 符合条件的总行数（能从汇总数据直接得到时才返回）
+TOTAL_COUNT_HEADER = 'X-Total-Count'
+
+
+def encode_cursor(values):
+    """把排序键编码成不透明的游标字符串"""
+    raw = json.dumps(list(values), ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """解码游标，格式不对时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('无效的分页游标')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('无效的分页游标')
+    return values
+
+
+def parse_limit(value, maximum):
+    """解析 limit 参数，未传入时返回 None（不分页）"""
+    if value is None:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit 必须是整数')
+    if not 1 <= limit <= maximum:
+        raise ValueError(f'limit 需在 1 到 {maximum} 之间')
+    return limit
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+学习记录的时间字段
+
+版本 14 起 learning_records.recorded_at 为 Unix 时间戳（秒），另有写入时算好的
+本地日期 day（整数 YYYYMMDD）。按天统计、归档、“今天”的查询直接在 day 或 recorded_at
+的索引上做等值或范围查找，不再对每一行执行 DATE(recorded_at, 'localtime')。
+派生表（daily_stats、daily_recognized、character_mistakes、record_rollups）
+中的日期和时间也使用同样的整数格式。
+
+写入当前时间的记录可以省略两列（默认值）；指定作答时间时要同时写入 day = local_day(时间戳)。
+接口返回的时间仍然是 CURRENT_TIMESTAMP 格式（UTC）的字符串，在查询中转换。
+"""
+
+import calendar
+import time
+
+# 学习记录表（版本 14 起的结构，迁移中的建表语句见 migrations.py）
+TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS {name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        character_id INTEGER NOT NULL,
+        recognized BOOLEAN NOT NULL,
+        recorded_at INTEGER NOT NULL DEFAULT (CAST(strftime('%s', 'now') AS INTEGER)),
+        day INTEGER NOT NULL DEFAULT (CAST(strftime('%Y%m%d', 'now', 'localtime') AS INTEGER)),
+        learner_id INTEGER NOT NULL DEFAULT 1,
+        FOREIGN KEY (character_id) REFERENCES characters(id)
+    )
+'''
+
+INDEXES = [
+    # 按天统计的重建和分析：学习者一段日期内的记录
+    '''
+    CREATE INDEX IF NOT EXISTS idx_learning_records_learner_day
+    ON learning_records(learner_id, day)
+    ''',
+]
+
+# 由 Unix 时间戳计算本地日期
+DAY_SQL = "CAST(strftime('%Y%m%d', {value}, 'unixepoch', 'localtime') AS INTEGER)"
+
+# 整数时间戳转成接口返回的格式
+DATETIME_SQL = "datetime({value}, 'unixepoch')"
+
+# 版本 14 之前 recorded_at 为 CURRENT_TIMESTAMP 格式的文本
+LEGACY_TIMESTAMP_SQL = "CAST(strftime('%s', {value}) AS INTEGER)"
+LEGACY_DAY_SQL = "CAST(strftime('%Y%m%d', {value}, 'localtime') AS INTEGER)"
+
+
+def local_day(epoch=None):
+    """时间戳（默认为当前时间）对应的本地日期 YYYYMMDD"""
+    return int(time.strftime('%Y%m%d', time.localtime(epoch)))
+
+
+def parse_timestamp(value):
+    """把 CURRENT_TIMESTAMP（UTC）格式的时间转成时间戳，已经是时间戳的原样返回"""
+    if isinstance(value, int):
+        return value
+    if value.isdigit():
+        return int(value)
+    return calendar.timegm(time.strptime(value[:19], '%Y-%m-%d %H:%M:%S'))
+
+
+def has_integer_timestamps(db):
+    """learning_records 是否已经是版本 14 的结构"""
+    return 'day' in {row[1] for row in db.execute('PRAGMA table_info(learning_records)')}
+
+
+def source_columns(db, alias='learning_records'):
+    """从学习记录计算派生表时 recorded_at（时间戳）和 day 的表达式
+
+    数据库还是版本 14 之前的结构（文本时间）时在查询中转换，派生表的结果同样是整数格式。
+    """
+    recorded_at = f'{alias}.recorded_at'
+    if has_integer_timestamps(db):
+        return recorded_at, f'{alias}.day'
+    return LEGACY_TIMESTAMP_SQL.format(value=recorded_at), LEGACY_DAY_SQL.format(value=recorded_at)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全班报表
+
+在学习记录列式快照（snapshot.py）上整列做向量化计算，不逐行处理 sqlite3.Row：
+- group_by:       按整数键分组计数、求和（np.bincount）
+- count_distinct: 每个键对应多少个不同的值（位图去重）
+- histogram:      数值分布（np.histogram）
+- retention:      按首次作答时间分批（cohort），每个学习者从自己的首次作答起每 window 天为一期，
+                  统计每批学习者在各期仍有作答的比例
+
+报表覆盖全体学习者（包括已归档的学习记录），数据截至快照生成时：
+- difficulty:  难字排行（错误率、作答次数、作答过的学习者数）
+- learners:    学习者作答次数、错误率的分布
+- retention:   留存
+
+    python3 reports.py difficulty [--limit 20]
+    python3 reports.py learners [--bins 10]
+    python3 reports.py retention [--window 7] [--periods 8]
+"""
+
+import argparse
+import datetime
+import json
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import snapshot
+from config import Config
+
+# 键或（键, 值）组合的取值范围不超过这么多时用数组直接计数、用位图去重，否则先排序压缩
+DENSE_RANGE = 1 << 26
+
+DEFAULT_DIFFICULTY_LIMIT = 50
+DEFAULT_HISTOGRAM_BINS = 10
+MAX_HISTOGRAM_BINS = 100
+DEFAULT_RETENTION_WINDOW = 7
+MAX_RETENTION_WINDOW = 90
+DEFAULT_RETENTION_PERIODS = 8
+MAX_RETENTION_PERIODS = 52
+
+
+def _dense(keys):
+    """键数组换成从 0 开始的下标：返回 (下标, 下标对应的键)"""
+    low, high = int(keys.min()), int(keys.max())
+    if high - low < max(len(keys), DENSE_RANGE):
+        return keys.astype(np.int64) - low, np.arange(low, high + 1)
+    groups, index = np.unique(keys, return_inverse=True)
+    return index.reshape(-1), groups
+
+
+def group_by(keys, **values):
+    """按整数键分组：返回 (键, 行数, {名称: 合计})，只包含出现过的键，键从小到大"""
+    keys = np.asarray(keys)
+    if len(keys) == 0:
+        return keys[:0], np.zeros(0, dtype=np.int64), {name: np.zeros(0) for name in values}
+    index, groups = _dense(keys)
+    counts = np.bincount(index, minlength=len(groups))
+    present = np.flatnonzero(counts)
+    sums = {
+        name: np.bincount(index, weights=column, minlength=len(groups))[present]
+        for name, column in values.items()
+    }
+    return groups[present], counts[present], sums
+
+
+def count_distinct(keys, values):
+    """每个键对应多少个不同的值：返回 (键, 个数)，键从小到大"""
+    keys = np.asarray(keys)
+    if len(keys) == 0:
+        return keys[:0], np.zeros(0, dtype=np.int64)
+    key_index, key_groups = _dense(keys)
+    value_index, value_groups = _dense(np.asarray(values))
+    pairs = key_index * len(value_groups) + value_index
+    if len(key_groups) * len(value_groups) <= DENSE_RANGE:
+        seen = np.zeros(len(key_groups) * len(value_groups), dtype=bool)
+        seen[pairs] = True
+        pairs = np.flatnonzero(seen)
+    else:
+        pairs = np.unique(pairs)
+    counts = np.bincount(pairs // len(value_groups), minlength=len(key_groups))
+    present = np.flatnonzero(counts)
+    return key_groups[present], counts[present]
+
+
+def histogram(values, bins=DEFAULT_HISTOGRAM_BINS, value_range=None):
+    """数值分布：{'edges': bins + 1 个边界, 'counts': 每个区间的个数}（最后一个区间含右边界）"""
+    counts, edges = np.histogram(np.asarray(values), bins=bins, range=value_range)
+    return {'edges': [round(float(edge), 4) for edge in edges], 'counts': counts.tolist()}
+
+
+def day_string(day_number):
+    """距 1970-01-01 的天数转成 YYYY-MM-DD"""
+    return datetime.date.fromordinal(snapshot.EPOCH_ORDINAL + int(day_number)).isoformat()
+
+
+def retention(learner_ids, day_numbers, window=DEFAULT_RETENTION_WINDOW, periods=DEFAULT_RETENTION_PERIODS,
+              last_day=None):
+    """按首次作答分批的留存
+
+    从最早的作答日起每 window 天为一批；每个学习者从自己的首次作答日起每 window 天为一期，
+    第 k 期有作答即计入。last_day 为数据完整的最后一天（默认为最后一次作答的日期），
+    到这一天还没有完整经过的期（批内最晚开始的学习者的这一期尚未结束）为 None。
+    """
+    learner_ids = np.asarray(learner_ids)
+    day_numbers = np.asarray(day_numbers)
+    if len(learner_ids) == 0:
+        return []
+    learner_index, _ = _dense(learner_ids)
+    learner_count = int(learner_index.max()) + 1
+    # 与 day_numbers 同类型，否则 np.minimum.at 走逐个转换的慢路径
+    unset = np.iinfo(day_numbers.dtype).max
+    first = np.full(learner_count, unset, dtype=day_numbers.dtype)
+    np.minimum.at(first, learner_index, day_numbers)
+    active = first != unset
+
+    period = (day_numbers - first[learner_index]) // window
+    kept = period < periods
+    seen = np.zeros(learner_count * periods, dtype=bool)
+    seen[learner_index[kept] * periods + period[kept]] = True
+    learner_period = np.flatnonzero(seen)
+
+    origin = int(first[active].min())
+    if last_day is None:
+        last_day = int(day_numbers.max())
+    cohort = (first - origin) // window
+    cohort_count = int(cohort[active].max()) + 1
+    sizes = np.bincount(cohort[active], minlength=cohort_count)
+    retained = np.bincount(
+        cohort[learner_period // periods] * periods + learner_period % periods,
+        minlength=cohort_count * periods
+    ).reshape(cohort_count, periods)
+
+    result = []
+    for c in np.flatnonzero(sizes):
+        latest_start = origin + (int(c) + 1) * window - 1
+        rates = [
+            round(float(retained[c, k]) / int(sizes[c]), 4)
+            if latest_start + (k + 1) * window - 1 <= last_day else None
+            for k in range(periods)
+        ]
+        result.append({
+            'cohort_start': day_string(origin + int(c) * window),
+            'learners': int(sizes[c]),
+            'rates': rates,
+        })
+    return result
+
+
+def describe(current):
+    """快照的基本信息（报表中说明数据截至何时）"""
+    manifest = current.manifest
+    return {
+        'name': manifest['name'],
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(manifest['created_at'])),
+        'record_count': manifest['record_count'],
+        'last_record_id': manifest['last_record_id'],
+    }
+
+
+def difficulty(current, min_reviews=1, limit=DEFAULT_DIFFICULTY_LIMIT):
+    """全体学习者的难字排行：按错误率、答错次数从高到低（已删除的字不列出）"""
+    records = current.records
+    ids, review_counts, sums = group_by(records['character_id'], mistakes=~records['recognized'])
+    mistake_counts = sums['mistakes'].astype(np.int64)
+    _, learner_counts = count_distinct(records['character_id'], records['learner_id'])
+
+    positions = current.character_index()[ids]
+    kept = (positions >= 0) & (review_counts >= min_reviews)
+    ids, review_counts, mistake_counts = ids[kept], review_counts[kept], mistake_counts[kept]
+    learner_counts, positions = learner_counts[kept], positions[kept]
+    error_rates = mistake_counts / np.maximum(review_counts, 1)
+
+    order = np.lexsort((ids, -mistake_counts, -error_rates))
+    if limit is not None:
+        order = order[:limit]
+    characters = current.characters['character']
+    return [
+        {
+            'id': int(ids[i]),
+            'character': str(characters[positions[i]]),
+            'review_count': int(review_counts[i]),
+            'mistake_count': int(mistake_counts[i]),
+            'error_rate': round(float(error_rates[i]), 4),
+            'learner_count': int(learner_counts[i]),
+        }
+        for i in order
+    ]
+
+
+def learners(current, bins=DEFAULT_HISTOGRAM_BINS):
+    """学习者作答次数和错误率的分布"""
+    records = current.records
+    _, review_counts, sums = group_by(records['learner_id'], mistakes=~records['recognized'])
+    error_rates = sums['mistakes'] / np.maximum(review_counts, 1)
+    return {
+        'learner_count': int(len(review_counts)),
+        'review_count': histogram(review_counts, bins),
+        'error_rate': histogram(error_rates, bins, value_range=(0, 1)),
+    }
+
+
+def retention_report(current, window=DEFAULT_RETENTION_WINDOW, periods=DEFAULT_RETENTION_PERIODS):
+    """快照中全体学习者的留存，数据完整到快照生成的前一天"""
+    created = datetime.date.fromtimestamp(current.manifest['created_at'])
+    return retention(
+        current.records['learner_id'], current.records['day_number'], window=window, periods=periods,
+        last_day=created.toordinal() - snapshot.EPOCH_ORDINAL - 1
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全班报表（读取学习记录列式快照）')
+    parser.add_argument('--dir', default=Config.SNAPSHOT_DIR, help='快照目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    difficulty_parser = subparsers.add_parser('difficulty', help='难字排行')
+    difficulty_parser.add_argument('--min-reviews', type=int, default=1)
+    difficulty_parser.add_argument('--limit', type=int, default=20)
+    learners_parser = subparsers.add_parser('learners', help='学习者作答次数、错误率的分布')
+    learners_parser.add_argument('--bins', type=int, default=DEFAULT_HISTOGRAM_BINS)
+    retention_parser = subparsers.add_parser('retention', help='按首次作答分批的留存')
+    retention_parser.add_argument('--window', type=int, default=DEFAULT_RETENTION_WINDOW, help='每期天数')
+    retention_parser.add_argument('--periods', type=int, default=DEFAULT_RETENTION_PERIODS)
+    args = parser.parse_args()
+
+    if np is None:
+        print('✗ 未安装 numpy，请先执行 pip3 install numpy')
+        raise SystemExit(1)
+    current = snapshot.open_snapshot(args.dir)
+    if current is None:
+        print(f'✗ {args.dir} 中还没有快照，请先执行 python3 snapshot.py build')
+        raise SystemExit(1)
+
+    start = time.perf_counter()
+    if args.command == 'difficulty':
+        result = difficulty(current, min_reviews=args.min_reviews, limit=args.limit)
+    elif args.command == 'learners':
+        result = learners(current, bins=args.bins)
+    else:
+        result = retention_report(current, window=args.window, periods=args.periods)
+    elapsed = time.perf_counter() - start
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"✓ 快照 {current.name}，{len(current)} 条学习记录，计算耗时 {elapsed * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
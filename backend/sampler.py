@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+随机抽字
+
+在学习者进度的 (learner_id, is_mastered) 索引上按汉字 id 区间随机探测，
+不再把整个候选池读进内存。每次探测是两次索引查找，和汉字总数、学习者人数
+都无关（O(log N)）。
+
+id 不连续时，紧跟在大空洞后面的字更容易被探测到。这里用拒绝采样消除偏差：
+命中的字以 1/间隔 的概率被接受，间隔是它和同状态上一个字之间的 id 差，
+这样每个候选字被选中的概率相同。
+
+候选池（按 learner_stats 的计数）比请求的数量大不了多少时探测大多落空，直接扫描索引；
+探测中连续多次都是已抽到或排除的字时，同样退回到扫描。
+"""
+
+import random
+
+from learners import DEFAULT_LEARNER
+
+# 版本 2 为抽样准备的索引（rowid 隐含在索引末尾）；版本 12 起抽样使用
+# learners.py 中的 idx_learner_progress_mastered（主键 character_id 隐含在索引末尾）
+SCHEMA = [
+    'CREATE INDEX IF NOT EXISTS idx_characters_is_mastered ON characters(is_mastered)',
+]
+
+# 单次请求最多返回的汉字数
+MAX_COUNT = 200
+
+# 单个字最多探测次数，超过后直接接受最后一次命中的字
+MAX_ATTEMPTS = 32
+
+# 连续这么多次探测都没有抽到新字（都是已抽到或排除的字）时，退回到索引扫描
+MAX_MISSES = 2 * MAX_ATTEMPTS
+
+# 可抽的候选不到请求数量的这么多倍时，不探测，直接扫描索引
+SCAN_FACTOR = 4
+
+COLUMNS = 'c.id, c.character, p.recognition_count, p.is_mastered'
+
+
+def _id_range(db, learner_id, is_mastered):
+    """候选字的最小和最大 id（分两次查询才能走索引的 min/max 优化）"""
+    low = db.execute(
+        'SELECT MIN(character_id) FROM learner_progress WHERE learner_id = ? AND is_mastered = ?',
+        (learner_id, is_mastered)
+    ).fetchone()[0]
+    if low is None:
+        return None
+    high = db.execute(
+        'SELECT MAX(character_id) FROM learner_progress WHERE learner_id = ? AND is_mastered = ?',
+        (learner_id, is_mastered)
+    ).fetchone()[0]
+    return low, high
+
+
+def _pool_size(db, learner_id, is_mastered):
+    """候选字的个数（learner_stats 中的计数），没有汇总时返回 None"""
+    row = db.execute('SELECT total, mastered FROM learner_stats WHERE learner_id = ?', (learner_id,)).fetchone()
+    if row is None:
+        return None
+    return row[1] if is_mastered else row[0] - row[1]
+
+
+def _probe(db, learner_id, is_mastered, low, high, rng):
+    """探测一个候选字，返回 (汉字 id, 是否通过拒绝采样)"""
+    target = rng.randint(low, high)
+    found = db.execute('''
+        SELECT character_id
+        FROM learner_progress
+        WHERE learner_id = ? AND is_mastered = ? AND character_id >= ?
+        ORDER BY character_id
+        LIMIT 1
+    ''', (learner_id, is_mastered, target)).fetchone()[0]
+
+    previous = db.execute('''
+        SELECT character_id
+        FROM learner_progress
+        WHERE learner_id = ? AND is_mastered = ? AND character_id < ?
+        ORDER BY character_id DESC
+        LIMIT 1
+    ''', (learner_id, is_mastered, found)).fetchone()
+
+    gap = found - previous[0] if previous else 1
+    return found, gap <= 1 or rng.random() * gap < 1
+
+
+def _load(db, learner_id, ids):
+    """按 id 读取汉字和学习者的进度"""
+    if not ids:
+        return []
+    placeholders = ','.join('?' * len(ids))
+    return [dict(row) for row in db.execute(f'''
+        SELECT {COLUMNS}
+        FROM learner_progress p
+        JOIN characters c ON c.id = p.character_id
+        WHERE p.learner_id = ? AND p.character_id IN ({placeholders})
+    ''', [learner_id] + list(ids))]
+
+
+def sample_characters(db, mastered=False, count=1, rng=random, exclude=(), learner_id=DEFAULT_LEARNER):
+    """为学习者随机抽取 count 个不重复的汉字，候选不足时返回全部候选
+
+    exclude 为不参与抽取的汉字 id 集合（例如本轮学习已经出现过的字）。
+    """
+    is_mastered = 1 if mastered else 0
+    id_range = _id_range(db, learner_id, is_mastered)
+    if id_range is None:
+        return []
+
+    low, high = id_range
+    picked = []
+    pool = _pool_size(db, learner_id, is_mastered)
+    if pool is None or pool - len(exclude) > count * SCAN_FACTOR:
+        seen = set()
+        misses = 0
+        while len(picked) < count and misses < MAX_MISSES:
+            character_id, accepted = _probe(db, learner_id, is_mastered, low, high, rng)
+            misses += 1
+            if character_id in exclude or character_id in seen:
+                continue
+            if accepted or misses >= MAX_ATTEMPTS:
+                picked.append(character_id)
+                seen.add(character_id)
+                misses = 0
+
+    if len(picked) < count:
+        # 候选池比请求的数量大不了多少（或极度稀疏、大多已排除），扫描索引补齐
+        rest = [row[0] for row in db.execute(
+            'SELECT character_id FROM learner_progress WHERE learner_id = ? AND is_mastered = ?',
+            (learner_id, is_mastered)
+        ) if row[0] not in picked and row[0] not in exclude]
+        picked.extend(rng.sample(rest, min(count - len(picked), len(rest))))
+
+    characters = _load(db, learner_id, picked)
+    rng.shuffle(characters)
+    return characters
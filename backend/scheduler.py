@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+复习调度
+
+调度器根据一次作答（认识 / 不认识）计算汉字新的学习状态，并给出下次复习时间
+due_at（Unix 时间戳，NULL 表示不再安排复习）。/api/characters/next 直接在
+due_at 索引上取最早到期的字。
+
+- legacy: 原来的规则，累计认识 3 次即掌握，不认识计数归零
+- sm2:    SuperMemo-2 间隔重复，按难度系数拉长复习间隔
+
+用法（在 backend 目录下）：
+    python3 scheduler.py recompute --scheduler sm2
+"""
+
+import argparse
+import sqlite3
+import time
+
+import archive
+from db import connect
+
+# 调度状态列
+COLUMNS = [
+    ('ease', 'REAL DEFAULT 2.5'),
+    ('interval_days', 'REAL DEFAULT 0'),
+    ('repetitions', 'INTEGER DEFAULT 0'),
+    ('due_at', 'INTEGER DEFAULT 0'),
+]
+
+SCHEMA = [
+    'CREATE INDEX IF NOT EXISTS idx_characters_due_at ON characters(due_at)',
+]
+
+# 调度器写回学习进度（learner_progress）的字段
+STATE_FIELDS = ('recognition_count', 'is_mastered', 'ease', 'interval_days', 'repetitions', 'due_at')
+
+DAY = 24 * 60 * 60
+
+
+class Scheduler:
+    """调度器基类"""
+
+    name = None
+
+    def initial_state(self, character):
+        """没有作答记录的汉字的调度状态"""
+        return {
+            'recognition_count': character['recognition_count'] or 0,
+            'is_mastered': character['is_mastered'] or 0,
+            'ease': 2.5,
+            'interval_days': 0,
+            'repetitions': 0,
+            'due_at': None if character['is_mastered'] else 0,
+        }
+
+    def review(self, state, recognized, now):
+        """根据一次作答返回新的状态"""
+        raise NotImplementedError
+
+
+class LegacyScheduler(Scheduler):
+    """累计认识 3 次即掌握；未掌握的字总是到期，最久没复习的排在前面"""
+
+    name = 'legacy'
+    mastery_count = 3
+
+    def review(self, state, recognized, now):
+        state = dict(state)
+        if recognized:
+            state['recognition_count'] = (state['recognition_count'] or 0) + 1
+            state['is_mastered'] = 1 if state['recognition_count'] >= self.mastery_count else 0
+        else:
+            # 如果标记不认识，计数归零
+            state['recognition_count'] = 0
+        state['due_at'] = None if state['is_mastered'] else now
+        return state
+
+
+class SM2Scheduler(Scheduler):
+    """SuperMemo-2：认识按质量 4 计，不认识按质量 1 计"""
+
+    name = 'sm2'
+    min_ease = 1.3
+    # 复习间隔达到该天数视为已掌握
+    mastered_interval = 21
+    # 答错后多久再出现（秒）
+    relearn_delay = 10 * 60
+
+    def initial_state(self, character):
+        state = super().initial_state(character)
+        state['due_at'] = 0
+        return state
+
+    def review(self, state, recognized, now):
+        state = dict(state)
+        quality = 4 if recognized else 1
+        ease = state['ease'] or 2.5
+        ease += 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        state['ease'] = round(max(self.min_ease, ease), 4)
+
+        if recognized:
+            repetitions = (state['repetitions'] or 0) + 1
+            if repetitions == 1:
+                interval = 1
+            elif repetitions == 2:
+                interval = 6
+            else:
+                interval = round((state['interval_days'] or 1) * state['ease'], 2)
+            state['repetitions'] = repetitions
+            state['interval_days'] = interval
+            state['due_at'] = now + int(interval * DAY)
+        else:
+            state['repetitions'] = 0
+            state['interval_days'] = 0
+            state['due_at'] = now + self.relearn_delay
+
+        state['recognition_count'] = state['repetitions']
+        state['is_mastered'] = 1 if state['interval_days'] >= self.mastered_interval else 0
+        return state
+
+
+SCHEDULERS = {
+    LegacyScheduler.name: LegacyScheduler,
+    SM2Scheduler.name: SM2Scheduler,
+}
+
+
+def get_scheduler(name):
+    """按名称获取调度器"""
+    try:
+        return SCHEDULERS[name]()
+    except KeyError:
+        raise ValueError(f'未知的调度器: {name}（可选: {", ".join(SCHEDULERS)}）')
+
+
+def recompute(db, scheduler):
+    """按时间顺序回放全部学习记录，重新计算每个学习者每个字的调度状态
+
+    学习记录（包括已归档的）只读一遍（流式读取），内存里只保留每个 (学习者, 字) 的当前状态。
+    返回 (回放的记录数, 更新的进度行数)。
+    """
+    # 没有作答记录的字保留原来的掌握状态（例如从 Excel 导入的）
+    states = {
+        (row['learner_id'], row['character_id']): scheduler.initial_state(row)
+        for row in db.execute(
+            'SELECT learner_id, character_id, recognition_count, is_mastered FROM learner_progress'
+        )
+    }
+
+    replayed = set()
+    record_count = 0
+    for learner_id, character_id, recognized, recorded_at in archive.iter_records(db):
+        key = (learner_id, character_id)
+        state = states.get(key)
+        if state is None:
+            continue
+        if key not in replayed:
+            # 有作答记录的字从零开始回放
+            state = dict(state, recognition_count=0, is_mastered=0)
+            replayed.add(key)
+        states[key] = scheduler.review(state, bool(recognized), recorded_at)
+        record_count += 1
+
+    db.executemany('''
+        UPDATE learner_progress
+        SET recognition_count = ?, is_mastered = ?, ease = ?, interval_days = ?,
+            repetitions = ?, due_at = ?
+        WHERE learner_id = ? AND character_id = ?
+    ''', (
+        tuple(state[field] for field in STATE_FIELDS) + key
+        for key, state in states.items()
+    ))
+    db.commit()
+    return record_count, len(states)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='复习调度工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    recompute_parser = subparsers.add_parser('recompute', help='回放学习记录重新计算调度状态')
+    recompute_parser.add_argument('--scheduler', default='legacy', choices=sorted(SCHEDULERS))
+    recompute_parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    args = parser.parse_args()
+
+    # migrations 依赖本模块，在这里导入
+    from migrations import migrate
+
+    db = connect(args.db)
+    try:
+        migrate(db)
+        start = time.perf_counter()
+        record_count, character_count = recompute(db, get_scheduler(args.scheduler))
+        elapsed = time.perf_counter() - start
+    except (sqlite3.Error, OSError) as e:
+        print(f"✗ 重新计算失败: {e}")
+        raise SystemExit(1)
+    finally:
+        db.close()
+
+    print(f"✓ 使用 {args.scheduler} 调度器回放 {record_count} 条学习记录")
+    print(f"✓ 更新 {character_count} 条学习进度，耗时 {elapsed:.2f} 秒")
+
+
+if __name__ == '__main__':
+    main()
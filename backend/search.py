@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+汉字搜索
+
+FTS5 全文索引，覆盖汉字、拼音（原样 / 去声调 / 声母）、释义、组词和造句。
+
+unicode61 分词器会把连续的汉字当成一个词，所以写入索引前在 Python 里把
+每个汉字切开（“汉字” → “汉 字”），搜索“汉字”就是相邻两个字的短语匹配。
+这一步没法在触发器里做：触发器只把改动过的汉字 id 记到 search_pending，
+搜索前（或执行 python3 search.py sync 时）再批量更新索引。
+这样任何途径的写入（接口、导入、脚本）都不会让索引过期。
+
+    python3 search.py rebuild    # 从 characters 表重建索引
+    python3 search.py sync       # 处理待更新的汉字
+"""
+
+import argparse
+import re
+import unicodedata
+
+from db import connect
+
+SCHEMA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS character_search USING fts5(
+        character, pinyin, pinyin_plain, pinyin_initials, definition, words, sentences,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS search_pending (
+        character_id INTEGER PRIMARY KEY
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_search_characters_insert
+    AFTER INSERT ON characters
+    BEGIN
+        INSERT OR IGNORE INTO search_pending (character_id) VALUES (NEW.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_search_characters_update
+    AFTER UPDATE OF character, pinyin, definition, words, sentences ON characters
+    BEGIN
+        INSERT OR IGNORE INTO search_pending (character_id) VALUES (NEW.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_search_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        INSERT OR IGNORE INTO search_pending (character_id) VALUES (OLD.id);
+    END
+    ''',
+]
+
+# 汉字（基本区、扩展 A、兼容区、扩展 B 以后）
+HANZI = '㐀-䶿一-鿿豈-﫿\U00020000-\U0003134f'
+HANZI_RUN = re.compile(f'([{HANZI}]+)')
+# 搜索词：连续的汉字，或连续的字母（拼音，可以带声调）
+TERM_PATTERN = re.compile(f'[{HANZI}]+|[^\\W\\d_{HANZI}]+')
+# segment 加在汉字两侧的空格（摘要中去掉，命中标记 [] 可能在空格内侧）
+SEGMENTED_HANZI = re.compile(f' ?(\\[?[{HANZI}]\\]?) ?')
+
+# 排名权重，与 FTS 表的列一一对应：命中汉字本身最重要，其次是拼音
+WEIGHTS = (10.0, 5.0, 5.0, 2.0, 1.0, 2.0, 0.5)
+
+# 拼音只在这几列里搜索
+PINYIN_COLUMNS = '{pinyin pinyin_plain pinyin_initials}'
+
+# 每批同步的汉字数
+SYNC_BATCH = 500
+
+SOURCE_COLUMNS = 'id, character, pinyin, definition, words, sentences'
+
+
+def install(db):
+    """创建索引表和触发器，并把带列权重的 bm25 设为默认排序（rank）"""
+    for statement in SCHEMA:
+        db.execute(statement)
+    weights = ', '.join(str(weight) for weight in WEIGHTS)
+    db.execute(
+        "INSERT INTO character_search (character_search, rank) VALUES ('rank', ?)",
+        (f'bm25({weights})',)
+    )
+
+
+def segment(text):
+    """在汉字之间和连续汉字的两侧加空格，让分词器按字切分"""
+    if not text:
+        return ''
+    parts = HANZI_RUN.split(text)
+    parts[1::2] = [' ' + ' '.join(run) + ' ' for run in parts[1::2]]
+    return ''.join(parts)
+
+
+def strip_tones(text):
+    """去掉拼音声调：“cháng / zhǎng” → “chang / zhang”"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn').lower()
+
+
+def initials(plain):
+    """每个读音的声母（zh / ch / sh 保留两个字母，零声母取首字母）"""
+    result = []
+    for syllable in re.findall(r'[a-z]+', plain):
+        result.append(syllable[:2] if syllable[:2] in ('zh', 'ch', 'sh') else syllable[0])
+    return ' '.join(result)
+
+
+def to_document(row):
+    """汉字行 (SOURCE_COLUMNS) 转换成索引列"""
+    character_id, character, pinyin, definition, words, sentences = row
+    plain = strip_tones(pinyin)
+    return (
+        character_id,
+        segment(character),
+        pinyin or '',
+        plain,
+        initials(plain),
+        segment(definition),
+        segment(words),
+        segment(sentences),
+    )
+
+
+def _index_rows(db, rows):
+    db.executemany('''
+        INSERT INTO character_search
+        (rowid, character, pinyin, pinyin_plain, pinyin_initials, definition, words, sentences)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (to_document(row) for row in rows))
+
+
+def rebuild(db):
+    """清空并从 characters 表重建索引"""
+    db.execute('DELETE FROM character_search')
+    db.execute('DELETE FROM search_pending')
+    _index_rows(db, db.execute(f'SELECT {SOURCE_COLUMNS} FROM characters'))
+    db.execute("INSERT INTO character_search (character_search) VALUES ('optimize')")
+
+
+def characters_added(db, first_id):
+    """批量写入新字（暂停了逐行触发器）后，把 id >= first_id 的新字加入待索引列表"""
+    db.execute(
+        'INSERT OR IGNORE INTO search_pending (character_id) SELECT id FROM characters WHERE id >= ?',
+        (first_id,)
+    )
+
+
+def sync(db):
+    """把 search_pending 中的汉字更新到索引，返回处理的数量"""
+    if db.execute('SELECT 1 FROM search_pending LIMIT 1').fetchone() is None:
+        return 0
+
+    synced = 0
+    while True:
+        if not db.in_transaction:
+            # 读取待处理列表到删除之间不允许其他写入，避免漏掉新的改动
+            db.execute('BEGIN IMMEDIATE')
+        ids = [row[0] for row in db.execute(
+            'SELECT character_id FROM search_pending LIMIT ?', (SYNC_BATCH,)
+        )]
+        if not ids:
+            db.commit()
+            return synced
+
+        placeholders = ','.join('?' * len(ids))
+        db.execute(f'DELETE FROM character_search WHERE rowid IN ({placeholders})', ids)
+        _index_rows(db, db.execute(
+            f'SELECT {SOURCE_COLUMNS} FROM characters WHERE id IN ({placeholders})', ids
+        ))
+        db.execute(f'DELETE FROM search_pending WHERE character_id IN ({placeholders})', ids)
+        db.commit()
+        synced += len(ids)
+
+
+def build_query(text):
+    """把用户输入转换成 FTS5 查询，没有可搜索的内容时返回 None
+
+    连续的汉字按短语匹配所有列；字母按拼音前缀匹配拼音列（声调可有可无）；
+    多个词之间是“并且”的关系。
+    """
+    terms = []
+    for term in TERM_PATTERN.findall(text or ''):
+        if HANZI_RUN.match(term):
+            terms.append('"' + ' '.join(term) + '"')
+        else:
+            plain = strip_tones(term)
+            if plain:
+                terms.append(f'{PINYIN_COLUMNS} : "{plain}"*')
+    return ' '.join(terms) or None
+
+
+def search(db, text, limit=20):
+    """搜索汉字，按相关度排序；输入本身就是某个汉字时排在最前
+
+    先只在索引里排序取出前 limit 个 id，再为这些结果生成摘要，
+    命中很多的查询（如一个拼音声母）不会为每个命中都生成一次摘要。
+    """
+    query = build_query(text)
+    if query is None:
+        return []
+    sync(db)
+
+    ids = [row[0] for row in db.execute(
+        'SELECT rowid FROM character_search WHERE character_search MATCH ? ORDER BY rank LIMIT ?',
+        (query, limit)
+    )]
+    exact = db.execute('SELECT id FROM characters WHERE character = ?', (text.strip(),)).fetchone()
+    if exact is not None and exact[0] not in ids[:1]:
+        ids = [exact[0]] + [character_id for character_id in ids if character_id != exact[0]][:limit - 1]
+    if not ids:
+        return []
+
+    placeholders = ','.join('?' * len(ids))
+    rows = {
+        row['id']: dict(row) for row in db.execute(f'''
+            SELECT c.id, c.character, c.pinyin, c.recognition_count, c.is_mastered,
+                   snippet(character_search, -1, '[', ']', '…', 12) AS snippet
+            FROM character_search s
+            JOIN characters c ON c.id = s.rowid
+            WHERE character_search MATCH ? AND s.rowid IN ({placeholders})
+        ''', [query] + ids)
+    }
+
+    results = []
+    for character_id in ids:
+        result = rows.get(character_id)
+        if result is None:
+            # 与输入同名的汉字不一定满足查询中的拼音条件
+            continue
+        result['snippet'] = SEGMENTED_HANZI.sub(r'\1', result['snippet'] or '').strip()
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='汉字搜索索引工具')
+    parser.add_argument('command', choices=['rebuild', 'sync'])
+    parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    install(db)
+    if args.command == 'rebuild':
+        rebuild(db)
+        db.commit()
+        count = db.execute('SELECT COUNT(*) FROM characters').fetchone()[0]
+        print(f"✓ 已重建搜索索引（{count} 个汉字）")
+    else:
+        synced = sync(db)
+        print(f"✓ 已更新 {synced} 个汉字的搜索索引")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+学习会话
+
+一次请求取回一整组卡片（可附带详情），前端逐张作答时不再有网络往返。
+会话记录已经发出的字，取下一组时一次性读出作为排除集合交给抽样，
+同一会话内不会重复出现同一个字。抽取规则与 /api/characters/random 相同：
+学习模式抽未掌握的字，复习模式抽已掌握的字。会话属于创建它的学习者。
+
+超过 SESSION_TTL 没有活动的会话在新建会话时顺带清理。
+"""
+
+import random
+import time
+import uuid
+
+from learners import DEFAULT_LEARNER
+from sampler import sample_characters
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS study_sessions (
+        id TEXT PRIMARY KEY,
+        mode TEXT NOT NULL,
+        card_count INTEGER NOT NULL DEFAULT 0,
+        created_at INTEGER NOT NULL,
+        last_active_at INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_study_sessions_last_active
+    ON study_sessions(last_active_at)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS session_cards (
+        session_id TEXT NOT NULL,
+        character_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (session_id, character_id)
+    ) WITHOUT ROWID
+    ''',
+]
+
+MODES = ('learn', 'review')
+
+# 每组默认的卡片数
+DEFAULT_SIZE = 20
+
+# 会话闲置多久后被清理（秒）
+SESSION_TTL = 24 * 60 * 60
+
+DETAIL_COLUMNS = 'id, pinyin, definition, words, sentences'
+
+
+def find_session(db, session_id):
+    """查询会话，不存在或已过期时返回 None"""
+    return db.execute(
+        'SELECT * FROM study_sessions WHERE id = ? AND last_active_at >= ?',
+        (session_id, int(time.time()) - SESSION_TTL)
+    ).fetchone()
+
+
+def _attach_details(db, cards):
+    """一次查询为整组卡片补上拼音、释义、组词、造句"""
+    if not cards:
+        return
+    placeholders = ','.join('?' * len(cards))
+    details = {
+        row['id']: row for row in db.execute(
+            f'SELECT {DETAIL_COLUMNS} FROM characters WHERE id IN ({placeholders})',
+            [card['id'] for card in cards]
+        )
+    }
+    for card in cards:
+        row = details.get(card['id'])
+        for field in ('pinyin', 'definition', 'words', 'sentences'):
+            card[field] = row[field] if row else None
+
+
+def draw_cards(db, session, size, details=False, rng=random):
+    """为会话抽取下一组卡片（跳过本会话已经出现过的字），并记录到会话中"""
+    served = {
+        row[0] for row in db.execute(
+            'SELECT character_id FROM session_cards WHERE session_id = ?', (session['id'],)
+        )
+    }
+    cards = sample_characters(
+        db, mastered=session['mode'] == 'review', count=size, rng=rng, exclude=served,
+        learner_id=session['learner_id']
+    )
+    if details:
+        _attach_details(db, cards)
+
+    position = session['card_count']
+    db.executemany(
+        'INSERT INTO session_cards (session_id, character_id, position) VALUES (?, ?, ?)',
+        [(session['id'], card['id'], position + index) for index, card in enumerate(cards)]
+    )
+    db.execute('''
+        UPDATE study_sessions
+        SET card_count = card_count + ?, last_active_at = ?
+        WHERE id = ?
+    ''', (len(cards), int(time.time()), session['id']))
+    db.commit()
+    return cards
+
+
+def create_session(db, mode, size, details=False, rng=random, learner_id=DEFAULT_LEARNER):
+    """新建会话并抽取第一组卡片，返回 (会话 id, 卡片列表)"""
+    now = int(time.time())
+    expired = now - SESSION_TTL
+    db.execute('''
+        DELETE FROM session_cards
+        WHERE session_id IN (SELECT id FROM study_sessions WHERE last_active_at < ?)
+    ''', (expired,))
+    db.execute('DELETE FROM study_sessions WHERE last_active_at < ?', (expired,))
+
+    session = {'id': uuid.uuid4().hex, 'mode': mode, 'card_count': 0, 'learner_id': learner_id}
+    db.execute('''
+        INSERT INTO study_sessions (id, mode, learner_id, created_at, last_active_at)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (session['id'], mode, learner_id, now, now))
+    return session['id'], draw_cards(db, session, size, details, rng)
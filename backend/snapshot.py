@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学习记录列式快照
+
+把全部学习记录（包括已归档的）和汉字表按列导出为 NumPy 的 .npy 文件，报表（reports.py）
+以内存映射方式打开，整列做向量化计算，不再逐行读取 sqlite3.Row。快照是某一时刻的副本，
+由 python3 snapshot.py build 定时生成（例如每晚归档之后），不随作答实时更新。
+
+目录结构（SNAPSHOT_DIR）：
+    CURRENT                  当前快照的目录名，新快照写完后整体替换这个文件
+    <生成时间>/manifest.json  行数、最后一条学习记录 id、生成时间
+    <生成时间>/<表>.<列>.npy  每列一个文件
+
+已经打开旧快照的进程不受影响（旧文件删除后映射仍然有效），下一次读取时换成新快照；
+只保留当前和上一份快照。
+
+需要 numpy（pip3 install numpy）；未安装时只有快照和报表不可用，其他接口不受影响。
+
+    python3 snapshot.py build     # 生成新快照
+    python3 snapshot.py info      # 查看当前快照
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import archive
+from config import Config
+from db import connect
+from migrations import migrate
+
+CURRENT = 'CURRENT'
+MANIFEST = 'manifest.json'
+
+# 每批转换成数组的学习记录数
+BUILD_BATCH = 100000
+
+# 学习记录的列；day_number 为本地日期距 1970-01-01 的天数，便于按天、按周做窗口计算
+RECORD_COLUMNS = (
+    ('learner_id', '<i4'),
+    ('character_id', '<i4'),
+    ('recognized', '?'),
+    ('recorded_at', '<i8'),
+)
+RECORD_DTYPE = [(name, dtype) for name, dtype in RECORD_COLUMNS]
+DAY_NUMBER_DTYPE = '<i4'
+
+# 时区偏移都是 15 分钟的整数倍，同一个 15 分钟内的时间戳本地日期相同
+DAY_BUCKET_SECONDS = 15 * 60
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+EXTENSION_KEY = 'learnword_snapshot'
+
+
+def require_numpy():
+    """未安装 numpy 时抛出 RuntimeError"""
+    if np is None:
+        raise RuntimeError('未安装 numpy，请先执行 pip3 install numpy')
+
+
+def _file_name(table, column):
+    return f'{table}.{column}.npy'
+
+
+def day_numbers(recorded_at):
+    """时间戳数组对应的本地日期（距 1970-01-01 的天数）
+
+    按 15 分钟分桶，每个不同的桶只换算一次本地时间。
+    """
+    buckets, inverse = np.unique(recorded_at // DAY_BUCKET_SECONDS, return_inverse=True)
+    days = np.fromiter(
+        (datetime.date.fromtimestamp(int(bucket) * DAY_BUCKET_SECONDS).toordinal() - EPOCH_ORDINAL
+         for bucket in buckets),
+        dtype=DAY_NUMBER_DTYPE, count=len(buckets)
+    )
+    return days[inverse.reshape(-1)]
+
+
+def _write_records(db, directory):
+    """在一个读事务内导出学习记录，返回 (行数, 最后一条学习记录 id)"""
+    db.execute('BEGIN')
+    try:
+        archived = sum(row['record_count'] for row in archive.list_archives(db)) if archive.has_rollups(db) else 0
+        live, last_record_id = db.execute('SELECT COUNT(*), MAX(id) FROM learning_records').fetchone()
+        total = archived + live
+        if last_record_id is None and archived:
+            last_record_id = db.execute('SELECT MAX(last_record_id) FROM record_archives').fetchone()[0]
+
+        columns = {
+            name: np.lib.format.open_memmap(
+                os.path.join(directory, _file_name('records', name)), mode='w+', dtype=dtype, shape=(total,)
+            )
+            for name, dtype in RECORD_COLUMNS + (('day_number', DAY_NUMBER_DTYPE),)
+        }
+        rows = archive.iter_records(db)
+        position = 0
+        while True:
+            batch = list(itertools.islice(rows, BUILD_BATCH))
+            if not batch:
+                break
+            if position + len(batch) > total:
+                raise RuntimeError('导出期间学习记录发生了变化')
+            chunk = np.array([tuple(row) for row in batch], dtype=RECORD_DTYPE)
+            end = position + len(chunk)
+            for name, _ in RECORD_COLUMNS:
+                columns[name][position:end] = chunk[name]
+            columns['day_number'][position:end] = day_numbers(chunk['recorded_at'])
+            position = end
+        if position != total:
+            raise RuntimeError('导出期间学习记录发生了变化')
+        for column in columns.values():
+            column.flush()
+        del columns
+    finally:
+        db.rollback()
+    return total, last_record_id or 0
+
+
+def _write_characters(db, directory):
+    """导出汉字表的 id 和汉字，返回行数"""
+    rows = db.execute('SELECT id, character FROM characters ORDER BY id').fetchall()
+    ids = np.array([row['id'] for row in rows], dtype='<i4')
+    width = max((len(row['character']) for row in rows), default=1)
+    characters = np.array([row['character'] for row in rows], dtype=f'<U{width}')
+    np.save(os.path.join(directory, _file_name('characters', 'id')), ids)
+    np.save(os.path.join(directory, _file_name('characters', 'character')), characters)
+    return len(rows)
+
+
+def build(db, path):
+    """导出新快照并设为当前快照，返回 manifest
+
+    先写到临时目录，写完后改名并替换 CURRENT；旧快照只保留上一份。
+    """
+    require_numpy()
+    os.makedirs(path, exist_ok=True)
+    start = time.time()
+    tmp = tempfile.mkdtemp(dir=path, prefix='.building-')
+    try:
+        record_count, last_record_id = _write_records(db, tmp)
+        character_count = _write_characters(db, tmp)
+        name = time.strftime('%Y%m%d-%H%M%S', time.localtime(start))
+        if os.path.exists(os.path.join(path, name)):
+            name = f'{name}-{os.path.basename(tmp)[-6:]}'
+        manifest = {
+            'name': name,
+            'created_at': int(start),
+            'record_count': record_count,
+            'last_record_id': last_record_id,
+            'character_count': character_count,
+        }
+        with open(os.path.join(tmp, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        previous = current_name(path)
+        os.rename(tmp, os.path.join(path, name))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    fd, pointer = tempfile.mkstemp(dir=path, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(path, CURRENT))
+
+    for entry in os.listdir(path):
+        if entry not in (CURRENT, name, previous) and os.path.isdir(os.path.join(path, entry)) \
+                and not entry.startswith('.building-'):
+            shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+    return manifest
+
+
+def current_name(path):
+    """当前快照的目录名，还没有快照时返回 None"""
+    try:
+        with open(os.path.join(path, CURRENT), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class Snapshot:
+    """以内存映射方式打开的一份快照（只读，可以在线程间共享）
+
+    records / characters 为 {列名: 数组}，学习记录按 id 顺序排列。
+    """
+
+    def __init__(self, directory):
+        require_numpy()
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        self.name = os.path.basename(directory)
+        self.records = {
+            name: np.load(os.path.join(directory, _file_name('records', name)), mmap_mode='r')
+            for name in [name for name, _ in RECORD_COLUMNS] + ['day_number']
+        }
+        self.characters = {
+            name: np.load(os.path.join(directory, _file_name('characters', name)), mmap_mode='r')
+            for name in ('id', 'character')
+        }
+        self._character_index = None
+
+    def __len__(self):
+        return self.manifest['record_count']
+
+    def character_index(self):
+        """按汉字 id 查汉字表中位置的数组（不存在的 id 为 -1）"""
+        if self._character_index is None:
+            ids = self.characters['id']
+            size = max(int(ids.max()) if len(ids) else 0,
+                       int(self.records['character_id'].max()) if len(self) else 0) + 1
+            index = np.full(size, -1, dtype=np.int64)
+            index[ids] = np.arange(len(ids))
+            self._character_index = index
+        return self._character_index
+
+
+def open_snapshot(path):
+    """打开当前快照，还没有快照时返回 None"""
+    name = current_name(path)
+    return Snapshot(os.path.join(path, name)) if name else None
+
+
+def get_snapshot(app):
+    """应用使用的当前快照（每个进程缓存一份，CURRENT 变化后下一次读取时换成新快照）
+
+    未安装 numpy 时抛出 RuntimeError，还没有快照时返回 None。
+    """
+    require_numpy()
+    path = app.config.get('SNAPSHOT_DIR')
+    name = current_name(path) if path else None
+    if name is None:
+        return None
+    cached = app.extensions.get(EXTENSION_KEY)
+    if cached is None or cached.name != name:
+        cached = app.extensions[EXTENSION_KEY] = Snapshot(os.path.join(path, name))
+    return cached
+
+
+def main():
+    parser = argparse.ArgumentParser(description='学习记录列式快照')
+    parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    parser.add_argument('--dir', default=Config.SNAPSHOT_DIR, help='快照目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('build', help='导出新快照')
+    subparsers.add_parser('info', help='查看当前快照')
+    args = parser.parse_args()
+
+    if np is None:
+        print('✗ 未安装 numpy，请先执行 pip3 install numpy')
+        raise SystemExit(1)
+
+    if args.command == 'info':
+        snapshot = open_snapshot(args.dir)
+        if snapshot is None:
+            print(f'- {args.dir} 中还没有快照')
+            return
+        manifest = snapshot.manifest
+        created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(manifest['created_at']))
+        print(f"✓ {manifest['name']}: {manifest['record_count']} 条学习记录（到 id {manifest['last_record_id']}），"
+              f"{manifest['character_count']} 个汉字，生成于 {created}")
+        return
+
+    db = connect(args.db)
+    try:
+        migrate(db)
+        start = time.perf_counter()
+        manifest = build(db, args.dir)
+    except OSError as e:
+        print(f"✗ 导出失败: {e}")
+        raise SystemExit(1)
+    finally:
+        db.close()
+    print(f"✓ {manifest['name']}: {manifest['record_count']} 条学习记录，{manifest['character_count']} 个汉字，"
+          f"耗时 {time.perf_counter() - start:.1f} 秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学习统计汇总
+
+/api/stats 需要的数字由触发器随写入增量维护，查询时只读几行汇总数据：
+- stats_summary:    总字数和默认学习者的已掌握、学习中、未开始（汉字列表的总数也读这里）
+- learner_stats:    每个学习者的已掌握、学习中、未开始
+- daily_stats:      每个学习者每天的学习次数和认识次数
+- daily_recognized: 每个学习者每天认识过的汉字
+
+按天的汇总以学习记录写入时算好的本地日期 day（YYYYMMDD 整数，见 records.py）为键。
+
+任何写入 characters / learner_progress / learning_records 的途径（接口、导入、脚本）
+都会经过触发器。如果怀疑汇总数据不一致，可以从原始数据重建：
+    python3 stats.py check          # 只检查
+    python3 stats.py check --fix    # 检查并重建
+"""
+
+import argparse
+import sqlite3
+
+import archive
+from db import connect
+import records
+
+# 与原来 COUNT(*) 查询相同的判断条件，NULL 视为不满足
+MASTERED = 'IFNULL({row}.is_mastered = 1, 0)'
+LEARNING = 'IFNULL({row}.is_mastered = 0 AND {row}.recognition_count > 0, 0)'
+NOT_STARTED = 'IFNULL({row}.recognition_count = 0, 0)'
+
+
+def _summary_delta(row, sign):
+    """汇总行随一行学习状态增减的 SET 子句"""
+    return f'''
+        total = total {sign} 1,
+        mastered = mastered {sign} {MASTERED.format(row=row)},
+        learning = learning {sign} {LEARNING.format(row=row)},
+        not_started = not_started {sign} {NOT_STARTED.format(row=row)}
+    '''
+
+
+# 版本 4：全局汇总（characters 上的学习状态即默认学习者的进度）
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS stats_summary (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL DEFAULT 0,
+        mastered INTEGER NOT NULL DEFAULT 0,
+        learning INTEGER NOT NULL DEFAULT 0,
+        not_started INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_characters_insert
+    AFTER INSERT ON characters
+    BEGIN
+        UPDATE stats_summary SET {_summary_delta('NEW', '+')} WHERE id = 1;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_characters_update
+    AFTER UPDATE OF recognition_count, is_mastered ON characters
+    BEGIN
+        UPDATE stats_summary SET {_summary_delta('OLD', '-')} WHERE id = 1;
+        UPDATE stats_summary SET {_summary_delta('NEW', '+')} WHERE id = 1;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        UPDATE stats_summary SET {_summary_delta('OLD', '-')} WHERE id = 1;
+    END
+    ''',
+]
+
+# 版本 12：按学习者汇总（依赖 learner_progress 和 learning_records.learner_id）
+LEARNER_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS learner_stats (
+        learner_id INTEGER PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        mastered INTEGER NOT NULL DEFAULT 0,
+        learning INTEGER NOT NULL DEFAULT 0,
+        not_started INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS daily_stats (
+        learner_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        review_count INTEGER NOT NULL DEFAULT 0,
+        recognized_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (learner_id, day)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS daily_recognized (
+        learner_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        character_id INTEGER NOT NULL,
+        last_recorded_at INTEGER NOT NULL,
+        PRIMARY KEY (learner_id, day, character_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_daily_recognized_character
+    ON daily_recognized(character_id)
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_progress_insert
+    AFTER INSERT ON learner_progress
+    BEGIN
+        INSERT INTO learner_stats (learner_id, total, mastered, learning, not_started)
+        VALUES (
+            NEW.learner_id, 1,
+            {MASTERED.format(row='NEW')}, {LEARNING.format(row='NEW')}, {NOT_STARTED.format(row='NEW')}
+        )
+        ON CONFLICT(learner_id) DO UPDATE SET
+            total = total + 1,
+            mastered = mastered + excluded.mastered,
+            learning = learning + excluded.learning,
+            not_started = not_started + excluded.not_started;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_progress_update
+    AFTER UPDATE OF recognition_count, is_mastered ON learner_progress
+    BEGIN
+        UPDATE learner_stats SET {_summary_delta('OLD', '-')} WHERE learner_id = OLD.learner_id;
+        UPDATE learner_stats SET {_summary_delta('NEW', '+')} WHERE learner_id = NEW.learner_id;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_progress_delete
+    AFTER DELETE ON learner_progress
+    BEGIN
+        UPDATE learner_stats SET {_summary_delta('OLD', '-')} WHERE learner_id = OLD.learner_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_records_insert
+    AFTER INSERT ON learning_records
+    BEGIN
+        INSERT INTO daily_stats (learner_id, day, review_count, recognized_count)
+        VALUES (NEW.learner_id, NEW.day, 1, IFNULL(NEW.recognized = 1, 0))
+        ON CONFLICT(learner_id, day) DO UPDATE SET
+            review_count = review_count + 1,
+            recognized_count = recognized_count + excluded.recognized_count;
+
+        INSERT INTO daily_recognized (learner_id, day, character_id, last_recorded_at)
+        SELECT NEW.learner_id, NEW.day, NEW.character_id, NEW.recorded_at
+        WHERE NEW.recognized = 1
+        ON CONFLICT(learner_id, day, character_id) DO UPDATE SET
+            last_recorded_at = MAX(last_recorded_at, excluded.last_recorded_at);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_records_delete
+    AFTER DELETE ON learning_records
+    BEGIN
+        UPDATE daily_stats SET
+            review_count = review_count - 1,
+            recognized_count = recognized_count - IFNULL(OLD.recognized = 1, 0)
+        WHERE learner_id = OLD.learner_id AND day = OLD.day;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_stats_daily_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        DELETE FROM daily_recognized WHERE character_id = OLD.id;
+    END
+    ''',
+]
+
+# {day}、{recorded_at} 为 records.source_columns 返回的表达式
+DAILY_STATS_SQL = '''
+    SELECT learner_id, {day} AS day,
+           COUNT(*) AS review_count, SUM(IFNULL(recognized = 1, 0)) AS recognized_count
+    FROM learning_records
+    GROUP BY learner_id, {day}
+'''
+
+DAILY_RECOGNIZED_SQL = '''
+    SELECT learner_id, {day} AS day, character_id,
+           MAX({recorded_at}) AS last_recorded_at
+    FROM learning_records
+    WHERE recognized = 1
+    GROUP BY learner_id, {day}, character_id
+'''
+
+LEARNER_STATS_SQL = f'''
+    SELECT learner_id, COUNT(*),
+           IFNULL(SUM({MASTERED.format(row='p')}), 0),
+           IFNULL(SUM({LEARNING.format(row='p')}), 0),
+           IFNULL(SUM({NOT_STARTED.format(row='p')}), 0)
+    FROM learner_progress p
+    GROUP BY learner_id
+'''
+
+
+def compute_summary(db):
+    """从 characters 表直接统计（全表扫描，只用于校验和重建）"""
+    row = db.execute(f'''
+        SELECT COUNT(*),
+               IFNULL(SUM({MASTERED.format(row='c')}), 0),
+               IFNULL(SUM({LEARNING.format(row='c')}), 0),
+               IFNULL(SUM({NOT_STARTED.format(row='c')}), 0)
+        FROM characters c
+    ''').fetchone()
+    return tuple(row)
+
+
+def rebuild_summary(db):
+    """丢弃全局汇总并从汉字表重新计算"""
+    db.execute('DELETE FROM stats_summary')
+    db.execute(
+        'INSERT INTO stats_summary (id, total, mastered, learning, not_started) VALUES (1, ?, ?, ?, ?)',
+        compute_summary(db)
+    )
+
+
+def characters_added(db, first_id):
+    """批量写入新字（暂停了逐行触发器）后，把 id >= first_id 的新字计入全局汇总"""
+    db.execute(f'''
+        UPDATE stats_summary SET
+            total = total + added.added_total,
+            mastered = mastered + added.added_mastered,
+            learning = learning + added.added_learning,
+            not_started = not_started + added.added_not_started
+        FROM (
+            SELECT COUNT(*) AS added_total,
+                   IFNULL(SUM({MASTERED.format(row='c')}), 0) AS added_mastered,
+                   IFNULL(SUM({LEARNING.format(row='c')}), 0) AS added_learning,
+                   IFNULL(SUM({NOT_STARTED.format(row='c')}), 0) AS added_not_started
+            FROM characters c WHERE c.id >= ?
+        ) AS added
+        WHERE stats_summary.id = 1
+    ''', (first_id,))
+
+
+def _source_sql(db, template):
+    recorded_at, day = records.source_columns(db)
+    return template.format(recorded_at=recorded_at, day=day)
+
+
+def daily_stats_sql(db):
+    """按天统计的原始数据：learning_records 加上已归档月份的汇总（archive.py）"""
+    if not archive.has_rollups(db):
+        return _source_sql(db, DAILY_STATS_SQL)
+    return f'''
+        SELECT learner_id, day, SUM(review_count), SUM(recognized_count)
+        FROM ({_source_sql(db, DAILY_STATS_SQL)} UNION ALL {archive.ROLLUP_DAILY_STATS_SQL})
+        GROUP BY learner_id, day
+    '''
+
+
+def daily_recognized_sql(db):
+    """每天认识过的字的原始数据：learning_records 加上已归档月份的汇总"""
+    if not archive.has_rollups(db):
+        return _source_sql(db, DAILY_RECOGNIZED_SQL)
+    return f'''
+        SELECT learner_id, day, character_id, MAX(last_recorded_at)
+        FROM ({_source_sql(db, DAILY_RECOGNIZED_SQL)} UNION ALL {archive.ROLLUP_DAILY_RECOGNIZED_SQL})
+        GROUP BY learner_id, day, character_id
+    '''
+
+
+def rebuild_learners(db):
+    """丢弃按学习者的汇总并从学习进度和学习记录重新计算"""
+    db.execute('DELETE FROM learner_stats')
+    db.execute('DELETE FROM daily_stats')
+    db.execute('DELETE FROM daily_recognized')
+
+    db.execute(f'''
+        INSERT INTO learner_stats (learner_id, total, mastered, learning, not_started)
+        {LEARNER_STATS_SQL}
+    ''')
+    db.execute(f'''
+        INSERT INTO daily_stats (learner_id, day, review_count, recognized_count)
+        {daily_stats_sql(db)}
+    ''')
+    db.execute(f'''
+        INSERT INTO daily_recognized (learner_id, day, character_id, last_recorded_at)
+        {daily_recognized_sql(db)}
+    ''')
+
+
+def rebuild(db):
+    """丢弃全部汇总数据并从原始数据重新计算"""
+    rebuild_summary(db)
+    rebuild_learners(db)
+
+
+def _count_difference(db, expected_sql, stored_sql):
+    """两个查询结果集之间互不包含的行数"""
+    return db.execute(f'''
+        SELECT (SELECT COUNT(*) FROM ({expected_sql} EXCEPT {stored_sql}))
+             + (SELECT COUNT(*) FROM ({stored_sql} EXCEPT {expected_sql}))
+    ''').fetchone()[0]
+
+
+def check(db):
+    """对比汇总数据和原始数据，返回不一致项的说明列表"""
+    problems = []
+
+    stored = db.execute(
+        'SELECT total, mastered, learning, not_started FROM stats_summary WHERE id = 1'
+    ).fetchone()
+    expected = compute_summary(db)
+    names = ('total', 'mastered', 'learning', 'not_started')
+    if stored is None:
+        problems.append('stats_summary 缺少汇总行')
+    else:
+        for name, actual, value in zip(names, tuple(stored), expected):
+            if actual != value:
+                problems.append(f'stats_summary.{name}: 记录为 {actual}，实际为 {value}')
+
+    mismatched_learners = _count_difference(
+        db, LEARNER_STATS_SQL,
+        'SELECT learner_id, total, mastered, learning, not_started FROM learner_stats WHERE total > 0'
+    )
+    if mismatched_learners:
+        problems.append(f'learner_stats: {mismatched_learners} 个学习者的数据不一致')
+
+    mismatched_days = _count_difference(
+        db, daily_stats_sql(db),
+        'SELECT learner_id, day, review_count, recognized_count FROM daily_stats WHERE review_count > 0'
+    )
+    if mismatched_days:
+        problems.append(f'daily_stats: {mismatched_days} 天的数据不一致')
+
+    mismatched_recognized = _count_difference(
+        db, f'SELECT learner_id, day, character_id FROM ({daily_recognized_sql(db)})',
+        'SELECT learner_id, day, character_id FROM daily_recognized'
+    )
+    if mismatched_recognized:
+        problems.append(f'daily_recognized: {mismatched_recognized} 条记录不一致')
+
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='学习统计汇总工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    check_parser = subparsers.add_parser('check', help='检查汇总数据是否与原始数据一致')
+    check_parser.add_argument('--fix', action='store_true', help='从原始数据重建汇总数据')
+    check_parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    args = parser.parse_args()
+
+    # migrations 依赖本模块，在这里导入
+    from migrations import migrate
+
+    db = connect(args.db)
+    try:
+        migrate(db)
+        problems = check(db)
+
+        if not problems:
+            print("✓ 汇总数据与原始数据一致")
+        else:
+            for problem in problems:
+                print(f"✗ {problem}")
+
+        if args.fix:
+            rebuild(db)
+            db.commit()
+            print("✓ 已从原始数据重建汇总数据")
+    except (sqlite3.Error, OSError) as e:
+        print(f"✗ 检查失败: {e}")
+        raise SystemExit(1)
+    finally:
+        db.close()
+
+    if problems and not args.fix:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
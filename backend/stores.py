@@ -0,0 +1,449 @@
+# -*- coding: utf-8 -*-
+"""
+存储后端
+
+随机抽字、作答、统计和错题集这几个热点接口通过两个仓库读写数据，路由里不直接写 SQL：
+- CharacterStore: 学习者、汉字和学习者的进度（抽字、读取和保存调度状态、掌握情况汇总）
+- RecordStore:    学习记录和由它派生的数据（写入作答、今日统计、错题集）
+Storage 把一对仓库和事务组合在一起，作答（mark）在一个事务内读状态、写记录、写回状态。
+
+两种实现，由 STORAGE 配置选择：
+- sqlite: 读写数据库（默认），汇总数据由数据库触发器维护，与其他接口、脚本共享
+- memory: 第一次使用时从数据库载入，之后只在进程内读写（字典加有序索引，派生数据在写入时
+          同步更新）。写入不会保存到数据库，其他接口看不到，只用于测试和基准测试，只适合单进程
+"""
+
+import bisect
+import contextlib
+import random
+import threading
+import time
+
+from flask import current_app
+
+from db import get_db
+import learners
+import marks
+import mistakes
+from records import parse_timestamp
+from sampler import sample_characters
+from scheduler import STATE_FIELDS
+
+EXTENSION_KEY = 'learnword_storage'
+
+# 错题集返回的汉字详情字段（?fields=details）
+DETAIL_FIELDS = ('pinyin', 'definition', 'words', 'sentences')
+
+# 重置进度后的调度状态（与 learner_progress 的默认值相同）
+RESET_STATE = {
+    'recognition_count': 0, 'is_mastered': 0, 'ease': 2.5, 'interval_days': 0, 'repetitions': 0, 'due_at': 0,
+}
+
+
+class CharacterStore:
+    """学习者、汉字和学习者进度的仓库（基类）"""
+
+    def has_learner(self, learner_id):
+        """学习者是否存在"""
+        raise NotImplementedError
+
+    def sample(self, learner_id, mastered=False, count=1, rng=random):
+        """随机抽取 count 个不重复的未掌握（或已掌握）的字，返回 id、汉字、认识次数、是否掌握"""
+        raise NotImplementedError
+
+    def get(self, learner_id, character_id):
+        """汉字信息，学习状态字段为该学习者的进度；汉字不存在时返回 None"""
+        raise NotImplementedError
+
+    def load_states(self, learner_id, character_ids):
+        """读取汉字和调度状态，返回 {id: 状态}（不存在的字不在结果中）"""
+        raise NotImplementedError
+
+    def save_states(self, learner_id, states):
+        """写回调度状态（每个状态带 id 和 STATE_FIELDS）"""
+        raise NotImplementedError
+
+    def summary(self, learner_id):
+        """掌握情况：{'total', 'mastered', 'learning', 'not_started'}"""
+        raise NotImplementedError
+
+
+class RecordStore:
+    """学习记录和派生数据（按天统计、错题集）的仓库（基类）"""
+
+    def add(self, records):
+        """写入学习记录 (learner_id, character_id, recognized, recorded_at, day)"""
+        raise NotImplementedError
+
+    def today(self, learner_id, day):
+        """某天的作答次数和认识的字（按最近一次认识的时间倒序），返回 (次数, 汉字列表)"""
+        raise NotImplementedError
+
+    def mistakes(self, learner_id, limit=None, after=None, details=False):
+        """按最近答错时间倒序的错题，参数和返回值同 mistakes.query_mistakes"""
+        raise NotImplementedError
+
+
+class Storage:
+    """存储后端：汉字仓库、学习记录仓库和事务"""
+
+    name = None
+
+    def __init__(self, characters, records):
+        self.characters = characters
+        self.records = records
+
+    def transaction(self):
+        """事务的上下文管理器，正常退出时提交"""
+        raise NotImplementedError
+
+    def mark(self, learner_id, items, policy, now=None, max_age_days=None, keep_months=None):
+        """按顺序写入作答并更新调度状态，返回 (各汉字的最终状态, 不存在的汉字 id)
+
+        items 为 (汉字 id, 是否认识, 作答时间) 列表，作答时间的取值范围见 marks.review_marks。
+        """
+        with self.transaction():
+            states = self.characters.load_states(learner_id, {character_id for character_id, _, _ in items})
+            records, missing = marks.review_marks(
+                states, items, policy, now, learner_id, max_age_days, keep_months
+            )
+            self.records.add(records)
+            touched = {character_id for _, character_id, _, _, _ in records}
+            self.characters.save_states(learner_id, [states[character_id] for character_id in touched])
+        return {character_id: states[character_id] for character_id in touched}, missing
+
+    def reset(self, learner_id, character_id):
+        """重置学习进度，返回重置后的汉字信息（汉字不存在时返回 None）"""
+        with self.transaction():
+            self.characters.save_states(learner_id, [dict(RESET_STATE, id=character_id)])
+        return self.characters.get(learner_id, character_id)
+
+
+class SQLiteCharacterStore(CharacterStore):
+    def __init__(self, db):
+        self.db = db
+
+    def has_learner(self, learner_id):
+        return learners.find_learner(self.db, learner_id) is not None
+
+    def sample(self, learner_id, mastered=False, count=1, rng=random):
+        return sample_characters(self.db, mastered=mastered, count=count, rng=rng, learner_id=learner_id)
+
+    def get(self, learner_id, character_id):
+        return learners.load_character(self.db, learner_id, character_id)
+
+    def load_states(self, learner_id, character_ids):
+        return marks.load_characters(self.db, character_ids, learner_id)
+
+    def save_states(self, learner_id, states):
+        self.db.executemany(marks.STATE_UPDATE_SQL, (
+            tuple(state[field] for field in STATE_FIELDS) + (learner_id, state['id'])
+            for state in states
+        ))
+
+    def summary(self, learner_id):
+        row = self.db.execute(
+            'SELECT total, mastered, learning, not_started FROM learner_stats WHERE learner_id = ?',
+            (learner_id,)
+        ).fetchone()
+        return dict(row) if row else {'total': 0, 'mastered': 0, 'learning': 0, 'not_started': 0}
+
+
+class SQLiteRecordStore(RecordStore):
+    def __init__(self, db):
+        self.db = db
+
+    def add(self, records):
+        self.db.executemany(marks.RECORD_INSERT_SQL, records)
+
+    def today(self, learner_id, day):
+        row = self.db.execute(
+            'SELECT review_count FROM daily_stats WHERE learner_id = ? AND day = ?',
+            (learner_id, day)
+        ).fetchone()
+        recognized = [row['character'] for row in self.db.execute('''
+            SELECT c.character
+            FROM daily_recognized dr
+            JOIN characters c ON dr.character_id = c.id
+            WHERE dr.learner_id = ? AND dr.day = ?
+            ORDER BY dr.last_recorded_at DESC
+        ''', (learner_id, day))]
+        return (row['review_count'] if row else 0), recognized
+
+    def mistakes(self, learner_id, limit=None, after=None, details=False):
+        return mistakes.query_mistakes(self.db, learner_id, limit=limit, after=after, details=details)
+
+
+class SQLiteStorage(Storage):
+    """读写数据库（一个请求一个实例，使用请求的连接）"""
+
+    name = 'sqlite'
+
+    def __init__(self, db):
+        super().__init__(SQLiteCharacterStore(db), SQLiteRecordStore(db))
+        self.db = db
+
+    @contextlib.contextmanager
+    def transaction(self):
+        if not self.db.in_transaction:
+            # 读取状态和写回之间不允许其他连接写入，避免并发作答互相覆盖
+            self.db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.db.rollback()
+            raise
+        self.db.commit()
+
+
+def _summary_flags(state):
+    """进度计入掌握情况的 (已掌握, 学习中, 未开始)，与 stats.py 的触发器相同"""
+    count = state['recognition_count']
+    return (
+        1 if state['is_mastered'] == 1 else 0,
+        1 if state['is_mastered'] == 0 and count is not None and count > 0 else 0,
+        1 if count == 0 else 0,
+    )
+
+
+def _utc_text(epoch):
+    """时间戳转成 CURRENT_TIMESTAMP 格式"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(epoch))
+
+
+class MemoryCharacterStore(CharacterStore):
+    def __init__(self):
+        self.learners = set()
+        # id -> 汉字表的一行
+        self.rows = {}
+        # (learner_id, character_id) -> 进度（STATE_FIELDS 和 updated_at）
+        self.progress = {}
+        # (learner_id, 是否掌握) -> 有序的汉字 id 列表（抽字的候选池）
+        self._pools = {}
+        # learner_id -> [总数, 已掌握, 学习中, 未开始]
+        self._summaries = {}
+
+    def add_learner(self, learner_id):
+        """加入学习者，每个已有的字从未学习的状态开始"""
+        self.learners.add(learner_id)
+        for character_id in self.rows:
+            self.set_progress(learner_id, character_id, dict(RESET_STATE, updated_at=None))
+
+    def add_character(self, row):
+        """加入汉字（row 至少有 id 和 character），每个已有的学习者从未学习的状态开始"""
+        self.rows[row['id']] = dict(row)
+        for learner_id in self.learners:
+            self.set_progress(learner_id, row['id'], dict(RESET_STATE, updated_at=None))
+
+    def set_progress(self, learner_id, character_id, state):
+        """写入一个进度，同时更新候选池和掌握情况"""
+        key = (learner_id, character_id)
+        summary = self._summaries.setdefault(learner_id, [0, 0, 0, 0])
+        old = self.progress.get(key)
+        if old is None:
+            summary[0] += 1
+        else:
+            for i, flag in enumerate(_summary_flags(old), start=1):
+                summary[i] -= flag
+            if bool(old['is_mastered']) != bool(state['is_mastered']):
+                pool = self._pools[(learner_id, bool(old['is_mastered']))]
+                del pool[bisect.bisect_left(pool, character_id)]
+        for i, flag in enumerate(_summary_flags(state), start=1):
+            summary[i] += flag
+        if old is None or bool(old['is_mastered']) != bool(state['is_mastered']):
+            bisect.insort(self._pools.setdefault((learner_id, bool(state['is_mastered'])), []), character_id)
+        self.progress[key] = state
+
+    def has_learner(self, learner_id):
+        return learner_id in self.learners
+
+    def sample(self, learner_id, mastered=False, count=1, rng=random):
+        pool = self._pools.get((learner_id, bool(mastered)), [])
+        return [
+            {
+                'id': character_id,
+                'character': self.rows[character_id]['character'],
+                'recognition_count': self.progress[(learner_id, character_id)]['recognition_count'],
+                'is_mastered': self.progress[(learner_id, character_id)]['is_mastered'],
+            }
+            for character_id in rng.sample(pool, min(count, len(pool)))
+        ]
+
+    def get(self, learner_id, character_id):
+        state = self.progress.get((learner_id, character_id))
+        if state is None or character_id not in self.rows:
+            return None
+        character = dict(self.rows[character_id])
+        for field in learners.PROGRESS_FIELDS + ('updated_at',):
+            character[field] = state[field]
+        return character
+
+    def load_states(self, learner_id, character_ids):
+        states = {}
+        for character_id in character_ids:
+            state = self.progress.get((learner_id, character_id))
+            if state is not None and character_id in self.rows:
+                states[character_id] = dict(
+                    {field: state[field] for field in STATE_FIELDS},
+                    id=character_id, character=self.rows[character_id]['character']
+                )
+        return states
+
+    def save_states(self, learner_id, states):
+        updated_at = _utc_text(time.time())
+        for state in states:
+            if (learner_id, state['id']) in self.progress:
+                self.set_progress(learner_id, state['id'], dict(
+                    {field: state[field] for field in STATE_FIELDS}, updated_at=updated_at
+                ))
+
+    def summary(self, learner_id):
+        total, mastered, learning, not_started = self._summaries.get(learner_id, (0, 0, 0, 0))
+        return {'total': total, 'mastered': mastered, 'learning': learning, 'not_started': not_started}
+
+
+class MemoryRecordStore(RecordStore):
+    def __init__(self, characters):
+        self.characters = characters
+        # 载入之后写入的学习记录
+        self.rows = []
+        # (learner_id, day) -> 作答次数
+        self._daily = {}
+        # (learner_id, day) -> {character_id: 最近一次认识的时间}
+        self._recognized = {}
+        # (learner_id, character_id) -> [答错次数, 最近答错时间, 是否认识过]
+        self._mistakes = {}
+        # learner_id -> 有序的 (最近答错时间, character_id)，只含没认识过的错题
+        self._open = {}
+
+    def set_mistake(self, learner_id, character_id, mistake_count, last_mistake_at, ever_recognized):
+        """写入一个字的错题数据，同时更新错题索引"""
+        key = (learner_id, character_id)
+        old = self._mistakes.get(key)
+        pool = self._open.setdefault(learner_id, [])
+        if old is not None and not old[2] and old[0] > 0:
+            del pool[bisect.bisect_left(pool, (old[1], character_id))]
+        if not ever_recognized and mistake_count > 0:
+            bisect.insort(pool, (last_mistake_at, character_id))
+        self._mistakes[key] = [mistake_count, last_mistake_at, ever_recognized]
+
+    def add(self, records):
+        for learner_id, character_id, recognized, recorded_at, day in records:
+            self.rows.append((learner_id, character_id, recognized, recorded_at, day))
+            self._daily[(learner_id, day)] = self._daily.get((learner_id, day), 0) + 1
+            mistake_count, last_mistake_at, ever_recognized = self._mistakes.get(
+                (learner_id, character_id), (0, None, 0)
+            )
+            if recognized:
+                seen = self._recognized.setdefault((learner_id, day), {})
+                seen[character_id] = max(seen.get(character_id, recorded_at), recorded_at)
+                ever_recognized = 1
+            else:
+                mistake_count += 1
+                last_mistake_at = max(last_mistake_at or recorded_at, recorded_at)
+            self.set_mistake(learner_id, character_id, mistake_count, last_mistake_at, ever_recognized)
+
+    def today(self, learner_id, day):
+        seen = self._recognized.get((learner_id, day), {})
+        rows = self.characters.rows
+        recognized = [
+            rows[character_id]['character']
+            for character_id in sorted(seen, key=lambda character_id: (-seen[character_id], character_id))
+            if character_id in rows
+        ]
+        return self._daily.get((learner_id, day), 0), recognized
+
+    def mistakes(self, learner_id, limit=None, after=None, details=False):
+        pool = self._open.get(learner_id, [])
+        end = len(pool)
+        if after is not None:
+            end = bisect.bisect_left(pool, (parse_timestamp(after[0]), int(after[1])))
+        result = []
+        for i in range(end - 1, -1, -1):
+            if limit is not None and len(result) >= limit:
+                break
+            last_mistake_at, character_id = pool[i]
+            state = self.characters.progress.get((learner_id, character_id))
+            row = self.characters.rows.get(character_id)
+            if state is None or row is None or state['is_mastered'] != 0:
+                continue
+            item = {
+                'id': character_id,
+                'character': row['character'],
+                'recognition_count': state['recognition_count'],
+                'is_mastered': state['is_mastered'],
+                'mistake_count': self._mistakes[(learner_id, character_id)][0],
+                'last_mistake_time': _utc_text(last_mistake_at),
+            }
+            if details:
+                item.update((field, row.get(field)) for field in DETAIL_FIELDS)
+            result.append(item)
+        return result
+
+
+class MemoryStorage(Storage):
+    """进程内存储：字典加有序索引，一个进程共享一个实例，事务为进程内的锁（出错时不回滚）"""
+
+    name = 'memory'
+
+    def __init__(self):
+        characters = MemoryCharacterStore()
+        super().__init__(characters, MemoryRecordStore(characters))
+        self._lock = threading.RLock()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self._lock:
+            yield
+
+    @classmethod
+    def load(cls, db):
+        """从数据库载入学习者、汉字、进度和派生数据（包括已归档记录的汇总，不载入原始学习记录）"""
+        storage = cls()
+        characters, records = storage.characters, storage.records
+        characters.learners.update(row[0] for row in db.execute('SELECT id FROM learners'))
+        characters.rows.update((row['id'], dict(row)) for row in db.execute('SELECT * FROM characters'))
+        for row in db.execute(f'''
+            SELECT learner_id, character_id, {', '.join(STATE_FIELDS)}, updated_at FROM learner_progress
+        '''):
+            characters.set_progress(row['learner_id'], row['character_id'], {
+                field: row[field] for field in STATE_FIELDS + ('updated_at',)
+            })
+        records._daily.update(
+            ((row[0], row[1]), row[2])
+            for row in db.execute('SELECT learner_id, day, review_count FROM daily_stats')
+        )
+        for learner_id, day, character_id, last_recorded_at in db.execute(
+            'SELECT learner_id, day, character_id, last_recorded_at FROM daily_recognized'
+        ):
+            records._recognized.setdefault((learner_id, day), {})[character_id] = last_recorded_at
+        for row in db.execute('''
+            SELECT learner_id, character_id, mistake_count, last_mistake_at, ever_recognized
+            FROM character_mistakes
+        '''):
+            records.set_mistake(*row)
+        return storage
+
+
+STORAGES = {
+    SQLiteStorage.name: SQLiteStorage,
+    MemoryStorage.name: MemoryStorage,
+}
+
+_load_lock = threading.Lock()
+
+
+def get_storage():
+    """当前请求使用的存储后端（按 STORAGE 配置），配置错误时抛出 ValueError"""
+    name = current_app.config['STORAGE']
+    if name == SQLiteStorage.name:
+        return SQLiteStorage(get_db())
+    if name != MemoryStorage.name:
+        raise ValueError(f'未知的存储后端: {name}（可选: {", ".join(STORAGES)}）')
+    storage = current_app.extensions.get(EXTENSION_KEY)
+    if storage is None:
+        with _load_lock:
+            storage = current_app.extensions.get(EXTENSION_KEY)
+            if storage is None:
+                storage = current_app.extensions[EXTENSION_KEY] = MemoryStorage.load(get_db())
+    return storage
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+词语和例句
+
+characters 表的 words / sentences 以换行拼接的文本保存（编辑和导入导出仍然用它），
+这里把它们拆成独立的表：
+- words：每个词一行（同一个词出现在多个字的组词里也只有一行）
+- word_characters：词由哪些字组成（按字查词走主键）
+- character_words / sentences：每个字列出的组词和造句，保留原来的顺序
+
+words.unmastered_count 是词中尚未掌握的字数（不在字库里的字也算未掌握），
+由 characters 上的触发器随掌握状态变化增减，“只由已掌握的字组成的词”
+就是 unmastered_count = 0 的一次索引范围扫描。
+
+拆分文本没法在触发器里做：触发器只把 words / sentences 改动过的汉字 id
+记到 vocabulary_pending，读取前（或执行 python3 vocabulary.py sync 时）再批量拆分。
+
+    python3 vocabulary.py sync            # 处理待拆分的汉字
+    python3 vocabulary.py check [--fix]   # 检查未掌握字数，--fix 从汉字表整体重建
+"""
+
+import argparse
+
+from db import connect
+from learners import DEFAULT_LEARNER
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS words (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        text TEXT UNIQUE NOT NULL,
+        char_count INTEGER NOT NULL,
+        unmastered_count INTEGER NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_words_unmastered ON words(unmastered_count, id)',
+    '''
+    CREATE TABLE IF NOT EXISTS word_characters (
+        character TEXT NOT NULL,
+        word_id INTEGER NOT NULL,
+        PRIMARY KEY (character, word_id)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_word_characters_word ON word_characters(word_id)',
+    '''
+    CREATE TABLE IF NOT EXISTS character_words (
+        character_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        word_id INTEGER NOT NULL,
+        PRIMARY KEY (character_id, position)
+    ) WITHOUT ROWID
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_character_words_word ON character_words(word_id)',
+    '''
+    CREATE TABLE IF NOT EXISTS sentences (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        character_id INTEGER NOT NULL,
+        position INTEGER NOT NULL,
+        text TEXT NOT NULL
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS idx_sentences_character ON sentences(character_id, position)',
+    '''
+    CREATE TABLE IF NOT EXISTS vocabulary_pending (
+        character_id INTEGER PRIMARY KEY
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_vocabulary_characters_insert
+    AFTER INSERT ON characters
+    BEGIN
+        INSERT OR IGNORE INTO vocabulary_pending (character_id)
+        SELECT NEW.id WHERE NEW.words IS NOT NULL OR NEW.sentences IS NOT NULL;
+        UPDATE words SET unmastered_count = unmastered_count - 1
+        WHERE NEW.is_mastered = 1
+          AND id IN (SELECT word_id FROM word_characters WHERE character = NEW.character);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_vocabulary_characters_text
+    AFTER UPDATE OF words, sentences ON characters
+    BEGIN
+        INSERT OR IGNORE INTO vocabulary_pending (character_id) VALUES (NEW.id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_vocabulary_characters_mastered
+    AFTER UPDATE OF character, is_mastered ON characters
+    WHEN OLD.is_mastered IS NOT NEW.is_mastered OR OLD.character IS NOT NEW.character
+    BEGIN
+        UPDATE words SET unmastered_count = unmastered_count + 1
+        WHERE OLD.is_mastered = 1
+          AND id IN (SELECT word_id FROM word_characters WHERE character = OLD.character);
+        UPDATE words SET unmastered_count = unmastered_count - 1
+        WHERE NEW.is_mastered = 1
+          AND id IN (SELECT word_id FROM word_characters WHERE character = NEW.character);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_vocabulary_characters_delete
+    AFTER DELETE ON characters
+    BEGIN
+        INSERT OR IGNORE INTO vocabulary_pending (character_id) VALUES (OLD.id);
+        UPDATE words SET unmastered_count = unmastered_count + 1
+        WHERE OLD.is_mastered = 1
+          AND id IN (SELECT word_id FROM word_characters WHERE character = OLD.character);
+    END
+    ''',
+]
+
+# 由字库计算每个词的未掌握字数（新建词、重建和校验共用）
+UNMASTERED_SQL = '''
+    char_count - (
+        SELECT COUNT(*) FROM word_characters wc
+        JOIN characters c ON c.character = wc.character
+        WHERE wc.word_id = words.id AND c.is_mastered = 1
+    )
+'''
+
+# 每批处理的汉字数 / IN 查询的参数个数
+SYNC_BATCH = 500
+QUERY_CHUNK = 500
+
+
+def install(db):
+    """创建词语、例句表和触发器，首次安装时从汉字表拆分已有的组词和造句"""
+    exists = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'words'"
+    ).fetchone()
+    for statement in SCHEMA:
+        db.execute(statement)
+    if not exists:
+        rebuild(db)
+
+
+def split_lines(text):
+    """把换行拼接的文本拆成去掉空白的非空行（保持顺序）"""
+    if not text:
+        return []
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def word_characters(text):
+    """组成词的字（去重，忽略空白）"""
+    return list(dict.fromkeys(ch for ch in text if not ch.isspace()))
+
+
+def _chunks(items):
+    items = list(items)
+    for start in range(0, len(items), QUERY_CHUNK):
+        yield items[start:start + QUERY_CHUNK]
+
+
+def _word_ids(db, texts):
+    """返回 {词: id}，不存在的词新建（连同组成它的字和未掌握字数）"""
+    ids = {}
+    for chunk in _chunks(texts):
+        placeholders = ','.join('?' * len(chunk))
+        ids.update(db.execute(f'SELECT text, id FROM words WHERE text IN ({placeholders})', chunk))
+
+    new_texts = [text for text in texts if text not in ids]
+    if not new_texts:
+        return ids
+
+    db.executemany(
+        'INSERT INTO words (text, char_count, unmastered_count) VALUES (?, ?, 0)',
+        [(text, len(word_characters(text))) for text in new_texts]
+    )
+    new_ids = {}
+    for chunk in _chunks(new_texts):
+        placeholders = ','.join('?' * len(chunk))
+        new_ids.update(db.execute(f'SELECT text, id FROM words WHERE text IN ({placeholders})', chunk))
+    db.executemany(
+        'INSERT INTO word_characters (character, word_id) VALUES (?, ?)',
+        [(ch, word_id) for text, word_id in new_ids.items() for ch in word_characters(text)]
+    )
+    for chunk in _chunks(new_ids.values()):
+        placeholders = ','.join('?' * len(chunk))
+        db.execute(f'UPDATE words SET unmastered_count = {UNMASTERED_SQL} WHERE id IN ({placeholders})', chunk)
+
+    ids.update(new_ids)
+    return ids
+
+
+def _store(db, rows):
+    """写入 (汉字 id, words 文本, sentences 文本) 拆分后的组词和造句"""
+    entries = []
+    sentence_rows = []
+    for character_id, words, sentences in rows:
+        for position, text in enumerate(dict.fromkeys(split_lines(words))):
+            entries.append((character_id, position, text))
+        for position, text in enumerate(split_lines(sentences)):
+            sentence_rows.append((character_id, position, text))
+
+    ids = _word_ids(db, list(dict.fromkeys(text for _, _, text in entries)))
+    db.executemany(
+        'INSERT INTO character_words (character_id, position, word_id) VALUES (?, ?, ?)',
+        [(character_id, position, ids[text]) for character_id, position, text in entries]
+    )
+    db.executemany(
+        'INSERT INTO sentences (character_id, position, text) VALUES (?, ?, ?)',
+        sentence_rows
+    )
+
+
+def _drop_orphans(db, word_ids):
+    """删除已经没有任何字列出的词"""
+    for chunk in _chunks(word_ids):
+        placeholders = ','.join('?' * len(chunk))
+        orphans = [row[0] for row in db.execute(f'''
+            SELECT id FROM words
+            WHERE id IN ({placeholders})
+              AND NOT EXISTS (SELECT 1 FROM character_words cw WHERE cw.word_id = words.id)
+        ''', chunk)]
+        if orphans:
+            marks = ','.join('?' * len(orphans))
+            db.execute(f'DELETE FROM word_characters WHERE word_id IN ({marks})', orphans)
+            db.execute(f'DELETE FROM words WHERE id IN ({marks})', orphans)
+
+
+def rebuild(db):
+    """清空并从汉字表重新拆分全部组词和造句"""
+    for table in ('character_words', 'word_characters', 'words', 'sentences', 'vocabulary_pending'):
+        db.execute(f'DELETE FROM {table}')
+    _store(db, db.execute('''
+        SELECT id, words, sentences FROM characters
+        WHERE words IS NOT NULL OR sentences IS NOT NULL
+    ''').fetchall())
+
+
+def characters_added(db, first_id):
+    """批量写入新字（暂停了逐行触发器）后，把 id >= first_id 的新字加入待拆分列表，
+    并从包含已掌握新字的词语中扣除未掌握数"""
+    db.execute('''
+        INSERT OR IGNORE INTO vocabulary_pending (character_id)
+        SELECT id FROM characters
+        WHERE id >= ? AND (words IS NOT NULL OR sentences IS NOT NULL)
+    ''', (first_id,))
+    db.execute('''
+        UPDATE words SET unmastered_count = unmastered_count - added.count
+        FROM (
+            SELECT wc.word_id, COUNT(*) AS count
+            FROM characters c JOIN word_characters wc ON wc.character = c.character
+            WHERE c.id >= ? AND c.is_mastered = 1
+            GROUP BY wc.word_id
+        ) AS added
+        WHERE words.id = added.word_id
+    ''', (first_id,))
+
+
+def sync(db):
+    """拆分 vocabulary_pending 中的汉字，返回处理的数量"""
+    if db.execute('SELECT 1 FROM vocabulary_pending LIMIT 1').fetchone() is None:
+        return 0
+
+    synced = 0
+    while True:
+        if not db.in_transaction:
+            # 读取待处理列表到删除之间不允许其他写入，避免漏掉新的改动
+            db.execute('BEGIN IMMEDIATE')
+        ids = [row[0] for row in db.execute(
+            'SELECT character_id FROM vocabulary_pending LIMIT ?', (SYNC_BATCH,)
+        )]
+        if not ids:
+            db.commit()
+            return synced
+
+        placeholders = ','.join('?' * len(ids))
+        previous = [row[0] for row in db.execute(
+            f'SELECT DISTINCT word_id FROM character_words WHERE character_id IN ({placeholders})', ids
+        )]
+        db.execute(f'DELETE FROM character_words WHERE character_id IN ({placeholders})', ids)
+        db.execute(f'DELETE FROM sentences WHERE character_id IN ({placeholders})', ids)
+        _store(db, db.execute(
+            f'SELECT id, words, sentences FROM characters WHERE id IN ({placeholders})', ids
+        ).fetchall())
+        _drop_orphans(db, previous)
+        db.execute(f'DELETE FROM vocabulary_pending WHERE character_id IN ({placeholders})', ids)
+        db.commit()
+        synced += len(ids)
+
+
+def check(db):
+    """返回未掌握字数与字库不一致的词数"""
+    return db.execute(
+        f'SELECT COUNT(*) FROM words WHERE unmastered_count != {UNMASTERED_SQL}'
+    ).fetchone()[0]
+
+
+def query_mastered_words(db, contains=None, limit=None, after=None, learner_id=DEFAULT_LEARNER):
+    """只由学习者已掌握的字组成的词，按 id 排序
+
+    contains 为某个字时只返回包含这个字的词；after 为上一页最后一个词的 id。
+    默认学习者按 words.unmastered_count 查；其他学习者从自己已掌握的字出发，
+    统计每个词中已掌握的字数，等于词的字数即为全部掌握。
+    """
+    sync(db)
+
+    if learner_id != DEFAULT_LEARNER:
+        return _query_learner_words(db, learner_id, contains, limit, after)
+
+    params = []
+    if contains is not None:
+        sql = '''
+            SELECT w.id, w.text, w.char_count
+            FROM word_characters wc
+            JOIN words w ON w.id = wc.word_id
+            WHERE wc.character = ? AND w.unmastered_count = 0
+        '''
+        params.append(contains)
+        if after is not None:
+            sql += ' AND wc.word_id > ?'
+            params.append(after)
+        sql += ' ORDER BY wc.word_id'
+    else:
+        sql = 'SELECT id, text, char_count FROM words WHERE unmastered_count = 0'
+        if after is not None:
+            sql += ' AND id > ?'
+            params.append(after)
+        sql += ' ORDER BY id'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+
+    return [dict(row) for row in db.execute(sql, params)]
+
+
+def _query_learner_words(db, learner_id, contains, limit, after):
+    """非默认学习者的 query_mastered_words（走 learner_progress 的 (learner_id, is_mastered) 索引）"""
+    sql = '''
+        SELECT w.id, w.text, w.char_count
+        FROM learner_progress p
+        JOIN characters c ON c.id = p.character_id
+        JOIN word_characters wc ON wc.character = c.character
+        JOIN words w ON w.id = wc.word_id
+        WHERE p.learner_id = ? AND p.is_mastered = 1
+    '''
+    params = [learner_id]
+    if contains is not None:
+        sql += ' AND w.id IN (SELECT word_id FROM word_characters WHERE character = ?)'
+        params.append(contains)
+    if after is not None:
+        sql += ' AND w.id > ?'
+        params.append(after)
+    sql += ' GROUP BY w.id HAVING COUNT(*) = w.char_count ORDER BY w.id'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+
+    return [dict(row) for row in db.execute(sql, params)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='词语和例句工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    sync_parser = subparsers.add_parser('sync', help='拆分组词或造句改动过的汉字')
+    sync_parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    check_parser = subparsers.add_parser('check', help='检查词语的未掌握字数是否与字库一致')
+    check_parser.add_argument('--fix', action='store_true', help='从汉字表整体重建词语和例句')
+    check_parser.add_argument('--db', default='characters.db', help='数据库文件路径')
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    install(db)
+
+    if args.command == 'sync':
+        synced = sync(db)
+        print(f"✓ 已拆分 {synced} 个汉字的组词和造句")
+        db.close()
+        return
+
+    mismatched = check(db)
+    if mismatched:
+        print(f"✗ 有 {mismatched} 个词的未掌握字数与字库不一致")
+    else:
+        print("✓ 词语的未掌握字数与字库一致")
+
+    if args.fix:
+        rebuild(db)
+        print("✓ 已从汉字表重建词语和例句")
+
+    db.commit()
+    db.close()
+
+    if mismatched and not args.fix:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""
+生产环境入口
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+运行环境默认为 production，可以用 LEARNWORD_ENV 覆盖。
+"""
+
+import os
+
+from app import create_app
+
+app = create_app(os.environ.get('LEARNWORD_ENV', 'production'))
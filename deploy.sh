@@ -194,7 +194,11 @@ Type=simple
 User=$WEB_USER
 WorkingDirectory=$PROJECT_DIR/backend
 Environment="PATH=/usr/bin:/usr/local/bin"
-ExecStart=/usr/bin/python3 $PROJECT_DIR/backend/app.py
+Environment="LEARNWORD_ENV=production"
+ExecStart=/usr/bin/python3 -m gunicorn -c gunicorn.conf.py wsgi:app
+ExecReload=/bin/kill -s HUP \$MAINPID
+KillMode=mixed
+TimeoutStopSec=60
 Restart=always
 RestartSec=10
 
@@ -244,6 +248,7 @@ echo ""
 echo_info "管理命令："
 echo_info "  查看后端日志: sudo journalctl -u word-learning-backend -f"
 echo_info "  重启后端服务: sudo systemctl restart word-learning-backend"
+echo_info "  平滑重载后端: sudo systemctl reload word-learning-backend"
 echo_info "  重启 Nginx:   sudo systemctl restart nginx"
 echo_info "  查看服务状态: sudo systemctl status word-learning-backend"
 echo ""
@@ -0,0 +1,83 @@
+import axios from 'axios'
+
+// 作答先缓存在本地（localStorage），攒够一批或空闲一段时间后一次提交到 /api/marks/batch。
+// 网络不稳定时提交失败的作答保留在本地，下次提交时一起发送。
+
+const STORAGE_KEY = 'learnword.pendingMarks'
+const FLUSH_SIZE = 10
+const FLUSH_DELAY = 3000
+const MAX_BATCH = 500
+
+let flushTimer = null
+let flushing = null
+
+function loadPending() {
+  try {
+    return JSON.parse(localStorage.getItem(STORAGE_KEY)) || []
+  } catch (error) {
+    return []
+  }
+}
+
+function savePending(marks) {
+  localStorage.setItem(STORAGE_KEY, JSON.stringify(marks))
+}
+
+export function enqueueMark(characterId, recognized) {
+  const pending = loadPending()
+  pending.push({
+    character_id: characterId,
+    recognized,
+    answered_at: Math.floor(Date.now() / 1000)
+  })
+  savePending(pending)
+
+  clearTimeout(flushTimer)
+  if (pending.length >= FLUSH_SIZE) {
+    flushMarks()
+  } else {
+    flushTimer = setTimeout(flushMarks, FLUSH_DELAY)
+  }
+}
+
+export function flushMarks() {
+  clearTimeout(flushTimer)
+  if (flushing) return flushing
+
+  const batch = loadPending().slice(0, MAX_BATCH)
+  if (batch.length === 0) return Promise.resolve()
+
+  flushing = axios.post('/api/marks/batch', { marks: batch })
+    .then(() => {
+      // 提交期间可能有新的作答加入，只移除已提交的部分
+      savePending(loadPending().slice(batch.length))
+    })
+    .catch((error) => {
+      if (error.response && error.response.status === 400) {
+        // 数据本身有问题，重试也不会成功
+        console.error('作答数据无效，已丢弃:', error.response.data)
+        savePending(loadPending().slice(batch.length))
+        return
+      }
+      console.error('提交作答失败，稍后重试:', error)
+      flushTimer = setTimeout(flushMarks, FLUSH_DELAY * 5)
+    })
+    .finally(() => {
+      flushing = null
+    })
+  return flushing
+}
+
+// 页面关闭或切到后台时尽量把缓存的作答发出去
+window.addEventListener('pagehide', () => {
+  const batch = loadPending().slice(0, MAX_BATCH)
+  if (batch.length > 0 && !flushing && navigator.sendBeacon) {
+    const body = new Blob([JSON.stringify({ marks: batch })], { type: 'application/json' })
+    if (navigator.sendBeacon('/api/marks/batch', body)) {
+      savePending(loadPending().slice(batch.length))
+    }
+  }
+})
+
+// 启动时提交上次没有发出去的作答
+flushMarks()
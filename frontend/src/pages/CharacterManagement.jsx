@@ -11,15 +11,31 @@ function CharacterManagement() {
   const [importFile, setImportFile] = useState(null)
   const [importing, setImporting] = useState(false)
   const [exporting, setExporting] = useState(false)
+  const [total, setTotal] = useState(0)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     fetchCharacters()
   }, [])
 
+  // 每页加载的汉字数，更多的通过“加载更多”按游标翻页
+  const PAGE_SIZE = 200
+
+  const fetchPage = (after) => axios.get('/api/characters', {
+    params: {
+      limit: PAGE_SIZE,
+      fields: 'id,character,recognition_count,is_mastered',
+      ...(after ? { after } : {})
+    }
+  })
+
   const fetchCharacters = async () => {
     try {
-      const response = await axios.get('/api/characters')
+      const response = await fetchPage()
       setCharacters(response.data)
+      setTotal(Number(response.headers['x-total-count'] ?? response.data.length))
+      setNextCursor(response.headers['x-next-cursor'] || null)
       setLoading(false)
     } catch (error) {
       console.error('获取汉字列表失败:', error)
@@ -27,6 +43,19 @@ function CharacterManagement() {
     }
   }
 
+  const handleLoadMore = async () => {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const response = await fetchPage(nextCursor)
+      setCharacters(prev => [...prev, ...response.data])
+      setNextCursor(response.headers['x-next-cursor'] || null)
+    } catch (error) {
+      console.error('获取汉字列表失败:', error)
+    }
+    setLoadingMore(false)
+  }
+
   const handleAddCharacter = async (e) => {
     e.preventDefault()
 
@@ -229,7 +258,7 @@ function CharacterManagement() {
           <div className="flex-1 flex gap-2">
             <input
               type="file"
-              accept=".xlsx,.xls"
+              accept=".xlsx,.csv,.tsv"
               onChange={(e) => setImportFile(e.target.files[0])}
               className="flex-1 px-3 py-2 border border-gray-300 rounded-lg text-sm file:mr-2 file:py-1 file:px-3 file:rounded file:border-0 file:bg-blue-50 file:text-blue-700 hover:file:bg-blue-100"
             />
@@ -250,7 +279,7 @@ function CharacterManagement() {
       <div className="bg-white rounded-lg shadow">
         <div className="p-4 sm:p-6 border-b border-gray-200">
           <div className="flex flex-col sm:flex-row sm:justify-between sm:items-center gap-3">
-            <h2 className="text-lg sm:text-xl font-semibold">汉字列表 ({characters.length})</h2>
+            <h2 className="text-lg sm:text-xl font-semibold">汉字列表 ({total})</h2>
             <div className="flex flex-wrap gap-3 sm:gap-4 text-xs sm:text-sm">
               <span className="flex items-center gap-1 sm:gap-2">
                 <div className="w-4 h-4 bg-green-100 border-2 border-green-400 rounded"></div>
@@ -318,6 +347,17 @@ function CharacterManagement() {
               </div>
             ))}
           </div>
+          {nextCursor && (
+            <div className="mt-4 text-center">
+              <button
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                className="bg-gray-100 hover:bg-gray-200 text-gray-700 px-6 py-2 rounded-lg text-sm font-medium transition min-h-[44px] disabled:opacity-50"
+              >
+                {loadingMore ? '加载中...' : `加载更多（已显示 ${characters.length} / ${total}）`}
+              </button>
+            </div>
+          )}
         </div>
       </div>
     </div>
@@ -16,7 +16,7 @@ function MistakeBook() {
 
   const fetchMistakes = async () => {
     try {
-      const response = await axios.get('/api/mistakes')
+      const response = await axios.get('/api/mistakes?fields=details')
       setMistakes(response.data)
       setLoading(false)
     } catch (error) {
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react'
 import { useNavigate } from 'react-router-dom'
 import axios from 'axios'
+import { enqueueMark, flushMarks } from '../answerQueue'
 
 function MistakeTest() {
   const navigate = useNavigate()
@@ -15,6 +16,8 @@ function MistakeTest() {
 
   useEffect(() => {
     fetchMistakes()
+    // 离开页面时提交缓存的作答
+    return () => { flushMarks() }
   }, [])
 
   useEffect(() => {
@@ -38,6 +41,8 @@ function MistakeTest() {
   const fetchMistakes = async () => {
     setLoading(true)
     try {
+      // 先提交缓存的作答，错题列表才是最新的
+      await flushMarks()
       const response = await axios.get('/api/mistakes')
       const mistakesList = response.data
 
@@ -67,9 +72,8 @@ function MistakeTest() {
     setLoading(true)
 
     try {
-      await axios.post(`/api/characters/${currentCharacter.id}/mark`, {
-        recognized
-      })
+      // 作答先缓存，攒够一批后一次提交
+      enqueueMark(currentCharacter.id, recognized)
 
       if (recognized) {
         // 认识了，计数+1
@@ -80,6 +84,7 @@ function MistakeTest() {
       const nextIndex = currentIndex + 1
       if (nextIndex >= mistakes.length) {
         // 测试完成
+        flushMarks()
         setCompleted(true)
         setLoading(false)
         setButtonDisabled(false)
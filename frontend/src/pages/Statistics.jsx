@@ -41,7 +41,7 @@ function Statistics() {
   const handleCharacterClick = async (charText) => {
     try {
       // 根据汉字文本查找汉字ID
-      const response = await axios.get('/api/characters')
+      const response = await axios.get('/api/characters?fields=id,character,recognition_count,is_mastered')
       const char = response.data.find(c => c.character === charText)
       if (char) {
         setSelectedCharacter(char)
@@ -1,5 +1,6 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import axios from 'axios'
+import { enqueueMark, flushMarks } from '../answerQueue'
 import { useSearchParams } from 'react-router-dom'
 import CharacterDetailModal from '../components/CharacterDetailModal'
 
@@ -13,10 +14,21 @@ function VerificationMode() {
   const [buttonDisabled, setButtonDisabled] = useState(false)
   const [selectedCharacter, setSelectedCharacter] = useState(null)
 
+  // 服务端学习会话：一次取回一组卡片，逐张显示时不再请求
+  const sessionRef = useRef(null)
+  const deckRef = useRef([])
+
   useEffect(() => {
+    sessionRef.current = null
+    deckRef.current = []
     fetchRandomCharacter()
   }, [mode])
 
+  useEffect(() => {
+    // 离开页面时提交缓存的作答
+    return () => { flushMarks() }
+  }, [])
+
   useEffect(() => {
     // 键盘快捷键支持
     const handleKeyPress = (e) => {
@@ -36,22 +48,44 @@ function VerificationMode() {
     return () => window.removeEventListener('keydown', handleKeyPress)
   }, [currentCharacter, loading, buttonDisabled])
 
+  const DECK_SIZE = 20
+
+  const drawDeck = async () => {
+    if (sessionRef.current) {
+      const response = await axios.post(`/api/sessions/${sessionRef.current}/cards`, {
+        size: DECK_SIZE
+      })
+      if (response.data.cards.length > 0) {
+        return response.data.cards
+      }
+    }
+    // 本轮的字都出现过了（或还没有会话），提交缓存的作答后开始新的一轮
+    await flushMarks()
+    const response = await axios.post('/api/sessions', {
+      mode,
+      size: DECK_SIZE
+    })
+    sessionRef.current = response.data.id
+    return response.data.cards
+  }
+
   const fetchRandomCharacter = async () => {
+    if (deckRef.current.length > 0) {
+      setCurrentCharacter(deckRef.current.shift())
+      setLoading(false)
+      return
+    }
+
     setLoading(true)
     try {
-      const endpoint = mode === 'review'
-        ? '/api/characters/random?mastered=true'
-        : '/api/characters/random'
-      const response = await axios.get(endpoint)
-
-      if (response.data.message) {
-        const message = mode === 'review'
-          ? '没有已掌握的汉字可复习'
-          : '所有汉字都已掌握'
+      const cards = await drawDeck()
+
+      if (cards.length === 0) {
         setCompleted(true)
         setCurrentCharacter(null)
       } else {
-        setCurrentCharacter(response.data)
+        deckRef.current = cards.slice(1)
+        setCurrentCharacter(cards[0])
         setCompleted(false)
       }
       setLoading(false)
@@ -68,9 +102,8 @@ function VerificationMode() {
     setLoading(true)
 
     try {
-      await axios.post(`/api/characters/${currentCharacter.id}/mark`, {
-        recognized
-      })
+      // 作答先缓存，攒够一批后一次提交
+      enqueueMark(currentCharacter.id, recognized)
 
       // 直接显示下一个字，无需提示
       fetchRandomCharacter()